@@ -0,0 +1,252 @@
+"""Benchmarks of the Runner-registered algs at real VIIRS granule sizes
+
+Usage:
+    python benchmarks/bench_algs.py                       # run everything, print table
+    python benchmarks/bench_algs.py -k vibcm --shapes m   # filter cases
+    python benchmarks/bench_algs.py --save local          # store baselines/local.json
+    python benchmarks/bench_algs.py --compare local       # compare with stored baselines
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import xarray as xr
+
+from viirs_tools.products import get_alg, product_name
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight, AlgsUtils, AlgsWater, Runner
+from viirs_tools.utils.enums import AlgEnum
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# I-band granule is 6400x6464, M-band one is 3200x3232, stacks are 4 consecutive granules
+SHAPES: dict[str, tuple[int, ...]] = {
+    "i": (6400, 6464),
+    "m": (3200, 3232),
+    "i-stack": (4, 6400, 6464),
+    "m-stack": (4, 3200, 3232),
+}
+DEFAULT_SHAPES = ("i", "m", "m-stack")
+KINDS = ("np", "xr")
+DTYPES = ("float32", "float64")
+
+# Alg arguments by the names of the synthetic scene fields
+ARGS: dict[AlgEnum, tuple[str, ...]] = {
+    AlgsCloud.VIBCM_DAY: ("ri1", "ri2", "ri3", "bi5"),
+    AlgsCloud.VIFCM_DAY: ("ri1", "ri2", "bi5"),
+    AlgsCloud.VIFCM_NIGHT: ("bi4", "bi5"),
+    AlgsIndex.NDVI: ("ri2", "ri1"),
+    AlgsIndex.NDSI: ("ri1", "ri3"),
+    AlgsNight.NAIVE: ("ri1", "bi4"),
+    AlgsNight.SOLAR: ("solza",),
+    AlgsWater.WBODIES_DAY: ("ri1", "ri2", "ri3"),
+    AlgsLST.MONO_WINDOW_I05: ("bi5", "ndvi", "cmask"),
+    AlgsLST.MONO_WINDOW_M15: ("bi5", "ndvi", "cmask"),
+    AlgsLST.MONO_WINDOW_M16: ("bi5", "ndvi", "cmask"),
+    AlgsUtils.MERGE_DAY_NIGHT: ("ri1", "bi4", "nmask"),
+}
+
+
+@dataclass
+class Result:
+    case: str
+    alg: str
+    shape: str
+    kind: str
+    dtype: str
+    pixels: int
+    wall_s: float
+    median_s: float
+    mpix_s: float
+    peak_mb: float
+
+
+def make_scene(shape: tuple[int, ...], dtype: str, seed: int = 0) -> dict[str, np.ndarray]:
+    """Synthetic terminator granule: day on the left half, night on the right one,
+    and fill values along the swath edges, as in the real data
+    """
+    rng = np.random.default_rng(seed)
+    scene = {}
+    for name in ("ri1", "ri2", "ri3"):
+        scene[name] = rng.uniform(0, 60, shape).astype(dtype)
+    for name, (lo, hi) in (("bi4", (240, 340)), ("bi5", (200, 320))):
+        scene[name] = rng.uniform(lo, hi, shape).astype(dtype)
+
+    cols = shape[-1]
+    edge = cols // 40
+    for name, band in scene.items():
+        band[..., :edge] = np.nan
+        band[..., cols - edge :] = np.nan
+        if name.startswith("r"):
+            band[..., cols // 2 :] = np.nan
+
+    scene["ndvi"] = (scene["ri2"] - scene["ri1"]) / (scene["ri2"] + scene["ri1"])
+    scene["cmask"] = (rng.random(shape) < 0.7).astype(dtype)
+    scene["nmask"] = np.where(np.isnan(scene["bi4"]), np.nan, np.isnan(scene["ri1"])).astype(dtype)
+    scene["solza"] = np.where(np.isnan(scene["bi4"]), np.nan, np.where(np.isnan(scene["ri1"]), 120, 60)).astype(dtype)
+    return scene
+
+
+def to_xr(arr: np.ndarray) -> xr.DataArray:
+    dims = ("time", "y", "x") if arr.ndim == 3 else ("y", "x")
+    return xr.DataArray(arr, dims=dims, coords={d: np.arange(n) for d, n in zip(dims, arr.shape, strict=True)})
+
+
+def iter_cases(shapes=DEFAULT_SHAPES, kinds=KINDS, dtypes=DTYPES, pattern: str = "") -> Iterator[tuple[str, AlgEnum, str, str, str]]:
+    """Yield (case id, alg, shape name, kind, dtype) for each selected case"""
+    for shape in shapes:
+        for dtype in dtypes:
+            for kind in kinds:
+                for alg in ARGS:
+                    case = f"{product_name(alg)}[{shape}-{kind}-{dtype}]"
+                    if pattern in case:
+                        yield case, alg, shape, kind, dtype
+
+
+def measure(func: Callable, args: tuple, repeat: int) -> tuple[list[float], float]:
+    """Run func repeat times and once more under tracemalloc
+
+    Returns:
+        wall times in seconds, peak traced memory in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t)
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run(
+    shapes=DEFAULT_SHAPES,
+    kinds=KINDS,
+    dtypes=DTYPES,
+    pattern: str = "",
+    repeat: int = 3,
+    shape_override: dict[str, tuple[int, ...]] | None = None,
+    runner: Runner | None = None,
+) -> list[Result]:
+    """Run selected benchmark cases, scenes are generated once per shape and dtype"""
+    runner = Runner() if runner is None else runner
+    sizes = SHAPES if shape_override is None else shape_override
+    results = []
+    scene_key, scene = None, {}
+    for case, alg, shape, kind, dtype in iter_cases(shapes, kinds, dtypes, pattern):
+        if scene_key != (shape, dtype, kind):
+            scene = {}  # release the previous scene before allocating the new one
+            scene = make_scene(sizes[shape], dtype)
+            if kind == "xr":
+                scene = {k: to_xr(v) for k, v in scene.items()}
+            scene_key = (shape, dtype, kind)
+
+        args = tuple(scene[name] for name in ARGS[alg])
+        times, peak = measure(get_alg(runner, alg), args, repeat)
+        pixels = int(np.prod(sizes[shape]))
+        best = min(times)
+        results.append(
+            Result(
+                case=case,
+                alg=product_name(alg),
+                shape=shape,
+                kind=kind,
+                dtype=dtype,
+                pixels=pixels,
+                wall_s=best,
+                median_s=statistics.median(times),
+                mpix_s=pixels / best / 1e6,
+                peak_mb=peak / 2**20,
+            )
+        )
+        print(format_result(results[-1]), flush=True)
+    return results
+
+
+def format_result(r: Result, baseline: Result | None = None) -> str:
+    line = f"{r.case:<48} {r.wall_s * 1e3:10.1f} ms {r.mpix_s:9.1f} Mpx/s {r.peak_mb:9.1f} MB"
+    if baseline is not None:
+        line += f"  x{r.wall_s / baseline.wall_s:5.2f} time  x{r.peak_mb / max(baseline.peak_mb, 1e-9):5.2f} mem"
+    return line
+
+
+def save_baseline(results: list[Result], name: str):
+    path = os.path.join(BASELINES_DIR, f"{name}.json")
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "xarray": xr.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+    with open(path, "w") as file:
+        json.dump({"meta": meta, "results": [asdict(r) for r in results]}, file, indent=1)
+    print(f"Baseline saved to {path}")
+
+
+def load_baseline(name: str) -> dict[str, Result]:
+    with open(os.path.join(BASELINES_DIR, f"{name}.json")) as file:
+        data = json.load(file)
+    return {r["case"]: Result(**r) for r in data["results"]}
+
+
+def compare(results: list[Result], baseline: dict[str, Result], threshold: float) -> list[str]:
+    """Print comparison with the baseline
+
+    Returns:
+        Cases slower than baseline by more than threshold fraction
+    """
+    regressions = []
+    print(f"\nComparison with baseline (regression threshold {threshold:.0%}):")
+    for r in results:
+        base = baseline.get(r.case)
+        if base is None:
+            print(f"{r.case:<48} no baseline")
+            continue
+        line = format_result(r, base)
+        if r.wall_s > base.wall_s * (1 + threshold):
+            regressions.append(r.case)
+            line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", default="", help="run only cases containing the substring")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(DEFAULT_SHAPES))
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--dtypes", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, best one is reported")
+    parser.add_argument("--save", metavar="NAME", help="save results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare results with baselines/NAME.json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown fraction for --compare")
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, args.kinds, args.dtypes, args.pattern, args.repeat)
+    if args.save:
+        save_baseline(results, args.save)
+    if args.compare:
+        regressions = compare(results, load_baseline(args.compare), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Import time benchmarks, each statement is run in a fresh interpreter
+
+Usage:
+    python benchmarks/bench_import.py                   # print table
+    python benchmarks/bench_import.py --save local      # store baselines/import-local.json
+    python benchmarks/bench_import.py --compare local   # compare with stored baselines
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess as sp
+import sys
+import time
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+STATEMENTS = {
+    "python": "pass",
+    "package": "import viirs_tools",
+    "runner": "from viirs_tools import Runner",
+    "cli": "import viirs_tools.cli",
+    "first-alg": "from viirs_tools import Runner; Runner().get_alg_cloud()",
+}
+
+
+def measure(statement: str, repeat: int) -> list[float]:
+    """Wall times of running the statement in a new interpreter, seconds"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        sp.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def run(repeat: int = 10) -> dict[str, float]:
+    """Median wall time of each statement, seconds"""
+    results = {}
+    for name, statement in STATEMENTS.items():
+        results[name] = statistics.median(measure(statement, repeat))
+        print(f"{name:<12} {results[name] * 1e3:8.1f} ms  {statement}", flush=True)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="interpreter runs per statement, median is reported")
+    parser.add_argument("--save", metavar="NAME", help="save results as baselines/import-NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare results with baselines/import-NAME.json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown fraction for --compare")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    if args.save:
+        with open(os.path.join(BASELINES_DIR, f"import-{args.save}.json"), "w") as file:
+            json.dump(results, file, indent=1)
+    if args.compare:
+        with open(os.path.join(BASELINES_DIR, f"import-{args.compare}.json")) as file:
+            baseline = json.load(file)
+        regressions = []
+        print(f"\nComparison with baseline (regression threshold {args.threshold:.0%}):")
+        for name, value in results.items():
+            if name not in baseline:
+                continue
+            # interpreter startup is not ours, compare the import cost only
+            own, base = value - results["python"], baseline[name] - baseline["python"]
+            line = f"{name:<12} {own * 1e3:8.1f} ms vs {base * 1e3:8.1f} ms"
+            if own > max(base, 1e-3) * (1 + args.threshold):
+                regressions.append(name)
+                line += "  REGRESSION"
+            print(line)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
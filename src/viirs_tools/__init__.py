@@ -1,3 +1,19 @@
-from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight, AlgsUtils, AlgsWater, Runner
+from typing import TYPE_CHECKING
 
 __all__ = ["AlgsCloud", "AlgsIndex", "AlgsLST", "AlgsNight", "AlgsUtils", "AlgsWater", "Runner"]
+
+if TYPE_CHECKING:
+    from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight, AlgsUtils, AlgsWater, Runner
+
+
+def __getattr__(name: str):
+    # Runner is imported on the first access, keeping `import viirs_tools` cheap
+    if name in __all__:
+        from viirs_tools import runner
+
+        return getattr(runner, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
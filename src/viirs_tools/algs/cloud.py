@@ -1,12 +1,21 @@
+from collections.abc import Iterable
+
 import numpy as np
 import xarray as xr
 
 from viirs_tools.algs import index
-from viirs_tools.utils.types import ArrayLike, _check_data
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
 
 
 def vibcm_day(
-    ri1: ArrayLike, ri2: ArrayLike, ri3: ArrayLike, bi5: ArrayLike, ndsi: ArrayLike | None = None, *, use_alt_thresholds: bool = False
+    ri1: ArrayLike,
+    ri2: ArrayLike,
+    ri3: ArrayLike,
+    bi5: ArrayLike,
+    ndsi: ArrayLike | None = None,
+    *,
+    use_alt_thresholds: bool = False,
+    ri3_max: ArrayLike | None = None,
 ) -> ArrayLike:
     """Day reflectance/thermal I-bands cloud test
     Based on the M.Piper, T.Bahr (2015).
@@ -18,6 +27,9 @@ def vibcm_day(
         ri3 : I03 in reflectance calibration
         bi5 : I05 in BT calibration
         use_alt_thresholds : flag to use alternative threshold values for tests
+        ri3_max : per-scene I03 maximum of Test 4, of (..., 1, 1) shape,
+            computed from ri3 if not given; passed when ri3 is a part of the scene,
+            e.g. a row block
 
     Returns:
         Integer cloud mask, 0 is cloud, 1 is clear pixel
@@ -28,6 +40,21 @@ def vibcm_day(
     else:
         _check_data(ri1, ri2, ri3, bi5, ndsi)
 
+    if _is_xr(ri1, ri2, ri3, bi5, ndsi):
+        return _vibcm_day_xr(ri1, ri2, ri3, bi5, ndsi, use_alt_thresholds=use_alt_thresholds, ri3_max=ri3_max)
+    return _vibcm_day_np(ri1, ri2, ri3, bi5, ndsi, use_alt_thresholds=use_alt_thresholds, ri3_max=ri3_max)
+
+
+def _vibcm_day_xr(
+    ri1: ArrayLike,
+    ri2: ArrayLike,
+    ri3: ArrayLike,
+    bi5: ArrayLike,
+    ndsi: ArrayLike | None = None,
+    *,
+    use_alt_thresholds: bool = False,
+    ri3_max: ArrayLike | None = None,
+) -> ArrayLike:
     # Test 1
     cm = xr.where(ri1 > 8, True, False)
 
@@ -42,7 +69,8 @@ def vibcm_day(
 
     # Test 4
     t4_thr = 225 if use_alt_thresholds else 410
-    ri3_max = np.nanmax(ri3, axis=(-2, -1), keepdims=True)
+    if ri3_max is None:
+        ri3_max = np.nanmax(ri3, axis=(-2, -1), keepdims=True)
     cm = xr.where((ri3_max - ri3) * bi5 / 100 < t4_thr, cm, False)
 
     # Test 5
@@ -54,6 +82,109 @@ def vibcm_day(
     return 1 - xr.where(xr.ufuncs.isnan(ri1), np.nan, cm)
 
 
+def _vibcm_day_np(
+    ri1: np.ndarray,
+    ri2: np.ndarray,
+    ri3: np.ndarray,
+    bi5: np.ndarray,
+    ndsi: np.ndarray | None = None,
+    *,
+    use_alt_thresholds: bool = False,
+    ri3_max: np.ndarray | None = None,
+) -> np.ndarray:
+    t3_thr = 300 if use_alt_thresholds else 312
+    t4_thr = 225 if use_alt_thresholds else 410
+    return _vibcm_day_eval(ri1, ri2, ri3, bi5, ndsi, t3_thr, t4_thr, ri3_max)
+
+
+def _vibcm_day_eval(
+    ri1: np.ndarray,
+    ri2: np.ndarray,
+    ri3: np.ndarray,
+    bi5: np.ndarray,
+    ndsi: np.ndarray | None,
+    t3_thr: ArrayLike,
+    t4_thr: ArrayLike,
+    ri3_max: np.ndarray | None = None,
+) -> np.ndarray:
+    # Thresholds are scalars or arrays with trailing unit axes, broadcasting over the data,
+    # so the threshold independent tests are evaluated once for all of them
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Test 1
+        cm = ri1 > 8
+
+        # Test 2
+        snow_mask = index.ndsi(ri1, ri3) > 0.7 if ndsi is None else ndsi > 0.7
+        cm &= ~snow_mask | (ri2 > 11)
+
+        # Test 5
+        cm &= ri2 / ri1 < 2
+
+        # Test 6
+        cm &= ri2 / ri3 > 1
+
+        # Test 4 product
+        if ri3_max is None:
+            ri3_max = np.nanmax(ri3, axis=(-2, -1), keepdims=True)
+        t4 = (ri3_max - ri3) * bi5 / 100
+
+        # Test 3
+        cm = cm & (bi5 < t3_thr)
+
+        # Test 4
+        cm &= t4 < t4_thr
+
+    return np.where(np.isnan(ri1), np.nan, ~cm)
+
+
+def vibcm_day_sweep(
+    ri1: ArrayLike, ri2: ArrayLike, ri3: ArrayLike, bi5: ArrayLike, t3_thr: ArrayLike, t4_thr: ArrayLike, ndsi: ArrayLike | None = None
+) -> ArrayLike:
+    """vibcm_day evaluated for many candidate thresholds of Tests 3 and 4 at once
+    NDSI, band ratios and the Test 4 product are computed once per scene
+
+    Args:
+        ri1 : I01 in reflectance calibration
+        ri2 : I02 in reflectance calibration
+        ri3 : I03 in reflectance calibration
+        bi5 : I05 in BT calibration
+        t3_thr : Test 3 I05 BT thresholds, 312 (300 alternative) in vibcm_day
+        t4_thr : Test 4 thresholds, 410 (225 alternative) in vibcm_day
+
+    Returns:
+        Integer cloud masks of (*thresholds shape, *data shape), where thresholds shape is
+            the broadcast shape of t3_thr and t4_thr, e.g. (k, ...) for two k-sized arrays
+            or (k3, k4, ...) for the t3_thr[:, None] and t4_thr[None, :] grid.
+            DataArray inputs give DataArray with 'threshold' dims and thresholds as coords
+    """
+    if ndsi is None:
+        _check_data(ri1, ri2, ri3, bi5)
+    else:
+        _check_data(ri1, ri2, ri3, bi5, ndsi)
+
+    thrs = _sweep_thresholds(t3_thr=t3_thr, t4_thr=t4_thr)
+    args = [None if a is None else np.asarray(a) for a in (ri1, ri2, ri3, bi5, ndsi)]
+    out = _vibcm_day_eval(*args, *_broadcast_over(np.ndim(ri1), thrs.values()))
+    return _sweep_result(out, ri1, thrs) if _is_xr(ri1, ri2, ri3, bi5, ndsi) else out
+
+
+def _sweep_thresholds(**thrs: ArrayLike) -> dict[str, np.ndarray]:
+    arrays = np.broadcast_arrays(*(np.asarray(t) for t in thrs.values()))
+    return dict(zip(thrs, arrays, strict=True))
+
+
+def _broadcast_over(ndim: int, thrs: Iterable[np.ndarray]) -> list[np.ndarray]:
+    return [t.reshape(t.shape + (1,) * ndim) for t in thrs]
+
+
+def _sweep_result(out: np.ndarray, like: xr.DataArray, thrs: dict[str, np.ndarray]) -> xr.DataArray:
+    ndim = out.ndim - like.ndim
+    dims = ("threshold",) if ndim == 1 else tuple(f"threshold_{i}" for i in range(ndim))
+    coords = {name: (dims, t) for name, t in thrs.items()}
+    coords.update(like.coords.items())
+    return xr.DataArray(out, dims=dims + like.dims, coords=coords)
+
+
 def vifcm_day(ri1: ArrayLike, ri2: ArrayLike, bi5: ArrayLike) -> ArrayLike:
     """Day reflectance & termal I-bands cloud test
     Based on the W.Schroeder, P.Oliva, L.Giglio, I.A.Csiszar (2014).
@@ -71,6 +202,12 @@ def vifcm_day(ri1: ArrayLike, ri2: ArrayLike, bi5: ArrayLike) -> ArrayLike:
     """
     _check_data(ri1, ri2, bi5)
 
+    if _is_xr(ri1, ri2, bi5):
+        return _vifcm_day_xr(ri1, ri2, bi5)
+    return _vifcm_day_np(ri1, ri2, bi5)
+
+
+def _vifcm_day_xr(ri1: ArrayLike, ri2: ArrayLike, bi5: ArrayLike) -> ArrayLike:
     # Test 1
     cm = xr.where(bi5 < 265, True, False)
 
@@ -85,6 +222,66 @@ def vifcm_day(ri1: ArrayLike, ri2: ArrayLike, bi5: ArrayLike) -> ArrayLike:
     return 1 - xr.where(xr.ufuncs.isnan(ri1), np.nan, cm)
 
 
+def _vifcm_day_np(
+    ri1: np.ndarray,
+    ri2: np.ndarray,
+    bi5: np.ndarray,
+    t1_thr: ArrayLike = 265,
+    t2_thr: ArrayLike = 295,
+    t3_thr: ArrayLike = 285,
+    t2_ref_thr: ArrayLike = 90,
+    t3_ref_thr: ArrayLike = 70,
+) -> np.ndarray:
+    # Test 1
+    cm = bi5 < t1_thr
+
+    sum_ri = ri1 + ri2
+
+    # Test 2
+    cm = cm | ((sum_ri > t2_ref_thr) & (bi5 < t2_thr))
+
+    # Test 3
+    cm |= (sum_ri > t3_ref_thr) & (bi5 < t3_thr)
+
+    return np.where(np.isnan(ri1), np.nan, ~cm)
+
+
+def vifcm_day_sweep(
+    ri1: ArrayLike,
+    ri2: ArrayLike,
+    bi5: ArrayLike,
+    t1_thr: ArrayLike = 265,
+    t2_thr: ArrayLike = 295,
+    t3_thr: ArrayLike = 285,
+    t2_ref_thr: ArrayLike = 90,
+    t3_ref_thr: ArrayLike = 70,
+) -> ArrayLike:
+    """vifcm_day evaluated for many candidate thresholds at once
+    Reflectance sum is computed once per scene
+
+    Args:
+        ri1 : I01 in reflectance calibration
+        ri2 : I02 in reflectance calibration
+        bi5 : I05 in BT calibration
+        t1_thr : Test 1 I05 BT thresholds
+        t2_thr : Test 2 I05 BT thresholds
+        t3_thr : Test 3 I05 BT thresholds
+        t2_ref_thr : Test 2 I01 + I02 reflectance thresholds
+        t3_ref_thr : Test 3 I01 + I02 reflectance thresholds
+
+    Returns:
+        Integer cloud masks of (*thresholds shape, *data shape), where thresholds shape is
+            the broadcast shape of all thresholds, defaults are the vifcm_day ones.
+            DataArray inputs give DataArray with 'threshold' dims and thresholds as coords
+    """
+    _check_data(ri1, ri2, bi5)
+
+    thrs = _sweep_thresholds(t1_thr=t1_thr, t2_thr=t2_thr, t3_thr=t3_thr, t2_ref_thr=t2_ref_thr, t3_ref_thr=t3_ref_thr)
+    args = [np.asarray(a) for a in (ri1, ri2, bi5)]
+    out = _vifcm_day_np(*args, *_broadcast_over(np.ndim(ri1), thrs.values()))
+    return _sweep_result(out, ri1, thrs) if _is_xr(ri1, ri2, bi5) else out
+
+
 def vifcm_night(bi4: ArrayLike, bi5: ArrayLike, nmask: ArrayLike | None = None) -> ArrayLike:
     """Night termal I-bands cloud test
     Based on the W.Schroeder, P.Oliva, L.Giglio, I.A.Csiszar (2014).
@@ -105,9 +302,25 @@ def vifcm_night(bi4: ArrayLike, bi5: ArrayLike, nmask: ArrayLike | None = None)
     else:
         _check_data(bi4, bi5)
 
+    if _is_xr(bi4, bi5, nmask):
+        return _vifcm_night_xr(bi4, bi5, nmask)
+    return _vifcm_night_np(bi4, bi5, nmask)
+
+
+def _vifcm_night_xr(bi4: ArrayLike, bi5: ArrayLike, nmask: ArrayLike | None = None) -> ArrayLike:
     cm = (bi5 < 265) & (bi4 < 295)
 
     if nmask is not None:
         cm = xr.where(nmask, cm, np.nan)
 
     return 1 - xr.where(xr.ufuncs.isnan(bi4), np.nan, cm)
+
+
+def _vifcm_night_np(bi4: np.ndarray, bi5: np.ndarray, nmask: np.ndarray | None = None) -> np.ndarray:
+    cm = (bi5 < 265) & (bi4 < 295)
+
+    missing = np.isnan(bi4)
+    if nmask is not None:
+        missing |= ~nmask.astype(bool)  # NaN in the mask is truthy, as for xr.where
+
+    return np.where(missing, np.nan, ~cm)
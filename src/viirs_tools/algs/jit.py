@@ -0,0 +1,65 @@
+import math
+
+import numba
+import numpy as np
+
+from viirs_tools.utils.types import ArrayLike
+
+# numba kernels of the pixel-wise algs, compiled ufuncs taking out=, results are
+# the same as of the reference implementations, float64 masks for any input dtype.
+# Requires numba (jit extra), used by Runner through the 'numba' backend
+_SIGNATURES_2 = ["float64(float32, float32)", "float64(float64, float64)"]
+_SIGNATURES_3 = ["float64(float32, float32, float32)", "float64(float64, float64, float64)"]
+
+
+@numba.vectorize(_SIGNATURES_3, cache=True)
+def _vifcm_day(ri1, ri2, bi5):
+    if math.isnan(ri1):
+        return np.nan
+    sum_ri = ri1 + ri2
+    cm = bi5 < 265 or (sum_ri > 90 and bi5 < 295) or (sum_ri > 70 and bi5 < 285)
+    return 0.0 if cm else 1.0
+
+
+@numba.vectorize(_SIGNATURES_3, cache=True)
+def _vifcm_night(bi4, bi5, nmask):
+    # NaN in the mask is truthy, as for xr.where
+    if math.isnan(bi4) or nmask == 0:
+        return np.nan
+    return 0.0 if bi5 < 265 and bi4 < 295 else 1.0
+
+
+@numba.vectorize(_SIGNATURES_3, cache=True)
+def _water_bodies_day(ri1, ri2, ri3):
+    if math.isnan(ri1):
+        return np.nan
+    return 0.0 if ri1 > ri2 > ri3 else 1.0
+
+
+@numba.vectorize(_SIGNATURES_2, cache=True)
+def _naive(refband, btband):
+    if math.isnan(btband):
+        return np.nan
+    return 1.0 if math.isnan(refband) else 0.0
+
+
+def vifcm_day(ri1: ArrayLike, ri2: ArrayLike, bi5: ArrayLike, out: np.ndarray | None = None) -> np.ndarray:
+    """cloud.vifcm_day kernel"""
+    return _vifcm_day(ri1, ri2, bi5, out=out)
+
+
+def vifcm_night(bi4: ArrayLike, bi5: ArrayLike, nmask: ArrayLike | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """cloud.vifcm_night kernel"""
+    bi4 = np.asarray(bi4)
+    nmask = np.ones_like(bi4) if nmask is None else np.asarray(nmask, dtype=bi4.dtype)
+    return _vifcm_night(bi4, bi5, nmask, out=out)
+
+
+def water_bodies_day(ri1: ArrayLike, ri2: ArrayLike, ri3: ArrayLike, out: np.ndarray | None = None) -> np.ndarray:
+    """water.water_bodies_day kernel"""
+    return _water_bodies_day(ri1, ri2, ri3, out=out)
+
+
+def naive(refband: ArrayLike, btband: ArrayLike, out: np.ndarray | None = None) -> np.ndarray:
+    """night.naive kernel"""
+    return _naive(refband, btband, out=out)
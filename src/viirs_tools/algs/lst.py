@@ -1,7 +1,7 @@
 import numpy as np
 import xarray as xr
 
-from viirs_tools.utils.types import ArrayLike, _check_data
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
 
 
 def _mono_window(
@@ -31,28 +31,65 @@ def _mono_window(
     else:
         _check_data(bt, ndvi)
 
-    bt_c = bt - 273.15  # to Celsius
+    if _is_xr(bt, ndvi, cmask):
+        return _mono_window_xr(bt, band_lambda, ndvi, cmask)
+    return _mono_window_np(bt, band_lambda, ndvi, cmask)
+
 
-    ndvi_s = 0.2
-    ndvi_v = 0.5
-    p_v = ((ndvi - ndvi_s) / (ndvi_v - ndvi_s)) ** 2
+# Emissivity model constants
+_NDVI_S = 0.2
+_NDVI_V = 0.5
+_C = 0.005  # represents surface roughness
+_E_S = 0.966  # soil emissivity
+_E_V = 0.973  # vegetation emissivity
+_E_W = 0.991  # water emmisivity
+_P = 1.438e-2
 
-    c = 0.005  # represents surface roughness
 
-    e_s = 0.966  # soil emissivity
-    e_v = 0.973  # vegetation emissivity
-    e_w = 0.991  # water emmisivity
+def _mono_window_xr(bt: ArrayLike, band_lambda: float, ndvi: ArrayLike, cmask: ArrayLike | None = None) -> ArrayLike:
+    bt_c = bt - 273.15  # to Celsius
+
+    p_v = ((ndvi - _NDVI_S) / (_NDVI_V - _NDVI_S)) ** 2
 
-    e_l = e_v * p_v + e_s * (1 - p_v) + c
-    e_l = xr.where(ndvi < ndvi_s, e_s, e_l)
-    e_l = xr.where(ndvi < 0, e_w, e_l)  # ndvi < 0 indicates water
-    e_l = xr.where(ndvi > ndvi_v, e_v, e_l)
+    e_l = _E_V * p_v + _E_S * (1 - p_v) + _C
+    e_l = xr.where(ndvi < _NDVI_S, _E_S, e_l)
+    e_l = xr.where(ndvi < 0, _E_W, e_l)  # ndvi < 0 indicates water
+    e_l = xr.where(ndvi > _NDVI_V, _E_V, e_l)
+
+    lst = bt_c / (1 + (band_lambda * bt_c / _P) * np.log(e_l) * 1e-12)
+    if cmask is not None:
+        lst = xr.where(cmask == 0, np.nan, lst)
+    return lst
 
-    p = 1.438e-2
 
-    lst = bt_c / (1 + (band_lambda * bt_c / p) * np.log(e_l) * 1e-12)
+def _mono_window_np(bt: np.ndarray, band_lambda: float, ndvi: np.ndarray, cmask: np.ndarray | None = None) -> np.ndarray:
+    # Same operations order as in the xarray path, but evaluated in place
+    bt_c = np.subtract(bt, 273.15)  # to Celsius
+
+    p_v = np.subtract(ndvi, _NDVI_S)
+    p_v /= _NDVI_V - _NDVI_S
+    p_v **= 2
+
+    e_l = _E_V * p_v
+    p_v *= -1
+    p_v += 1
+    p_v *= _E_S
+    e_l += p_v
+    e_l += _C
+    with np.errstate(invalid="ignore"):
+        np.putmask(e_l, ndvi < _NDVI_S, _E_S)
+        np.putmask(e_l, ndvi < 0, _E_W)  # ndvi < 0 indicates water
+        np.putmask(e_l, ndvi > _NDVI_V, _E_V)
+    np.log(e_l, out=e_l)
+
+    lst = np.multiply(band_lambda, bt_c, dtype=np.result_type(bt_c, e_l))
+    lst /= _P
+    lst *= e_l
+    lst *= 1e-12
+    lst += 1
+    np.divide(bt_c, lst, out=lst)
     if cmask is not None:
-        lst[cmask == 0] = np.nan
+        np.putmask(lst, cmask == 0, np.nan)
     return lst
 
 
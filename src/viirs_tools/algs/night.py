@@ -1,7 +1,7 @@
 import numpy as np
 import xarray as xr
 
-from viirs_tools.utils.types import ArrayLike, _check_data
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
 
 
 def naive(refband: ArrayLike, btband: ArrayLike) -> ArrayLike:
@@ -20,6 +20,109 @@ def naive(refband: ArrayLike, btband: ArrayLike) -> ArrayLike:
     """
     _check_data(refband, btband)
 
+    if not _is_xr(refband, btband):
+        return np.where(np.isnan(btband), np.nan, np.isnan(refband))
+
     bmask = ~xr.ufuncs.isnan(btband)
     rmask = xr.ufuncs.isnan(refband)
     return xr.where(bmask, rmask, np.nan)
+
+
+def solar(solza: ArrayLike, threshold: float = 90.0) -> ArrayLike:
+    """Get night mask from solar zenith angle, e.g. read with read_solza or computed
+    with solar_zenith, so no reflectance band is required
+
+    Args:
+        solza : solar zenith angle, degrees
+        threshold : pixels with the solar zenith angle above it are night ones, degrees
+
+    Returns:
+        Integer mask, 1 means night state, 0 means day state,
+            Can contain NaN values in case of missing solar zenith angle
+    """
+    _check_data(solza)
+
+    if _is_xr(solza):
+        return xr.where(xr.ufuncs.isnan(solza), np.nan, solza > threshold)
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(solza), np.nan, solza > threshold)
+
+
+def solar_zenith(lat: ArrayLike, lon: ArrayLike, time: np.datetime64 | np.ndarray, step: int = 8) -> ArrayLike:
+    """Vectorised solar zenith angle, NOAA general solar position (Spencer series),
+    accurate to ~0.1 deg, which is well enough for the day/night mask
+
+    Args:
+        lat : latitudes, degrees
+        lon : longitudes, degrees, same shape as lat
+        time : UTC time as np.datetime64, scalar or broadcastable to lat,
+            e.g. (rows, 1) scan times
+        step : angle is computed at every step-th pixel of the last two axes
+            (and the last ones) and linearly interpolated in between,
+            pixels next to the missing tie points are computed exactly
+
+    Returns:
+        Solar zenith angle, degrees, NaN where lat or lon is missing
+    """
+    _check_data(lat, lon)
+
+    full = [np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)]
+    t = np.asarray(time, dtype="datetime64[ms]")
+    full.append(t.reshape((1,) * (full[0].ndim - t.ndim) + t.shape))
+    values = full
+    if step > 1:
+        rows, cols = (np.unique(np.append(np.arange(0, n, step), n - 1)) for n in full[0].shape[-2:])
+        # time is kept unbroadcast, e.g. (rows, 1) scan times
+        values = [v[..., rows, :] if v.shape[-2] > 1 else v for v in values]
+        values = [v[..., cols] if v.shape[-1] > 1 else v for v in values]
+    out = _solar_zenith(*values)
+    if step > 1:
+        out = _upsample(_upsample(out, rows, np.arange(np.shape(lat)[-2]), axis=-2), cols, np.arange(np.shape(lat)[-1]), axis=-1)
+        # pixels interpolated from the missing tie points are computed exactly,
+        # missing pixels between the tie points stay missing
+        missing = np.isnan(full[0]) | np.isnan(full[1])
+        gaps = np.isnan(out) & ~missing
+        if gaps.any():
+            out[gaps] = _solar_zenith(*(np.broadcast_to(v, out.shape)[gaps] for v in full))
+        out[missing] = np.nan
+
+    if _is_xr(lat, lon):
+        like = lat if _is_xr(lat) else lon
+        return xr.DataArray(out, dims=like.dims, coords=like.coords)
+    return out
+
+
+def _solar_zenith(lat: np.ndarray, lon: np.ndarray, time: np.ndarray) -> np.ndarray:
+    days = (time - time.astype("datetime64[Y]")) / np.timedelta64(1, "D")
+    minutes = (time - time.astype("datetime64[D]")) / np.timedelta64(1, "m")
+    gamma = 2 * np.pi / 365 * (days - 0.5)  # fractional year
+
+    eqtime = 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma) - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
+    )
+    decl = (
+        0.006918
+        - 0.399912 * np.cos(gamma)
+        + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma)
+        + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma)
+        + 0.00148 * np.sin(3 * gamma)
+    )
+    hour_angle = np.radians((minutes + eqtime + 4 * lon) / 4 - 180)
+
+    lat = np.radians(lat)
+    cos_zenith = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    return np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+
+def _upsample(coarse: np.ndarray, at: np.ndarray, to: np.ndarray, axis: int) -> np.ndarray:
+    # Linear interpolation of the values at the increasing positions along the axis
+    if len(at) == 1:
+        return np.repeat(coarse, len(to), axis=axis)
+    k = np.clip(np.searchsorted(at, to, side="right") - 1, 0, len(at) - 2)
+    w = (to - at[k]) / (at[k + 1] - at[k])
+    shape = [1] * coarse.ndim
+    shape[axis] = -1
+    w = w.reshape(shape)
+    return np.take(coarse, k, axis=axis) * (1 - w) + np.take(coarse, k + 1, axis=axis) * w
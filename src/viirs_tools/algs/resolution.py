@@ -0,0 +1,142 @@
+from collections.abc import Callable
+
+import numpy as np
+import xarray as xr
+
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
+
+# Nominal VIIRS geometry: each M-band pixel covers 2x2 I-band pixels,
+# e.g. 1536x6400 I-band and 768x3200 M-band granules
+FACTOR = 2
+
+
+def i_to_m(data: ArrayLike, how: str = "nanmean") -> ArrayLike:
+    """Aggregate I-band resolution data into M-band resolution by 2x2 blocks
+    Blocks are strided views of the input, no copies are made before the reduction
+
+    Args:
+        data : I-band data, last two axes are the image ones and have to be even
+        how : block reduction
+            'mean' : mean, NaN if any pixel of the block is NaN
+            'nanmean' : mean of the not NaN pixels, NaN if there are none
+            'majority' : most common value of the binary (0/1) mask, ties go to 0
+                (cloud for the cloud masks), NaN pixels are skipped
+            'any', 'all' : 1 if any/all of the not NaN pixels are nonzero, 0 otherwise,
+                NaN if there are none; boolean input gives boolean output
+
+    Returns:
+        M-band resolution data, spatial coordinates of DataArray input are dropped
+    """
+    _check_data(data)
+    if how not in _REDUCERS:
+        raise ValueError(f"Unknown reduction '{how}', expected one of {sorted(_REDUCERS)}")
+
+    values = np.asarray(data)
+    if values.ndim < 2 or values.shape[-2] % FACTOR or values.shape[-1] % FACTOR:
+        raise ValueError(f"Shape {values.shape} is not of I-band resolution, last two axes have to be even")
+    out = _REDUCERS[how](_blocks(values))
+
+    if _is_xr(data):
+        return _like(out, data)
+    return out
+
+
+def m_to_i(data: ArrayLike) -> ArrayLike:
+    """Replicate M-band resolution data into I-band resolution, each pixel into 2x2 block
+
+    Args:
+        data : M-band data, last two axes are the image ones
+
+    Returns:
+        I-band resolution data, spatial coordinates of DataArray input are dropped
+    """
+    _check_data(data)
+
+    values = np.asarray(data)
+    if values.ndim < 2:
+        raise ValueError(f"Shape {values.shape} has no image axes")
+    out = np.empty((*values.shape[:-2], values.shape[-2] * FACTOR, values.shape[-1] * FACTOR), dtype=values.dtype)
+    # Single pass broadcast assignment into the blocked view of the output
+    out.reshape(*values.shape[:-2], values.shape[-2], FACTOR, values.shape[-1], FACTOR)[...] = values[..., :, None, :, None]
+
+    if _is_xr(data):
+        return _like(out, data)
+    return out
+
+
+def _blocks(values: np.ndarray) -> list[np.ndarray]:
+    # Strided views of the pixels at each position inside the 2x2 blocks
+    return [values[..., i::FACTOR, j::FACTOR] for i in range(FACTOR) for j in range(FACTOR)]
+
+
+def _like(out: np.ndarray, data: xr.DataArray) -> xr.DataArray:
+    coords = {name: coord for name, coord in data.coords.items() if not set(coord.dims) & set(data.dims[-2:])}
+    return xr.DataArray(out, dims=data.dims, coords=coords, attrs=data.attrs)
+
+
+def _mean(blocks: list[np.ndarray]) -> np.ndarray:
+    out = np.add(blocks[0], blocks[1], dtype=np.result_type(blocks[0], np.float32))
+    for block in blocks[2:]:
+        out += block
+    out /= len(blocks)
+    return out
+
+
+def _valid_count(blocks: list[np.ndarray]) -> np.ndarray:
+    count = np.zeros(blocks[0].shape, dtype=np.uint8)
+    for block in blocks:
+        count += ~np.isnan(block)
+    return count
+
+
+def _nanmean(blocks: list[np.ndarray]) -> np.ndarray:
+    out = np.zeros(blocks[0].shape, dtype=np.result_type(blocks[0], np.float32))
+    for block in blocks:
+        np.add(out, block, out=out, where=~np.isnan(block))
+    count = _valid_count(blocks)
+    with np.errstate(invalid="ignore"):
+        out /= count
+    return out
+
+
+def _count_nonzero(blocks: list[np.ndarray]) -> np.ndarray:
+    # NaN compares unequal, so it would count as nonzero otherwise
+    count = np.zeros(blocks[0].shape, dtype=np.uint8)
+    for block in blocks:
+        count += (block != 0) & ~np.isnan(block)
+    return count
+
+
+def _majority(blocks: list[np.ndarray]) -> np.ndarray:
+    if blocks[0].dtype == bool:
+        return _count_nonzero(blocks) * 2 > len(blocks)
+    count = _valid_count(blocks)
+    return np.where(count == 0, np.nan, _count_nonzero(blocks) * 2 > count)
+
+
+def _any(blocks: list[np.ndarray]) -> np.ndarray:
+    if blocks[0].dtype == bool:
+        out = blocks[0].copy()
+        for block in blocks[1:]:
+            out |= block
+        return out
+    return np.where(_valid_count(blocks) == 0, np.nan, _count_nonzero(blocks) > 0)
+
+
+def _all(blocks: list[np.ndarray]) -> np.ndarray:
+    if blocks[0].dtype == bool:
+        out = blocks[0].copy()
+        for block in blocks[1:]:
+            out &= block
+        return out
+    count = _valid_count(blocks)
+    return np.where(count == 0, np.nan, _count_nonzero(blocks) == count)
+
+
+_REDUCERS: dict[str, Callable[[list[np.ndarray]], np.ndarray]] = {
+    "mean": _mean,
+    "nanmean": _nanmean,
+    "majority": _majority,
+    "any": _any,
+    "all": _all,
+}
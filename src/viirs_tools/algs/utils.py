@@ -1,6 +1,9 @@
+from collections.abc import Callable, Sequence
+
+import numpy as np
 import xarray as xr
 
-from viirs_tools.utils.types import ArrayLike, _check_data
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
 
 
 def merge_day_night(day: ArrayLike, night: ArrayLike, nmask: ArrayLike) -> ArrayLike:
@@ -16,4 +19,67 @@ def merge_day_night(day: ArrayLike, night: ArrayLike, nmask: ArrayLike) -> Array
     """
     _check_data(day, night, nmask)
 
-    return xr.where(nmask == 0, day, night)
+    if _is_xr(day, night, nmask):
+        return xr.where(nmask == 0, day, night)
+    return np.where(nmask == 0, day, night)
+
+
+def run_day_night(
+    day_alg: Callable[..., ArrayLike],
+    night_alg: Callable[..., ArrayLike],
+    nmask: ArrayLike,
+    day_args: Sequence[ArrayLike],
+    night_args: Sequence[ArrayLike],
+) -> ArrayLike:
+    """Compute day and night products only over their own pixels and merge them,
+    the same as merge_day_night(day_alg(*day_args), night_alg(*night_args), nmask)
+    Day (nmask == 0) and night (others) pixels of each scene are compacted into (1, n)
+    arrays for the algs, results are scattered back. Single-regime scenes are passed as is,
+    the alg of the absent regime is not called at all.
+    Algs have to be pixel-wise, apart from per-scene reductions over the last two axes,
+    which see only the pixels of their regime (e.g. I03 maximum of vibcm_day)
+
+    Args:
+        day_alg : day product alg, e.g. cloud.vibcm_day
+        night_alg : night product alg, e.g. cloud.vifcm_night
+        nmask : night mask of the data shape, as returned by night.naive
+        day_args : data arguments of day_alg, of the nmask shape
+        night_args : data arguments of night_alg, of the nmask shape
+
+    Returns:
+        Merged product
+    """
+    _check_data(nmask, *day_args, *night_args)
+
+    like = next((a for a in (nmask, *day_args, *night_args) if _is_xr(a)), None)
+    nm = np.asarray(nmask)
+    day_args = [np.asarray(a) for a in day_args]
+    night_args = [np.asarray(a) for a in night_args]
+    is_day = nm == 0
+
+    scenes = []
+    for i in np.ndindex(nm.shape[:-2]):
+        day = _run_compact(day_alg, day_args, i, is_day[i])
+        night = _run_compact(night_alg, night_args, i, ~is_day[i])
+        scenes.append((i, day, night))
+
+    results = [r for _, day, night in scenes for r in (day, night) if r is not None]
+    out = np.full(nm.shape, np.nan, dtype=np.result_type(*results) if results else np.float64)
+    for i, day, night in scenes:
+        for pixels, res in ((is_day[i], day), (~is_day[i], night)):
+            if res is not None:
+                out[i][pixels] = res.ravel() if res.shape != pixels.shape else res[pixels]
+
+    if like is not None:
+        return xr.DataArray(out, dims=like.dims, coords=like.coords)
+    return out
+
+
+def _run_compact(alg: Callable, args: list[np.ndarray], i: tuple[int, ...], pixels: np.ndarray) -> np.ndarray | None:
+    # Scene result of the data shape if all pixels are of the regime, compacted (1, n) one otherwise
+    count = np.count_nonzero(pixels)
+    if count == 0:
+        return None
+    if count == pixels.size:
+        return np.asarray(alg(*(a[i] for a in args)))
+    return np.asarray(alg(*(a[i][pixels][None] for a in args)))
@@ -1,7 +1,7 @@
 import numpy as np
 import xarray as xr
 
-from viirs_tools.utils.types import ArrayLike, _check_data
+from viirs_tools.utils.types import ArrayLike, _check_data, _is_xr
 
 
 def water_bodies_day(ri1: ArrayLike, ri2: ArrayLike, ri3: ArrayLike) -> ArrayLike:
@@ -23,4 +23,6 @@ def water_bodies_day(ri1: ArrayLike, ri2: ArrayLike, ri3: ArrayLike) -> ArrayLik
 
     mask = (ri1 > ri2) & (ri2 > ri3)
 
-    return 1 - xr.where(xr.ufuncs.isnan(ri1), np.nan, mask)
+    if _is_xr(ri1, ri2, ri3):
+        return 1 - xr.where(xr.ufuncs.isnan(ri1), np.nan, mask)
+    return np.where(np.isnan(ri1), np.nan, ~mask)
@@ -1,8 +1,16 @@
+import asyncio
 import os
+import shutil
 import subprocess as sp
-from collections.abc import Callable
-from concurrent.futures import ProcessPoolExecutor
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from viirs_tools.assimilator.store import GranuleStore
 
 
 def _test_cmrfetch():
@@ -37,37 +45,101 @@ def _get_data_for_interval(
         geobox : bounding box for selecting granules for format information check cmrfetch docs
         dconc : number of concurrently downloading connections
     """
-    snames = ""
-    for i in names:
-        snames += f"-s {i} "
     x = 1
     cnt = 0
     while x != 0:
         # really rough solution, timeouts are handled by cmrfetch
         # so they cannot be recognized as runtime error below
         # TODO: cmrfetch output analysis for re-downloading failed files
-        fetch_cli = [
-            "cmrfetch",
-            "granules",
-            str(snames),
-            "-t",
-            str(start_d),
-            ",",
-            str(end_d),
-            "--bounding-box",
-            str(geobox),
-            "--download",
-            str(path),
-            "--download-concurrency",
-            str(dconc),
-        ]
-        r = sp.run(fetch_cli, check=True)
+        r = sp.run(_fetch_cli(path, start_d, end_d, names, geobox, dconc), check=True)
         x = r.returncode
         cnt += 1
         if cnt == 5:
             raise RuntimeError(f"Cannot download data for {start_d},{end_d}")
 
 
+def _fetch_cli(path: str, start_d: str, end_d: str, names: list[str], geobox: str, dconc: int) -> list[str]:
+    """cmrfetch command downloading the interval"""
+    snames = ""
+    for i in names:
+        snames += f"-s {i} "
+    return [
+        "cmrfetch",
+        "granules",
+        str(snames),
+        "-t",
+        str(start_d),
+        ",",
+        str(end_d),
+        "--bounding-box",
+        str(geobox),
+        "--download",
+        str(path),
+        "--download-concurrency",
+        str(dconc),
+    ]
+
+
+def _dir_size(path: str) -> int:
+    """Total size of the files under the directory, bytes"""
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:  # removed meanwhile
+                pass
+    return size
+
+
+def _free_bytes(path: str) -> int:
+    return shutil.disk_usage(path).free
+
+
+def _release(pending: dict[Future, int], done: Iterable[Future]):
+    """Forget the finished callbacks, re-raising their errors"""
+    for future in list(done):
+        pending.pop(future)
+        future.result()
+
+
+def _wait_for_space(pending: dict[Future, int], path: str, expected: int, max_bytes: int, min_free_bytes: int):
+    """Block until the next interval fits into the byte budget and keeps the free space floor
+    Bytes of the interval are released when its callback finishes
+
+    Args:
+        pending : downloaded bytes by the callback of the interval
+        path : path for saving downloaded files
+        expected : expected size of the next interval, the size of the last one
+        max_bytes : budget of the downloaded, not yet consumed bytes, 0 means unlimited
+        min_free_bytes : free space floor of the disk, 0 means none
+    """
+    while True:
+        _release(pending, [f for f in pending if f.done()])
+        if not _is_throttled(sum(pending.values()), not pending, path, expected, max_bytes, min_free_bytes):
+            return
+        wait(pending, return_when=FIRST_COMPLETED)
+
+
+def _is_throttled(pending_bytes: int, idle: bool, path: str, expected: int, max_bytes: int, min_free_bytes: int) -> bool:
+    """Check whether fetching of the next interval has to wait for the callbacks
+
+    Args:
+        pending_bytes : downloaded bytes not yet consumed by the callbacks
+        idle : no callbacks are running, so no space will be released
+        path : path for saving downloaded files
+        expected : expected size of the next interval
+        max_bytes : budget of the pending bytes, 0 means unlimited
+        min_free_bytes : free space floor of the disk, 0 means none
+    """
+    over_budget = max_bytes > 0 and pending_bytes + expected > max_bytes
+    low_space = min_free_bytes > 0 and _free_bytes(path) - expected < min_free_bytes
+    if idle and low_space:
+        raise RuntimeError(f"Free space of {path} is below {min_free_bytes} bytes with no callbacks to release it")
+    # the single interval above the budget is still fetched when idle
+    return not idle and (over_budget or low_space)
+
+
 def assimilate(
     names: list[str],
     geobox: str,
@@ -78,6 +150,9 @@ def assimilate(
     max_queue: int = 0,
     assim_callback: Callable[[str], None] = (lambda path: None),
     dconc: int = 4,
+    max_bytes: int = 0,
+    min_free_bytes: int = 0,
+    store: "GranuleStore | None" = None,
 ):
     """Performs data assimilation - download it using cmrfetch
     per day intervals and then perform callback function
@@ -95,8 +170,18 @@ def assimilate(
             tasks, used for downloading throttling
             (for avoiding disk filling)
         assim_callback : callback to perform
-            on the each set of data per single day
+            on the each set of data per single day,
+            e.g. compact.Compactor for the built-in compression
         dconc : number of concurrently downloading connections
+        max_bytes : budget of the downloaded bytes not yet consumed
+            by the callbacks, fetching is paused while the next interval
+            (expected to be as large as the last one) would exceed it,
+            0 means unlimited
+        min_free_bytes : free space floor of the disk, fetching is paused
+            while the next interval would go below it, 0 means none
+        store : shared granule store, day directories are populated
+            by hardlinks from it and only the missing collections
+            are downloaded, see store.GranuleStore
     """
     _test_cmrfetch()
 
@@ -107,7 +192,9 @@ def assimilate(
         os.mkdir(path)
 
     with ProcessPoolExecutor(max_workers=workers) as executor:
-        futures = []
+        # downloaded bytes by the callback of the interval
+        pending: dict[Future, int] = {}
+        last_size = 0
         cur_d = end_d
         next_d = end_d + timedelta(days=1)
         while cur_d >= start_d:
@@ -115,17 +202,207 @@ def assimilate(
             next_d_s = next_d.strftime("%Y-%m-%d")
             step_path = os.path.join(path, f"{cur_d_s}")
 
-            _get_data_for_interval(step_path, cur_d_s, next_d_s, names, geobox, dconc)
+            # Throttling data downloading by the disk bytes
+            _wait_for_space(pending, path, last_size, max_bytes, min_free_bytes)
+
+            if store is None:
+                _get_data_for_interval(step_path, cur_d_s, next_d_s, names, geobox, dconc)
+            else:
+                store.fetch(step_path, cur_d_s, next_d_s, names, geobox, dconc)
+            last_size = _dir_size(step_path)
 
             task = executor.submit(assim_callback, step_path)
-            futures.append(task)
+            pending[task] = last_size
 
             next_d = cur_d
             cur_d -= timedelta(days=1)
 
-            # Throttling data downloading
-            if len(futures) > max_queue:
-                while len(futures) > max_queue:
-                    futures = [f for f in futures if not f.done()]
-                    if len(futures) != 0:
-                        futures[0].result()
+            # Throttling data downloading by the number of callbacks
+            while len(pending) > max_queue:
+                _release(pending, wait(pending, return_when=FIRST_COMPLETED).done)
+
+
+@dataclass
+class IntervalResult:
+    """Result of the single interval of assimilate_async"""
+
+    day: str
+    path: str
+    result: Any = None
+    fetch_s: float = 0.0
+    callback_s: float = 0.0
+    nbytes: int = 0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+async def _get_data_for_interval_async(
+    path: str,
+    start_d: str,
+    end_d: str,
+    names: list[str],
+    geobox: str,
+    dconc: int = 4,
+):
+    """Download the interval with the cmrfetch subprocess awaited without blocking the event loop,
+    retried up to 5 times, see _get_data_for_interval
+    """
+    for _ in range(5):
+        process = await asyncio.create_subprocess_exec(*_fetch_cli(path, start_d, end_d, names, geobox, dconc))
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            # closed stream, cmrfetch must not keep downloading into the day directory
+            await _stop_process(process)
+            raise
+        if returncode == 0:
+            return
+    raise RuntimeError(f"Cannot download data for {start_d},{end_d}")
+
+
+async def _stop_process(process: asyncio.subprocess.Process, timeout: float = 5.0):
+    """Terminate the subprocess, killing it if it does not exit within the timeout"""
+    if process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+def _timed_call(callback: Callable[[str], Any], path: str) -> tuple[Any, float, str]:
+    """Run the callback in the worker, errors are returned as strings, so they are always picklable"""
+    t = time.perf_counter()
+    try:
+        return callback(path), time.perf_counter() - t, ""
+    except Exception as e:  # noqa: BLE001
+        return None, time.perf_counter() - t, f"{type(e).__name__}: {e}"
+
+
+async def assimilate_async(
+    names: list[str],
+    geobox: str,
+    start_d: datetime,
+    end_d: datetime,
+    path: str,
+    workers: int,
+    max_queue: int = 0,
+    assim_callback: Callable[[str], Any] | None = None,
+    dconc: int = 4,
+    max_bytes: int = 0,
+    min_free_bytes: int = 0,
+    store: "GranuleStore | None" = None,
+) -> AsyncIterator[IntervalResult]:
+    """Asynchronous assimilate yielding the results of the intervals as they complete
+    cmrfetch runs as the awaited subprocess and callbacks in the worker processes, so
+    the event loop is not blocked; the next interval is fetched while the callbacks
+    of the previous ones run, with the same throttling as of assimilate.
+    Fetch and callback errors are reported in the results, the stream goes on
+
+    async for interval in assimilate_async(names, geobox, start_d, end_d, path, 4, assim_callback=Compactor()):
+        print(interval.day, interval.ok, interval.result)
+
+    Args:
+        names : shortnames for desired collections
+        geobox: bounding box for selecting granules
+        start_d : start of the time selection interval (including)
+        end_d : end of the time selection interval (excluding)
+        path : path for saving downloaded files
+        workers : max num of the processes performing callbacks
+        max_queue : max num of the running callbacks, 2 * workers by default
+        assim_callback : picklable callback to perform on the each
+            set of data per single day, its return value is the result
+        dconc : number of concurrently downloading connections
+        max_bytes : budget of the downloaded bytes not yet consumed by the callbacks
+        min_free_bytes : free space floor of the disk
+        store : shared granule store, see store.GranuleStore
+
+    Yields:
+        Results of the intervals in the order of completion
+    """
+    await asyncio.to_thread(_test_cmrfetch)
+
+    if max_queue == 0:
+        max_queue = 2 * workers
+
+    if not os.path.exists(path):
+        os.mkdir(path)
+
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def _consume(executor: ProcessPoolExecutor, interval: IntervalResult):
+        if assim_callback is not None:
+            t = time.perf_counter()
+            try:
+                interval.result, interval.callback_s, interval.error = await loop.run_in_executor(
+                    executor, _timed_call, assim_callback, interval.path
+                )
+            except Exception as e:  # noqa: BLE001, worker crash
+                interval.callback_s, interval.error = time.perf_counter() - t, f"{type(e).__name__}: {e}"
+        await results.put(interval)
+
+    async def _produce(executor: ProcessPoolExecutor):
+        # downloaded bytes by the callback task of the interval
+        pending: dict[asyncio.Task, int] = {}
+        last_size = 0
+        try:
+            cur_d = end_d
+            next_d = end_d + timedelta(days=1)
+            while cur_d >= start_d:
+                cur_d_s = cur_d.strftime("%Y-%m-%d")
+                next_d_s = next_d.strftime("%Y-%m-%d")
+                interval = IntervalResult(cur_d_s, os.path.join(path, f"{cur_d_s}"))
+                next_d = cur_d
+                cur_d -= timedelta(days=1)
+
+                # Throttling data downloading by the disk bytes and the number of callbacks
+                while True:
+                    pending = {task: size for task, size in pending.items() if not task.done()}
+                    throttled = _is_throttled(sum(pending.values()), not pending, path, last_size, max_bytes, min_free_bytes)
+                    if not throttled and len(pending) < max_queue:
+                        break
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                t = time.perf_counter()
+                try:
+                    if store is None:
+                        await _get_data_for_interval_async(interval.path, cur_d_s, next_d_s, names, geobox, dconc)
+                    else:
+                        await store.fetch_async(interval.path, cur_d_s, next_d_s, names, geobox, dconc)
+                except Exception as e:  # noqa: BLE001
+                    interval.fetch_s, interval.error = time.perf_counter() - t, f"{type(e).__name__}: {e}"
+                    await results.put(interval)
+                    continue
+                interval.fetch_s = time.perf_counter() - t
+                interval.nbytes = last_size = _dir_size(interval.path)
+                pending[asyncio.create_task(_consume(executor, interval))] = last_size
+
+            if pending:
+                await asyncio.wait(pending)
+            await results.put(done)
+        except BaseException as e:
+            for task in pending:
+                task.cancel()
+            await results.put(e)
+            raise
+
+    # Not a context manager, its exit would block the event loop until the callbacks finish
+    executor = ProcessPoolExecutor(max_workers=workers)
+    producer = asyncio.create_task(_produce(executor))
+    try:
+        while (item := await results.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # the stream is closed early or failed, queued callbacks are dropped
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        executor.shutdown(wait=False, cancel_futures=True)
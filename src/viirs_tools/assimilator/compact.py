@@ -0,0 +1,315 @@
+import fnmatch
+import os
+import re
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from netCDF4 import Dataset, default_fillvals  # require netcdf4 being installed, not NetCDF4
+from numpy import ma
+
+from viirs_tools.assimilator import reading_helpers as rh
+
+COMPACT_SUFFIX = ".compact.nc"
+
+# Variables kept by default, by file pattern of the collection, names are paths
+# inside the file as read by the reading module
+DEFAULT_VARIABLES: dict[str, tuple[str, ...]] = {
+    "*02IMG*": (
+        "Reflectance_I1",
+        "Reflectance_I2",
+        "Reflectance_I3",
+        "BrightnessTemperature_I4",
+        "BrightnessTemperature_I5",
+    ),
+    "*03MOD*": ("Latitude", "Longitude", "SolarZenithAngle"),
+    "*CLDMSK*": ("geophysical_data/Integer_Cloud_Mask", "geophysical_data/Clear_Sky_Confidence"),
+}
+
+# Quantised values are uint16, the largest one is the fill value
+_LEVELS = 65534
+_FILL = np.uint16(65535)
+_TIMESTAMP = re.compile(r"A\d{7}\.\d{4}")
+
+
+@dataclass
+class CompactReport:
+    """Result of compacting the single source file"""
+
+    source: str
+    output: str | None = None
+    ok: bool = False
+    deleted: bool = False
+    bytes_in: int = 0
+    bytes_out: int = 0
+    error: str = ""
+
+
+class Compactor:
+    """Callback of assimilate converting a day of downloaded granules into compact files
+    Each file matching the variables patterns is replaced by <name>.compact.nc with the
+    selected variables of the area window: float ones quantised to uint16 with the
+    scale_factor/add_offset attributes, integer ones copied as is, all chunked and
+    zlib-compressed. The output is read back and compared with the source before
+    the source is deleted, so a failed conversion keeps the original file.
+    Compact files are read with read_compact or netCDF4 with its default auto scaling
+
+    Instances are picklable, so they could be passed to assimilate as is:
+    assimilate(..., assim_callback=Compactor(bbox=(23.1, 51.2, 32.8, 56.2), workers=4))
+
+    Args:
+        variables : kept variables by file pattern, see DEFAULT_VARIABLES
+        bbox : area as (lon_min, lat_min, lon_max, lat_max), degrees, the whole swath
+            is kept if not given. The window of the swath covering the area is found from
+            the geolocation file of the same timestamp and scaled to the resolution of
+            each file, e.g. 2x for I-band files with M-band geolocation, granules outside
+            of the area are deleted without output
+        geo_pattern : pattern of the geolocation files with Latitude and Longitude
+        quantize : (scale, offset) by variable name, the range of the data is used
+            for the others, so the error is at most half of the scale
+        complevel : zlib compression level
+        chunks : chunk shape of the variables
+        workers : number of processes compacting granules of different timestamps
+        delete : delete the verified source files
+    """
+
+    def __init__(
+        self,
+        variables: Mapping[str, Sequence[str]] | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        geo_pattern: str = "*03MOD*",
+        quantize: Mapping[str, tuple[float, float]] | None = None,
+        complevel: int = 4,
+        chunks: tuple[int, int] = (256, 256),
+        workers: int = 1,
+        delete: bool = True,
+    ):
+        self.variables = {k: tuple(v) for k, v in (DEFAULT_VARIABLES if variables is None else variables).items()}
+        self.bbox = None if bbox is None else tuple(bbox)
+        self.geo_pattern = geo_pattern
+        self.quantize = dict(quantize or {})
+        self.complevel = complevel
+        self.chunks = tuple(chunks)
+        self.workers = workers
+        self.delete = delete
+
+    def __call__(self, path: str) -> list[CompactReport]:
+        """Compact the files of the directory, e.g. a day downloaded by assimilate
+
+        Args:
+            path : directory with the source files
+
+        Returns:
+            Reports of the compacted files
+        """
+        sets: dict[str, list[str]] = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(COMPACT_SUFFIX) or self._variables_of(name) is None:
+                continue
+            ts = _TIMESTAMP.search(name)
+            sets.setdefault(ts[0] if ts else name, []).append(os.path.join(path, name))
+
+        if self.workers > 1 and len(sets) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self.compact_set, sets.values()))
+        else:
+            results = [self.compact_set(files) for files in sets.values()]
+        return [report for reports in results for report in reports]
+
+    def compact_set(self, files: Sequence[str]) -> list[CompactReport]:
+        """Compact the files of the single timestamp, sharing the area window
+
+        Args:
+            files : source files
+
+        Returns:
+            Reports of the files
+        """
+        window = None
+        if self.bbox is not None:
+            geo = next((f for f in files if fnmatch.fnmatch(os.path.basename(f), self.geo_pattern)), None)
+            if geo is None:
+                return [CompactReport(f, error="No geolocation file for the area subset") for f in files]
+            try:
+                window, geo_shape = _area_window(geo, self.bbox)
+            except Exception as e:  # noqa: BLE001
+                return [CompactReport(f, error=f"{type(e).__name__}: {e}") for f in files]
+            if window is None:
+                # nothing of the area, nothing to keep
+                reports = [CompactReport(f, ok=True, bytes_in=os.path.getsize(f)) for f in files]
+                for report in reports:
+                    if self.delete:
+                        os.remove(report.source)
+                        report.deleted = True
+                return reports
+            window = (window, geo_shape)
+        return [self.compact_file(f, window) for f in files]
+
+    def compact_file(self, source: str, window: tuple | None = None) -> CompactReport:
+        """Compact the single file, verify and delete it
+
+        Args:
+            source : source file
+            window : ((row0, row1, col0, col1), geo shape) of the area, whole swath if not given
+
+        Returns:
+            Compacting report, failures are reported, not raised
+        """
+        report = CompactReport(source, bytes_in=os.path.getsize(source))
+        output = os.path.splitext(source)[0] + COMPACT_SUFFIX
+        try:
+            names = self._variables_of(os.path.basename(source))
+            with Dataset(source, "r") as file:
+                data = {name: _read_variable(file, name) for name in names}
+            if window is not None:
+                data = {name: _subset(values, *window) for name, values in data.items()}
+            _write(output, data, self.quantize, self.complevel, self.chunks, os.path.basename(source))
+            _verify(output, data)
+            report.output, report.bytes_out, report.ok = output, os.path.getsize(output), True
+        except Exception as e:  # noqa: BLE001
+            report.error = f"{type(e).__name__}: {e}"
+            if os.path.exists(output):
+                os.remove(output)
+            return report
+        if self.delete:
+            os.remove(source)
+            report.deleted = True
+        return report
+
+    def _variables_of(self, name: str) -> tuple[str, ...] | None:
+        return next((v for pattern, v in self.variables.items() if fnmatch.fnmatch(name, pattern)), None)
+
+
+def read_compact(path: str) -> dict[str, ma.MaskedArray]:
+    """Read all variables of the compact file
+
+    Args:
+        path : file written by Compactor
+
+    Returns:
+        Variables by their paths in the source file, dequantised, as masked arrays
+    """
+    data = {}
+    with Dataset(path, "r") as file:
+        for name in _variable_paths(file):
+            data[name] = file[name][:]
+    return data
+
+
+def _variable_paths(group, prefix: str = "") -> list[str]:
+    paths = [prefix + name for name in group.variables]
+    for name, sub in group.groups.items():
+        paths += _variable_paths(sub, f"{prefix}{name}/")
+    return paths
+
+
+def _read_variable(file: Dataset, name: str) -> ma.MaskedArray:
+    # SDR-style Scale/Offset variables are read as by the reading module,
+    # the others with the netCDF4 auto masking and scaling
+    group_path, _, var = name.rpartition("/")
+    group = file[group_path] if group_path else file
+    if "FILL_TEST_VALUE" in group.variables[var].ncattrs():
+        return ma.asarray(rh.read_so_data(var, group))
+    return ma.asarray(group.variables[var][:])
+
+
+def _area_window(geo: str, bbox: tuple[float, float, float, float]) -> tuple[tuple[int, int, int, int] | None, tuple[int, int]]:
+    lon_min, lat_min, lon_max, lat_max = bbox
+    with Dataset(geo, "r") as file:
+        lat, lon = rh.read_lat(file), rh.read_lon(file)
+    inside = ma.filled((lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max), False)
+    rows, cols = np.flatnonzero(inside.any(axis=1)), np.flatnonzero(inside.any(axis=0))
+    if not len(rows):
+        return None, lat.shape
+    return (int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1), lat.shape
+
+
+def _subset(values: ma.MaskedArray, window: tuple[int, int, int, int], geo_shape: tuple[int, int]) -> ma.MaskedArray:
+    # Window of the geolocation resolution scaled to the resolution of the values
+    if values.ndim != 2 or values.shape[0] % geo_shape[0] or values.shape[1] % geo_shape[1]:
+        raise ValueError(f"Swath of shape {values.shape} does not match the geolocation of shape {geo_shape}")
+    k_rows, k_cols = values.shape[0] // geo_shape[0], values.shape[1] // geo_shape[1]
+    row0, row1, col0, col1 = window
+    return values[row0 * k_rows : row1 * k_rows, col0 * k_cols : col1 * k_cols]
+
+
+def _quantization(values: ma.MaskedArray, scale_offset: tuple[float, float] | None) -> tuple[float, float]:
+    if scale_offset is not None:
+        return float(scale_offset[0]), float(scale_offset[1])
+    # range of the valid values only, NaN and inf are written as missing ones
+    valid = ma.getdata(values)[~_missing(values)]
+    if not valid.size:
+        return 1.0, 0.0
+    lo, hi = float(valid.min()), float(valid.max())
+    return (hi - lo) / _LEVELS or 1.0, lo
+
+
+def _write(
+    path: str,
+    data: Mapping[str, ma.MaskedArray],
+    quantize: Mapping[str, tuple[float, float]],
+    complevel: int,
+    chunks: tuple[int, ...],
+    source: str,
+):
+    with Dataset(path, "w") as file:
+        file.setncattr("source", source)
+        for name, values in data.items():
+            if values.ndim != 2:
+                raise ValueError(f"Only 2D variables are compacted, '{name}' is {values.ndim}D")
+            group_path, _, var = name.rpartition("/")
+            group = file.createGroup(group_path) if group_path else file
+            dims = tuple(f"{d}_{n}" for d, n in zip(("number_of_lines", "number_of_pixels"), values.shape, strict=True))
+            for dim, n in zip(dims, values.shape, strict=True):
+                if dim not in file.dimensions:
+                    file.createDimension(dim, n)
+            chunksizes = tuple(max(1, min(c, n)) for c, n in zip(chunks, values.shape, strict=True))
+            kwargs = {"zlib": True, "complevel": complevel, "shuffle": True, "chunksizes": chunksizes}
+
+            if values.dtype.kind in "iu":
+                fill = _int_fill(values) if ma.getmaskarray(values).any() else None
+                variable = group.createVariable(var, values.dtype, dims, fill_value=fill, **kwargs)
+                variable[:] = values
+                continue
+            scale, offset = _quantization(values, quantize.get(var, quantize.get(name)))
+            with np.errstate(invalid="ignore"):  # invalid user quantisation is caught by _verify
+                packed = np.clip(np.rint((ma.getdata(values) - offset) / scale), 0, _LEVELS)
+                packed = np.where(_missing(values), _FILL, packed).astype(np.uint16)
+            variable = group.createVariable(var, np.uint16, dims, fill_value=_FILL, **kwargs)
+            variable.set_auto_maskandscale(False)
+            variable.setncatts({"scale_factor": scale, "add_offset": offset})
+            variable[:] = packed
+
+
+def _missing(values: ma.MaskedArray) -> np.ndarray:
+    mask = ma.getmaskarray(values)
+    if values.dtype.kind == "f":
+        mask = mask | ~np.isfinite(ma.getdata(values))
+    return mask
+
+
+def _int_fill(values: ma.MaskedArray) -> int:
+    # Fill value of the source if it fits the dtype, netCDF default one otherwise
+    info = np.iinfo(values.dtype)
+    fill = values.fill_value
+    return int(fill) if info.min <= fill <= info.max else int(default_fillvals[values.dtype.str[1:]])
+
+
+def _verify(path: str, data: Mapping[str, ma.MaskedArray]):
+    # Written values are compared with the source ones within the quantisation error
+    with Dataset(path, "r") as file:
+        for name, values in data.items():
+            variable = file[name]
+            written = variable[:]
+            mask = _missing(values)
+            if written.shape != values.shape or not np.array_equal(ma.getmaskarray(written), mask):
+                raise ValueError(f"Verification of '{name}' failed: missing values differ")
+            kept = ma.getdata(written)[~mask].astype(np.float64)
+            if not np.isfinite(kept).all():
+                raise ValueError(f"Verification of '{name}' failed: non-finite values written")
+            diff = np.abs(kept - ma.getdata(values)[~mask])
+            tolerance = variable.scale_factor / 2 * (1 + 1e-6) if "scale_factor" in variable.ncattrs() else 0
+            # NaN errors or tolerance fail the check, unlike the comparison of the maximum
+            if not np.all(diff <= tolerance):
+                raise ValueError(f"Verification of '{name}' failed: error {np.max(diff)} is above {tolerance}")
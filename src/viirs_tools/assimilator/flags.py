@@ -0,0 +1,111 @@
+from collections.abc import Iterator, Mapping
+
+import numpy as np
+
+# Flag name -> (first bit, bit count, inverted), bits are numbered from the least significant
+# bit of the first byte, flags do not cross byte boundaries. Inverted flags are stored
+# as 0 = yes in the product and decoded as 1 = yes
+Flags = dict[str, tuple[int, int, bool]]
+
+# CLDMSK_L2 Cloud_Mask bytes, MOD35 heritage bit assignment of the MVCM
+CLOUD_MASK_FLAGS: Flags = {
+    "determined": (0, 1, False),
+    "confidence": (1, 2, False),  # 0 confident cloudy, 1 probably cloudy, 2 probably clear, 3 confident clear
+    "day": (3, 1, False),
+    "sunglint": (4, 1, True),
+    "snow_ice": (5, 1, True),
+    "surface": (6, 2, False),  # 0 water, 1 coastal, 2 desert, 3 land
+    "heavy_aerosol": (8, 1, True),
+    "thin_cirrus_solar": (9, 1, True),
+    "shadow": (10, 1, True),
+    "thin_cirrus_ir": (11, 1, True),
+    "adjacent_cloud": (12, 1, True),
+    "cloud_ir_threshold": (13, 1, True),
+    "high_cloud_co2": (14, 1, True),
+    "high_cloud_6_7": (15, 1, True),
+    "high_cloud_1_38": (16, 1, True),
+    "high_cloud_3_7_12": (17, 1, True),
+    "cloud_ir_difference": (18, 1, True),
+    "cloud_3_7_11": (19, 1, True),
+    "cloud_visible": (20, 1, True),
+    "cloud_visible_ratio": (21, 1, True),
+    "clear_ndvi_restoral": (22, 1, True),
+    "cloud_night_7_3_11": (23, 1, True),
+}
+
+# CLDMSK_L2 Quality_Assurance bytes
+QA_FLAGS: Flags = {
+    "useful": (0, 1, False),
+    "confidence": (1, 3, False),
+}
+
+
+class BitFlags(Mapping):
+    """Lazily decoded flag planes of the packed per-pixel bytes, e.g. CLDMSK_L2 Cloud_Mask
+    Each flag is decoded on its first access with in-place shift and mask of its uint8
+    byte plane and cached, other flags are not materialised
+
+    Args:
+        data : packed bytes, signed bytes are reinterpreted as unsigned ones
+        flags : flags of the bytes, see CLOUD_MASK_FLAGS
+        axis : byte axis of data, e.g. 0 for Cloud_Mask and -1 for Quality_Assurance
+    """
+
+    def __init__(self, data: np.ndarray, flags: Flags = CLOUD_MASK_FLAGS, axis: int = 0):
+        data = np.asarray(data)
+        if data.dtype.itemsize != 1 or data.dtype.kind not in "iub":
+            raise TypeError(f"Packed flags have to be bytes, got {data.dtype}")
+        self.data = np.moveaxis(data.view(np.uint8), axis, 0)
+        for name, (bit, width, _) in flags.items():
+            if bit % 8 + width > 8 or bit // 8 >= len(self.data):
+                raise ValueError(f"Flag '{name}' bits {bit}..{bit + width - 1} are out of the bytes")
+        self.flags = dict(flags)
+        self._planes: dict[str, np.ndarray] = {}
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the flag planes"""
+        return self.data.shape[1:]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Get uint8 plane of the flag value"""
+        if name not in self._planes:
+            bit, width, inverted = self.flags[name]
+            plane = self.decode(bit, width, inverted)
+            plane.flags.writeable = False
+            self._planes[name] = plane
+        return self._planes[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.flags)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def mask(self, name: str) -> np.ndarray:
+        """Get bool view of the single bit flag plane"""
+        if self.flags[name][1] != 1:
+            raise ValueError(f"Flag '{name}' is not a single bit one")
+        return self[name].view(np.bool_)
+
+    def decode(self, bit: int, width: int = 1, inverted: bool = False) -> np.ndarray:
+        """Decode bits not listed in the flags
+
+        Args:
+            bit : first bit, numbered from the least significant bit of the first byte
+            width : bit count, bits do not cross byte boundaries
+            inverted : decode 0 as 1 and vice versa
+
+        Returns:
+            uint8 plane of the value
+        """
+        mask = (1 << width) - 1
+        plane = np.right_shift(self.data[bit // 8], bit % 8)
+        plane &= mask
+        if inverted:
+            plane ^= mask
+        return plane
+
+    def unpack(self) -> np.ndarray:
+        """Get all bits, (bytes * 8, *shape) uint8 array, bit i is the i-th bit as numbered in the flags"""
+        return np.unpackbits(self.data, axis=0, bitorder="little")
@@ -0,0 +1,260 @@
+from collections.abc import Iterable, Mapping, Sequence
+
+import numpy as np
+
+from viirs_tools.mosaic import SCAN_ROWS
+
+EARTH_RADIUS_M = 6371008.8
+
+# First columns of the sample aggregation zones and of the second half of the scan
+# by swath width (M-bands, I-bands): pixel size changes there, so both neighbours are tie-points,
+# the latter also brackets the azimuth flip at nadir
+AGGREGATION_EDGES = {3200: (640, 1008, 1600, 2192, 2560), 6400: (1280, 2016, 3200, 4384, 5120)}
+
+# Kinds of the interpolated fields: positions are interpolated as unit vectors,
+# azimuths as (cos, sin) pairs, so neither wraps around the antimeridian or +-180 deg,
+# other fields, e.g. zenith angles, linearly
+_POSITION = ("lat", "lon")
+_AZIMUTHS = ("solaa", "sataa")
+
+
+class TiePointGeolocation:
+    """Geolocation of the swath compressed to tie-points, interpolated on demand
+    Each scan keeps its first and last rows at every step-th column, the last one and
+    both sides of the AGGREGATION_EDGES of the full VIIRS swath. Values inside the scan
+    are bilinear interpolations of its tie-points, scans are not interpolated across,
+    so bow-tie overlaps are kept
+
+    Missing pixels (masked or NaN) are kept as their flat indices and are NaN in the
+    interpolated values. Valid pixels interpolated from a missing tie-point are kept
+    exactly, so missing values neither spread over the tie-point cells nor get made up
+
+    Interpolation error of the field f is bounded by
+    step**2 / 8 * max|d2f/dcol2| + (scan_rows - 1)**2 / 8 * max|d2f/drow2|,
+    i.e. by the curvature of the geolocation within the scan. It is measured over the
+    whole granule on compression and kept in max_error: metres for the position, as the
+    distance of the interpolated (not normalised) unit vectors, so slightly above the actual
+    error, and degrees for the angles. On the modelled VIIRS M-band swath it is about 120 m
+    with step 8 and 30 m with step 4, at the swath edges, below the pixel size there;
+    tie-points take 1/40 of the memory of the full fields with step 8. Error is measured
+    over the valid pixels
+
+    Args:
+        ties : tie-point values by component, (scans, 2, columns) arrays, see from_full
+        fields : names of the fields, 'lat', 'lon' and angles
+        columns : tie-point columns, increasing, the first is 0 and the last is width - 1
+        shape : (rows, width) of the swath
+        scan_rows : rows of the single scan
+        max_error : measured interpolation error by 'position' and angle field names
+        missing : increasing flat indices of the missing pixels by component
+        exact : (increasing flat indices, values) of the pixels kept exactly by component
+    """
+
+    def __init__(
+        self,
+        ties: Mapping[str, np.ndarray],
+        fields: Sequence[str],
+        columns: np.ndarray,
+        shape: tuple[int, int],
+        scan_rows: int,
+        max_error: Mapping[str, float] | None = None,
+        missing: Mapping[str, np.ndarray] | None = None,
+        exact: Mapping[str, tuple[np.ndarray, np.ndarray]] | None = None,
+    ):
+        self.ties = dict(ties)
+        self.fields = list(fields)
+        self.columns = np.asarray(columns)
+        self.shape = tuple(shape)
+        self.scan_rows = scan_rows
+        self.max_error = dict(max_error or {})
+        self.missing = dict(missing or {})
+        self.exact = dict(exact or {})
+
+    @classmethod
+    def from_full(
+        cls,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        angles: Mapping[str, np.ndarray] | None = None,
+        resolution: str = "m",
+        step: int = 8,
+    ) -> "TiePointGeolocation":
+        """Compress full resolution geolocation
+
+        Args:
+            lat : swath latitudes, degrees, masked or NaN values are missing
+            lon : swath longitudes, degrees
+            angles : other fields, e.g. solza, solaa, satza, sataa as read by read_npp_vmaes_l1
+            resolution : 'i' or 'm', defines rows per scan
+            step : columns between the tie-points
+
+        Returns:
+            Geolocation with the measured max_error
+        """
+        if resolution not in SCAN_ROWS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {sorted(SCAN_ROWS)}")
+        scan_rows = SCAN_ROWS[resolution]
+        fields = {"lat": _filled(lat), "lon": _filled(lon), **{name: _filled(v) for name, v in (angles or {}).items()}}
+        shape = fields["lat"].shape
+        if any(v.shape != shape for v in fields.values()):
+            raise ValueError("Geolocation fields have different shapes")
+        if len(shape) != 2 or shape[0] % scan_rows:
+            raise ValueError(f"Swath shape {shape} is not of whole scans of {scan_rows} rows")
+
+        columns = np.arange(0, shape[1], step)
+        if shape[1] in AGGREGATION_EDGES:
+            edges = np.array(AGGREGATION_EDGES[shape[1]])
+            columns = np.concatenate([columns, edges - 1, edges])
+        columns = np.unique(np.append(columns, shape[1] - 1))
+        scans = shape[0] // scan_rows
+        components = _to_components(fields)
+        ties = {name: v.reshape(scans, scan_rows, -1)[:, [0, -1]][..., columns] for name, v in components.items()}
+        geo = cls(ties, list(fields), columns, shape, scan_rows)
+
+        # Components of the field share the missing pixels, e.g. x, y, z of the position
+        missing, exact = {}, {p: ([], []) for p in components}
+        for parts in _parts(fields).values():
+            invalid = np.logical_or.reduce([np.isnan(components[p]) for p in parts])
+            indices = np.flatnonzero(invalid)
+            missing.update((p, indices) for p in parts)
+
+        # Measured error of the whole granule, window by window of scans, compared as
+        # components: chord of the unit vectors is the distance for the small errors.
+        # Valid pixels interpolated from the missing tie-points are recorded on the way
+        errors: dict[str, float] = {}
+        for r0 in range(0, shape[0], 64 * scan_rows):
+            rows = slice(r0, min(r0 + 64 * scan_rows, shape[0]))
+            window = geo._interpolate(rows, slice(None), components)
+            for name, parts in _parts(fields).items():
+                invalid = np.logical_or.reduce([np.isnan(components[p][rows]) for p in parts])
+                gaps = np.logical_or.reduce([np.isnan(window[p]) for p in parts]) & ~invalid
+                indices = np.flatnonzero(gaps) + r0 * shape[1]
+                for p in parts:
+                    exact[p][0].append(indices)
+                    exact[p][1].append(components[p][rows][gaps])
+                    window[p][gaps] = components[p][rows][gaps]
+                    window[p][invalid] = np.nan
+                diff = np.sqrt(sum((window[p] - components[p][rows]) ** 2 for p in parts))
+                if name == "position":
+                    diff *= EARTH_RADIUS_M
+                elif name in _AZIMUTHS:
+                    diff = np.degrees(2 * np.arcsin(np.minimum(diff / 2, 1)))
+                errors[name] = max(errors.get(name, 0.0), _nanmax(diff))
+        geo.max_error = errors
+        geo.missing = missing
+        geo.exact = {p: (np.concatenate(indices), np.concatenate(values)) for p, (indices, values) in exact.items()}
+        return geo
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the tie-points, missing and exactly kept pixels"""
+        shared = {id(v): v.nbytes for v in self.missing.values()}
+        return sum(v.nbytes for v in self.ties.values()) + sum(shared.values()) + sum(i.nbytes + v.nbytes for i, v in self.exact.values())
+
+    def window(self, rows: slice = slice(None), cols: slice = slice(None), names: Sequence[str] | None = None) -> dict[str, np.ndarray]:
+        """Interpolate full resolution values of the swath window
+
+        Args:
+            rows : swath rows, slice with step 1
+            cols : swath columns, slice with step 1
+            names : fields to interpolate, all by default
+
+        Returns:
+            float64 arrays of the window by field name
+        """
+        names = self.fields if names is None else list(names)
+        parts = _parts(names)
+        values = self._interpolate(rows, cols, [p for name in parts for p in parts[name]])
+
+        out = {}
+        if "position" in parts:
+            out["lat"], out["lon"] = _from_xyz(values["x"], values["y"], values["z"])
+        for name in names:
+            if name in _AZIMUTHS:
+                out[name] = np.degrees(np.arctan2(values[f"{name}_sin"], values[f"{name}_cos"]))
+            elif name not in _POSITION:
+                out[name] = values[name]
+        return {name: out[name] for name in names}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Interpolate the whole field"""
+        return self.window(names=[name])[name]
+
+    def _interpolate(self, rows: slice, cols: slice, components: Iterable[str]) -> dict[str, np.ndarray]:
+        r0, r1, step = rows.indices(self.shape[0])
+        c = np.arange(*cols.indices(self.shape[1]))
+        if step != 1:
+            raise ValueError("Window rows have to be a slice with step 1")
+
+        # Tie-point rows are interpolated along the scan, then scans along the track
+        s0, s1 = r0 // self.scan_rows, max(r0, r1 - 1) // self.scan_rows + 1
+        t = (np.arange(self.scan_rows) / (self.scan_rows - 1))[:, None]
+        k = np.clip(np.searchsorted(self.columns, c, side="right") - 1, 0, len(self.columns) - 2)
+        u = (c - self.columns[k]) / (self.columns[k + 1] - self.columns[k])
+
+        out = {}
+        for name in components:
+            tie = self.ties[name][s0:s1]
+            edges = tie[..., k] * (1 - u) + tie[..., k + 1] * u
+            scans = edges[:, :1] * (1 - t) + edges[:, 1:] * t
+            out[name] = values = scans.reshape(-1, len(c))[r0 - s0 * self.scan_rows : r1 - s0 * self.scan_rows]
+            if name in self.exact:
+                indices, exact = self.exact[name]
+                at, where = self._select(indices, r0, r1, c)
+                values[at] = exact[where]
+            if name in self.missing:
+                values[self._select(self.missing[name], r0, r1, c)[0]] = np.nan
+        return out
+
+    def _select(self, indices: np.ndarray, r0: int, r1: int, c: np.ndarray) -> tuple[tuple[np.ndarray, np.ndarray], np.ndarray]:
+        # Window positions of the pixels given by the increasing flat indices,
+        # and positions of the pixels within the indices
+        width = self.shape[1]
+        lo, hi = np.searchsorted(indices, [r0 * width, r1 * width])
+        rows, cols = np.divmod(indices[lo:hi], width)
+        inside = (cols >= c[0]) & (cols <= c[-1]) if len(c) else np.zeros(len(cols), bool)
+        return (rows[inside] - r0, cols[inside] - c[0]), lo + np.flatnonzero(inside)
+
+
+def _parts(names: Iterable[str]) -> dict[str, tuple[str, ...]]:
+    # Interpolated components of the fields, lat and lon share the position
+    parts: dict[str, tuple[str, ...]] = {}
+    for name in names:
+        if name in _POSITION:
+            parts["position"] = ("x", "y", "z")
+        elif name in _AZIMUTHS:
+            parts[name] = (f"{name}_cos", f"{name}_sin")
+        else:
+            parts[name] = (name,)
+    return parts
+
+
+def _filled(values: np.ndarray) -> np.ndarray:
+    return np.asarray(np.ma.filled(values, np.nan), dtype=np.float64)
+
+
+def _to_xyz(lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)
+
+
+def _from_xyz(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def _to_components(fields: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+    x, y, z = _to_xyz(fields["lat"], fields["lon"])
+    components = {"x": x, "y": y, "z": z}
+    for name, values in fields.items():
+        if name in _AZIMUTHS:
+            components[f"{name}_cos"] = np.cos(np.radians(values))
+            components[f"{name}_sin"] = np.sin(np.radians(values))
+        elif name not in _POSITION:
+            components[name] = values
+    return components
+
+
+def _nanmax(values: np.ndarray) -> float:
+    valid = values[~np.isnan(values)]
+    return float(valid.max()) if valid.size else 0.0
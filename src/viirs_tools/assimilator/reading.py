@@ -2,6 +2,8 @@ from netCDF4 import Dataset  # require netcdf4 being installed, not NetCDF4
 from numpy import ma
 
 from viirs_tools.assimilator import reading_helpers as rh
+from viirs_tools.assimilator.flags import CLOUD_MASK_FLAGS, QA_FLAGS, BitFlags
+from viirs_tools.assimilator.geolocation import TiePointGeolocation
 
 
 def read_npp_viaes_l1(path: str) -> dict[str, ma.MaskedArray]:
@@ -71,17 +73,48 @@ def read_npp_vmaes_l1(
     return data, geo
 
 
-def read_npp_cldmsk_l2(path: str) -> dict[str, ma.MaskedArray]:
+def read_npp_vmaes_geo(path: str, step: int = 8) -> TiePointGeolocation:
+    """Read geo-reference of the VIIRS M-band imagery product (VMAES_L1)
+    compressed to tie-points, see TiePointGeolocation
+
+    Args:
+        path : path to the desired file
+        step : columns between the tie-points
+
+    Returns:
+        Geolocation with lat, lon, solza, solaa, satza, sataa fields
+    """
+    with Dataset(path, "r") as mfile:
+        lat = rh.read_lat(mfile)
+        lon = rh.read_lon(mfile)
+        angles = {
+            "solza": rh.read_solza(mfile),
+            "solaa": rh.read_solaa(mfile),
+            "satza": rh.read_satza(mfile),
+            "sataa": rh.read_sataa(mfile),
+        }
+    return TiePointGeolocation.from_full(lat, lon, angles, resolution="m", step=step)
+
+
+def read_npp_cldmsk_l2(path: str, flags: bool = False) -> dict[str, ma.MaskedArray | BitFlags]:
     """Read VIIRS Cloud Mask product (CLDMSK_L2)
 
     Args:
         path : path to the desired file
+        flags : also read packed Cloud_Mask and Quality_Assurance bytes
 
     Returns:
-        Datasets clear_conf and integer cloud mask as masked np-arrays
+        Datasets clear_conf and integer cloud mask as masked np-arrays,
+            with flags also cloud_mask_flags and qa_flags as lazily decoded BitFlags
     """
     data = {}
     with Dataset(path, "r") as file:
-        data["clear_conf"] = file.groups["geophysical_data"].variables["Clear_Sky_Confidence"][::]
-        data["cloud_mask"] = file.groups["geophysical_data"].variables["Integer_Cloud_Mask"][::]
+        group = file.groups["geophysical_data"]
+        data["clear_conf"] = group.variables["Clear_Sky_Confidence"][::]
+        data["cloud_mask"] = group.variables["Integer_Cloud_Mask"][::]
+        if flags:
+            packed, axis = rh.read_packed("Cloud_Mask", group)
+            data["cloud_mask_flags"] = BitFlags(packed, CLOUD_MASK_FLAGS, axis=axis)
+            packed, axis = rh.read_packed("Quality_Assurance", group)
+            data["qa_flags"] = BitFlags(packed, QA_FLAGS, axis=axis)
     return data
@@ -40,6 +40,23 @@ def read_so_data(name: str, file: Dataset) -> ma.MaskedArray:
     return _get_masked(ref, float(thr)) * scale + offset
 
 
+def read_packed(name: str, file: Dataset) -> tuple[np.ndarray, int]:
+    """Read packed bytes as is, without masking and scaling
+
+    Args:
+        name : name of the desired dataset
+        file : file-like object or group, created with netCDF4
+
+    Returns:
+        (bytes, byte axis), the byte axis is the one not along the swath
+    """
+    variable = file.variables[name]
+    variable.set_auto_maskandscale(False)
+    swath = ("number_of_lines", "number_of_pixels")
+    axis = next((i for i, dim in enumerate(variable.dimensions) if dim not in swath), 0)
+    return np.asarray(variable[:]), axis
+
+
 # Wrappers for handy extracting different types of data
 
 
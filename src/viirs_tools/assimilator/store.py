@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+import uuid
+from collections.abc import Sequence
+
+from viirs_tools.assimilator import assimilator
+
+try:
+    from xxhash import xxh3_128 as _new_hash
+except ImportError:  # cache extra is not installed, SHA-256 is the fastest of hashlib with SHA extensions
+    from hashlib import sha256 as _new_hash
+
+_CHUNK = 2**22
+
+
+class GranuleStore:
+    """Content-addressed local store of the downloaded granules shared by assimilation runs
+    Each granule is kept once as objects/<checksum[:2]>/<checksum>, read-only, and day
+    directories of the runs get hardlinks to it named by the granule ID (file name).
+    Link count of the object is its reference count: deleting the file of the day
+    directory, e.g. by the callback, only drops the reference, and collect removes
+    the objects no run links to. Store and day directories have to be on the same filesystem
+
+    Downloaded granules are recorded by the query key of the collection, bounding box
+    and interval, so a later run with the same query links the granules without running
+    cmrfetch, and only the collections missing from the store are fetched. Granules of
+    different queries are deduplicated by the checksum
+
+    cmrfetch does not report timeouts as errors, so a download could be partial. Empty
+    downloads are not recorded, records expire after max_age, so a truncated one is not
+    linked forever, and invalidate drops the record on demand
+
+    Args:
+        root : store directory
+        max_age : seconds the query record is used for, None keeps records until invalidated
+    """
+
+    def __init__(self, root: str, max_age: float | None = 86400.0):
+        self.root = root
+        self.max_age = max_age
+        for name in ("objects", "queries", "staging"):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    @staticmethod
+    def query_key(name: str, geobox: str, start_d: str, end_d: str) -> str:
+        """Get key of the single collection query"""
+        return hashlib.sha256(f"{name}\n{geobox}\n{start_d}\n{end_d}".encode()).hexdigest()
+
+    def object_path(self, checksum: str) -> str:
+        """Get path of the stored granule"""
+        return os.path.join(self.root, "objects", checksum[:2], checksum)
+
+    def refcount(self, checksum: str) -> int:
+        """Get number of the links to the stored granule outside of the store"""
+        return os.stat(self.object_path(checksum)).st_nlink - 1
+
+    def add(self, path: str) -> str:
+        """Move the file into the store, replacing it with a hardlink to the stored granule
+
+        Args:
+            path : granule file, already stored content is deduplicated
+
+        Returns:
+            Checksum of the granule
+        """
+        checksum = _checksum(path)
+        target = self.object_path(checksum)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        try:
+            # atomic, concurrent runs adding the same content keep the first copy
+            os.link(path, target)
+        except FileExistsError:
+            os.remove(path)
+            os.link(target, path)
+        return checksum
+
+    def lookup(self, key: str) -> dict[str, str] | None:
+        """Get granules of the recorded query
+
+        Args:
+            key : query key, see query_key
+
+        Returns:
+            Checksums by granule ID, None if the query is not recorded, the record
+                is expired or any of its granules is no longer stored
+        """
+        try:
+            with open(self._query_path(key)) as file:
+                record = json.load(file)
+        except FileNotFoundError:
+            return None
+        if self.max_age is not None and time.time() - record["recorded"] > self.max_age:
+            return None
+        granules = record["granules"]
+        if not all(os.path.exists(self.object_path(c)) for c in granules.values()):
+            return None
+        return granules
+
+    def record(self, key: str, granules: dict[str, str]):
+        """Record granules of the query, replacing the previous record atomically"""
+        path = self._query_path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}"
+        with open(tmp, "w") as file:
+            json.dump({"recorded": time.time(), "granules": granules}, file)
+        os.replace(tmp, path)
+
+    def invalidate(self, name: str, geobox: str, start_d: str, end_d: str) -> bool:
+        """Drop the record of the collection query, so the next fetch downloads it again
+
+        Returns:
+            Whether the query was recorded
+        """
+        try:
+            os.remove(self._query_path(self.query_key(name, geobox, start_d, end_d)))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def link(self, granules: dict[str, str], path: str):
+        """Hardlink the stored granules into the directory by their IDs"""
+        os.makedirs(path, exist_ok=True)
+        for granule_id, checksum in granules.items():
+            target = os.path.join(path, granule_id)
+            if not os.path.exists(target):
+                os.link(self.object_path(checksum), target)
+
+    def fetch(self, path: str, start_d: str, end_d: str, names: Sequence[str], geobox: str, dconc: int = 4) -> dict[str, str]:
+        """Populate the day directory, downloading only the collections missing from the store
+        Drop-in replacement of the download of assimilate
+
+        Args:
+            path : day directory
+            start_d : start of the time selection interval (including)
+            end_d : end of the time selection interval (excluding)
+            names : shortnames for desired collections
+            geobox : bounding box for selecting granules
+            dconc : number of concurrently downloading connections
+
+        Returns:
+            Checksums of the day granules by ID
+        """
+        granules, missing = self._recorded(start_d, end_d, names, geobox)
+        if missing:
+            staging = self._staging()
+            try:
+                assimilator._get_data_for_interval(staging, start_d, end_d, missing, geobox, dconc)
+                granules.update(self._add_staged(staging, start_d, end_d, missing, geobox))
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self.link(granules, path)
+        return granules
+
+    async def fetch_async(self, path: str, start_d: str, end_d: str, names: Sequence[str], geobox: str, dconc: int = 4) -> dict[str, str]:
+        """Asyncio variant of fetch, used by assimilate_async
+        cmrfetch is an awaited subprocess terminated on cancellation, file operations run in a thread
+        """
+        granules, missing = await asyncio.to_thread(self._recorded, start_d, end_d, names, geobox)
+        if missing:
+            staging = self._staging()
+            try:
+                await assimilator._get_data_for_interval_async(staging, start_d, end_d, missing, geobox, dconc)
+                granules.update(await asyncio.to_thread(self._add_staged, staging, start_d, end_d, missing, geobox))
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        await asyncio.to_thread(self.link, granules, path)
+        return granules
+
+    def collect(self) -> int:
+        """Remove granules no run links to
+
+        Returns:
+            Freed bytes
+        """
+        freed = 0
+        objects = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects):
+            for checksum in os.listdir(os.path.join(objects, prefix)):
+                path = os.path.join(objects, prefix, checksum)
+                info = os.stat(path)
+                if info.st_nlink == 1:
+                    os.remove(path)
+                    freed += info.st_size
+        return freed
+
+    def _recorded(self, start_d: str, end_d: str, names: Sequence[str], geobox: str) -> tuple[dict[str, str], list[str]]:
+        # Granules of the recorded collections and names of the missing ones
+        granules: dict[str, str] = {}
+        missing = []
+        for name in names:
+            found = self.lookup(self.query_key(name, geobox, start_d, end_d))
+            if found is None:
+                missing.append(name)
+            else:
+                granules.update(found)
+        return granules, missing
+
+    def _staging(self) -> str:
+        return os.path.join(self.root, "staging", uuid.uuid4().hex)
+
+    def _add_staged(self, staging: str, start_d: str, end_d: str, missing: Sequence[str], geobox: str) -> dict[str, str]:
+        # Store the downloaded granules and record the collections with any of them
+        granules: dict[str, str] = {}
+        downloaded: dict[str, dict[str, str]] = {name: {} for name in missing}
+        for granule_id in sorted(os.listdir(staging)) if os.path.isdir(staging) else []:
+            checksum = self.add(os.path.join(staging, granule_id))
+            granules[granule_id] = checksum
+            # granule IDs start with the collection shortname
+            name = next((n for n in missing if granule_id.startswith(n)), None)
+            if name is not None:
+                downloaded[name][granule_id] = checksum
+        for name, found in downloaded.items():
+            # nothing downloaded is more likely a failed fetch than an empty day
+            if found:
+                self.record(self.query_key(name, geobox, start_d, end_d), found)
+        return granules
+
+    def _query_path(self, key: str) -> str:
+        return os.path.join(self.root, "queries", f"{key}.json")
+
+
+def _checksum(path: str) -> str:
+    h = _new_hash()
+    with open(path, "rb") as file:
+        while chunk := file.read(_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,341 @@
+import functools
+import importlib
+import importlib.util
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from viirs_tools.utils.enums import AlgEnum
+
+logger = logging.getLogger(__name__)
+
+# Backend names, 'auto' policy picks the fastest one by the calibration
+BACKEND_NAMES = ("reference", "numpy", "blocked", "numba")
+AUTO = "auto"
+
+
+@dataclass(frozen=True)
+class CallInfo:
+    """Inputs of the alg call the backend is chosen by
+
+    Args:
+        kind : 'xarray' if any of the arguments is xr.DataArray, 'numpy' otherwise
+        dtype : dtype of the first array argument
+        size : size of the first array argument
+        lazy : any of the DataArrays is dask-backed
+    """
+
+    kind: str
+    dtype: str
+    size: int
+    lazy: bool = False
+
+
+@dataclass(frozen=True)
+class Backend:
+    """Implementation of the alg with its capabilities
+    Inputs the backend does not take natively are adapted, so any backend runs any call
+
+    Args:
+        name : backend name, one of BACKEND_NAMES
+        path : '<module>.<function>' of the implementation inside viirs_tools.algs
+        numpy : takes np.ndarray natively, otherwise inputs are wrapped into DataArrays
+        xarray : takes xr.DataArray natively, otherwise inputs are unwrapped and
+            the result is wrapped like the first DataArray
+        lazy : keeps dask-backed DataArrays lazy, only such backends run lazy calls
+        out : takes out= argument, otherwise the result is copied into out
+        dtypes : input dtypes the backend is compiled for, any if None
+        requires : optional dependency, the backend is unavailable without it
+        blocked : implementation runs over row blocks with BlockExecutor
+    """
+
+    name: str
+    path: str
+    numpy: bool = True
+    xarray: bool = True
+    lazy: bool = False
+    out: bool = False
+    dtypes: tuple[str, ...] | None = None
+    requires: str | None = None
+    blocked: bool = False
+
+    @property
+    def available(self) -> bool:
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+    def supports(self, call: CallInfo) -> bool:
+        """Check if the backend can run the call"""
+        return self.available and (self.lazy or not call.lazy) and (self.dtypes is None or call.dtype in self.dtypes)
+
+    def load(self) -> Callable:
+        """Get the implementation, importing its module"""
+        return _load(self.path, self.blocked)
+
+    def __call__(self, *args: Any, out: Any = None, **kwargs: Any) -> Any:
+        impl = self.load()
+        call = describe(args, kwargs)
+        if call.kind == "xarray" and not self.xarray:
+            like = next(a for a in (*args, *kwargs.values()) if _is_dataarray(a))
+            result = _wrap_like(impl(*[_unwrap(a) for a in args], **{k: _unwrap(v) for k, v in kwargs.items()}), like)
+        elif call.kind == "numpy" and not self.numpy:
+            result = impl(*[_wrap(a) for a in args], **{k: _wrap(v) for k, v in kwargs.items()}).values
+        elif out is not None and self.out:
+            return impl(*args, out=out, **kwargs)
+        else:
+            result = impl(*args, **kwargs)
+        if out is None:
+            return result
+        out[...] = result
+        return out
+
+
+def make_backends(path: str, jit: str | None = None) -> dict[str, Backend]:
+    """Get backends of the alg
+
+    Args:
+        path : public alg path, dispatching DataArrays to the reference xarray
+            implementation and ndarrays to the NumPy one
+        jit : path of the numba kernel of the alg, if any
+
+    Returns:
+        Backends by name
+    """
+    backends = {
+        "reference": Backend("reference", path, numpy=False, lazy=True),
+        "numpy": Backend("numpy", path, xarray=False),
+        "blocked": Backend("blocked", path, blocked=True),
+    }
+    if jit is not None:
+        backends["numba"] = Backend("numba", jit, xarray=False, out=True, dtypes=("float32", "float64"), requires="numba")
+    return backends
+
+
+def describe(args: tuple, kwargs: Mapping[str, Any]) -> CallInfo:
+    """Get CallInfo of the alg arguments"""
+    arrays = [a for a in (*args, *kwargs.values()) if hasattr(a, "dtype") and hasattr(a, "shape")]
+    if not arrays:
+        raise ValueError("Alg call has no array arguments")
+    dataarrays = [a for a in arrays if _is_dataarray(a)]
+    return CallInfo(
+        kind="xarray" if dataarrays else "numpy",
+        dtype=str(arrays[0].dtype),
+        size=math.prod(arrays[0].shape),
+        lazy=any(a.chunks is not None for a in dataarrays),
+    )
+
+
+class Dispatcher:
+    """Alg implementation choosing the backend on each call
+    The chosen backend falls back to the reference one if it is unavailable
+    or cannot run the call, e.g. for dask-backed inputs
+
+    Args:
+        alg : alg enum member
+        backends : backends of the alg by name
+        policy : backend name, or 'auto' for the fastest one by the calibration
+        calibration : calibration of the 'auto' policy
+    """
+
+    def __init__(self, alg: AlgEnum, backends: Mapping[str, Backend], policy: str, calibration: "Calibration | None" = None):
+        if policy != AUTO and policy not in BACKEND_NAMES:
+            raise ValueError(f"Unknown backend '{policy}', expected one of {(AUTO, *BACKEND_NAMES)}")
+        self.alg = alg
+        self.backends = backends
+        self.policy = policy
+        self.calibration = Calibration() if calibration is None and policy == AUTO else calibration
+        # Wrapped public alg, for BlockExecutor scene-wide reductions and profiling names
+        functools.update_wrapper(self, backends["numpy"].load())
+
+    def select(self, call: CallInfo) -> Backend:
+        """Get backend of the call"""
+        if self.policy == AUTO:
+            return self.backends[self.calibration.best(self.alg, self.backends, call)]
+        backend = self.backends.get(self.policy)
+        if backend is None or not backend.supports(call):
+            logger.debug("%s backend of %s cannot run %s, using reference", self.policy, self.alg.name, call)
+            return self.backends["reference"]
+        return backend
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.select(describe(args, kwargs))(*args, **kwargs)
+
+
+def default_calibration_path() -> str:
+    """Get calibration file in the user cache directory"""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "viirs_tools", "backends.json")
+
+
+# Synthetic calibration inputs of the algs, (low, high) value ranges of the arguments, None is a binary mask
+_REF, _BT, _NDVI, _ZENITH, _MASK = (0.0, 40.0), (200.0, 330.0), (-0.3, 0.8), (0.0, 180.0), None
+_INPUTS: dict[str, tuple[tuple[float, float] | None, ...]] = {
+    "AlgsIndex.NDVI": (_REF, _REF),
+    "AlgsIndex.NDSI": (_REF, _REF),
+    "AlgsNight.NAIVE": (_REF, _BT),
+    "AlgsNight.SOLAR": (_ZENITH,),
+    "AlgsCloud.VIBCM_DAY": (_REF, _REF, _REF, _BT),
+    "AlgsCloud.VIFCM_DAY": (_REF, _REF, _BT),
+    "AlgsCloud.VIFCM_NIGHT": (_BT, _BT),
+    "AlgsLST.MONO_WINDOW_I05": (_BT, _NDVI),
+    "AlgsLST.MONO_WINDOW_M15": (_BT, _NDVI),
+    "AlgsLST.MONO_WINDOW_M16": (_BT, _NDVI),
+    "AlgsWater.WBODIES_DAY": (_REF, _REF, _REF),
+    "AlgsUtils.MERGE_DAY_NIGHT": (_REF, _BT, _MASK),
+}
+
+
+class Calibration:
+    """Fastest backends of the algs by input kind, dtype and size, measured with
+    micro-benchmarks on synthetic inputs. Each (alg, kind, dtype) is measured once,
+    on its first call, at all sizes and kept in the JSON file. The file is discarded
+    if the NumPy version, CPU count or available backends change
+
+    Args:
+        path : JSON file, default_calibration_path() by default
+        sizes : calibrated input sizes, pixels; calls use the nearest one in log scale
+        repeat : timed runs of each backend, the fastest counts
+    """
+
+    def __init__(self, path: str | None = None, sizes: tuple[int, ...] = (2**12, 2**16, 2**20), repeat: int = 3):
+        self.path = default_calibration_path() if path is None else path
+        self.sizes = tuple(sorted(sizes))
+        self.repeat = repeat
+        self._lock = threading.Lock()
+        self._results: dict[str, dict[str, dict[str, Any]]] = self._load()
+
+    def best(self, alg: AlgEnum, backends: Mapping[str, Backend], call: CallInfo) -> str:
+        """Get name of the fastest of the backends supporting the call, calibrating on the first use"""
+        key = self._key(alg, call.kind, call.dtype)
+        with self._lock:
+            if key not in self._results:
+                eager = CallInfo(call.kind, call.dtype, call.size)
+                candidates = {name: b for name, b in backends.items() if b.supports(eager)}
+                self._results[key] = self.measure(alg, candidates, call.kind, call.dtype)
+                self._save()
+            results = self._results[key]
+        size = min(self.sizes, key=lambda s: abs(math.log2(s) - math.log2(max(call.size, 1))))
+        timings = {name: t for name, t in results[str(size)].items() if name in backends and backends[name].supports(call)}
+        return min(timings, key=timings.get) if timings else "reference"
+
+    def measure(self, alg: AlgEnum, backends: Mapping[str, Backend], kind: str, dtype: str) -> dict[str, dict[str, float]]:
+        """Time the backends on synthetic inputs of all sizes
+
+        Returns:
+            Best time of each backend, seconds, by size
+        """
+        logger.info("Calibrating backends of %s for %s %s inputs", alg.name, kind, dtype)
+        results = {}
+        for size in self.sizes:
+            args = _synthetic(_INPUTS[_alg_name(alg)], size, kind, dtype)
+            results[str(size)] = {name: self._time(backend, args) for name, backend in backends.items()}
+        return results
+
+    def _time(self, backend: Backend, args: list) -> float:
+        backend(*args)  # imports, compilation and pools
+        best = math.inf
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            backend(*args)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def _key(self, alg: AlgEnum, kind: str, dtype: str) -> str:
+        return f"{_alg_name(alg)}/{kind}/{dtype}"
+
+    def _env(self) -> dict[str, Any]:
+        import numpy as np
+
+        numba = importlib.util.find_spec("numba") is not None
+        return {"numpy": np.__version__, "cpus": os.cpu_count(), "sizes": list(self.sizes), "numba": numba}
+
+    def _load(self) -> dict[str, dict[str, dict[str, Any]]]:
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if data.get("env") != self._env():
+            logger.info("Discarding calibration %s made in other environment", self.path)
+            return {}
+        return data["results"]
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as file:
+            json.dump({"env": self._env(), "results": self._results}, file, indent=1)
+        os.replace(tmp, self.path)
+
+
+def _alg_name(alg: AlgEnum) -> str:
+    return f"{type(alg).__name__}.{alg.name}"
+
+
+def _synthetic(ranges: tuple[tuple[float, float] | None, ...], size: int, kind: str, dtype: str) -> list:
+    import numpy as np
+    import xarray as xr
+
+    side = max(1, math.isqrt(size))
+    shape = (max(1, size // side), side)
+    rng = np.random.default_rng(0)
+    missing = rng.random(shape) < 0.2
+    args = []
+    for bounds in ranges:
+        if bounds is None:
+            arg = (rng.random(shape) < 0.5).astype(dtype)
+        else:
+            arg = rng.uniform(*bounds, shape).astype(dtype)
+            arg[missing] = np.nan
+        args.append(xr.DataArray(arg, dims=("y", "x")) if kind == "xarray" else arg)
+    return args
+
+
+_EXECUTOR = None
+
+
+def _blocked_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        from viirs_tools.executor import BlockExecutor
+
+        _EXECUTOR = BlockExecutor("thread")
+    return _EXECUTOR
+
+
+def _run_blocked(impl: Callable, *args: Any, **kwargs: Any) -> Any:
+    return _blocked_executor().run(impl, *args, **kwargs)
+
+
+@functools.cache
+def _load(path: str, blocked: bool) -> Callable:
+    module, _, name = path.rpartition(".")
+    impl = getattr(importlib.import_module(f"viirs_tools.algs.{module}"), name)
+    return functools.partial(_run_blocked, impl) if blocked else impl
+
+
+def _is_dataarray(value: Any) -> bool:
+    return type(value).__module__.startswith("xarray") and hasattr(value, "dims")
+
+
+def _unwrap(value: Any) -> Any:
+    return value.values if _is_dataarray(value) else value
+
+
+def _wrap(value: Any) -> Any:
+    if hasattr(value, "dtype") and hasattr(value, "shape") and not _is_dataarray(value):
+        import xarray as xr
+
+        return xr.DataArray(value)
+    return value
+
+
+def _wrap_like(result: Any, like: Any) -> Any:
+    import xarray as xr
+
+    return xr.DataArray(result, dims=like.dims, coords=like.coords)
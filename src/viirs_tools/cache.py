@@ -0,0 +1,212 @@
+import functools
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from viirs_tools.packed import PackedArray
+from viirs_tools.utils.enums import AlgEnum
+
+try:
+    from xxhash import xxh3_128 as _new_hash
+except ImportError:  # cache extra is not installed, SHA-256 is the fastest of hashlib with SHA extensions
+    from hashlib import sha256 as _new_hash
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+class ResultCache:
+    """Content-addressed cache of the alg results with byte-bounded LRU eviction
+    Key is the hash (XXH3 with the cache extra, SHA-256 otherwise) of the alg name, input buffers (with dtypes, shapes,
+    DataArray dims and coords) and the rest of the arguments, e.g. use_alt_thresholds,
+    so equal arrays hit the cache even if they are different objects.
+    Cached results are returned as is and are made read-only
+
+    Args:
+        max_bytes : memory budget of the cached results
+        disk_dir : directory of the optional disk tier, results are written through
+            and loaded back on memory misses, e.g. across sessions
+        disk_max_bytes : budget of the disk tier, least recently used files are removed,
+            0 means unlimited
+    """
+
+    def __init__(self, max_bytes: int = 2**30, disk_dir: str | None = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the cached results"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, name: str, args: tuple, kwargs: dict) -> str:
+        """Get cache key of the call"""
+        h = _new_hash()
+        h.update(name.encode())
+        for arg in args:
+            _update(h, arg)
+        for k in sorted(kwargs):
+            h.update(k.encode())
+            _update(h, kwargs[k])
+        return h.hexdigest()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Look the result up in memory, then on disk
+
+        Returns:
+            (found, result)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return True, self._entries[key][0]
+        path = self._path(key)
+        if path is not None:
+            try:
+                with open(path, "rb") as file:
+                    value = pickle.load(file)
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            else:
+                _freeze(value)
+                with self._lock:
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    self._store(key, value)
+                return True, value
+        with self._lock:
+            self.stats.misses += 1
+        return False, None
+
+    def put(self, key: str, value: Any):
+        """Cache the result, it is made read-only"""
+        _freeze(value)
+        with self._lock:
+            self._store(key, value)
+        path = self._path(key)
+        if path is not None and not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            if self.disk_max_bytes:
+                self._prune_disk()
+
+    def clear(self):
+        """Drop the memory tier, disk files are kept"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def wrap(self, alg: AlgEnum, func: Callable) -> Callable:
+        """Wrap the alg implementation for caching its results"""
+        name = f"{type(alg).__name__}.{alg.name}"
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any):
+            key = self.key(name, args, kwargs)
+            found, result = self.get(key)
+            if not found:
+                result = func(*args, **kwargs)
+                self.put(key, result)
+            return result
+
+        return wrapper
+
+    def _store(self, key: str, value: Any):
+        size = _nbytes(value)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.stats.evictions += 1
+            self.stats.evicted_bytes += evicted
+
+    def _path(self, key: str) -> str | None:
+        return None if self.disk_dir is None else os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _prune_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".pkl"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _arrays(value: Any) -> list[np.ndarray]:
+    # Buffers of the value: plain array, DataArray data with coords or PackedArray parts
+    if isinstance(value, np.ndarray):
+        return [value]
+    if type(value).__module__.startswith("xarray"):
+        return [np.asarray(value.data)] + [np.asarray(c.data) for c in value.coords.values()]
+    if isinstance(value, PackedArray):
+        return [value.values, value.index]
+    return []
+
+
+def _update(h: Any, value: Any):
+    arrays = _arrays(value)
+    if not arrays:
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+        return
+    if type(value).__module__.startswith("xarray"):
+        h.update(f"xr:{value.dims}:{list(value.coords)};".encode())
+    h.update(f"{type(value).__name__}:{getattr(value, 'shape', None)};".encode())
+    for array in arrays:
+        h.update(f"{array.dtype.str}{array.shape};".encode())
+        if array.dtype.hasobject:
+            h.update(pickle.dumps(array.tolist()))
+        else:
+            h.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+
+
+def _nbytes(value: Any) -> int:
+    return sum(a.nbytes for a in _arrays(value))
+
+
+def _freeze(value: Any):
+    for array in _arrays(value):
+        array.flags.writeable = False
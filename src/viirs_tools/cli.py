@@ -0,0 +1,358 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+from viirs_tools.grid import Grid, grid_index, to_grid
+from viirs_tools.products import GEO_BANDS, compute_products, parse_product, product_name, required_bands
+from viirs_tools.pyramid import build_overviews, default_reducer, overviews_path, save_overviews
+from viirs_tools.runner import Runner
+from viirs_tools.utils.enums import AlgEnum
+
+_TIMESTAMP = re.compile(r"A\d{7}\.\d{4}")
+_BAND_KEY = re.compile(r"(ref|bt|rad)i(\d)")
+_SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+@dataclass
+class GranuleReport:
+    """Per-granule processing outcome, timings are in seconds"""
+
+    path: str
+    ok: bool = False
+    read_s: float = 0.0
+    compute_s: float = 0.0
+    write_s: float = 0.0
+    error: str = ""
+
+    @property
+    def total_s(self) -> float:
+        return self.read_s + self.compute_s + self.write_s
+
+
+def parse_size(size: str) -> int:
+    """Parse byte size like '512M', '4G' or '1048576'"""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", size.upper())
+    if m is None:
+        raise ValueError(f"Cannot parse size '{size}'")
+    return int(float(m[1]) * _SIZE_UNITS[m[2]])
+
+
+def find_granules(inputs: Sequence[str], pattern: str = "*.nc") -> list[str]:
+    """Expand directories and globs into the sorted list of granule files
+
+    Args:
+        inputs : directories, glob patterns or plain file paths
+        pattern : file pattern used inside the directories
+
+    Returns:
+        Unique granule paths
+    """
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            found.update(glob.glob(os.path.join(item, pattern)))
+        else:
+            found.update(glob.glob(item))
+    return sorted(p for p in found if os.path.isfile(p))
+
+
+def match_geo(granule: str, geo_files: Sequence[str]) -> str | None:
+    """Find geolocation file with the same acquisition timestamp (AYYYYDDD.HHMM)"""
+    ts = _TIMESTAMP.search(os.path.basename(granule))
+    if ts is None:
+        return None
+    return next((g for g in geo_files if ts[0] in os.path.basename(g)), None)
+
+
+def _limit_memory(max_bytes: int):
+    """Worker initializer, caps the address space of the worker process
+    Allocations above the budget raise MemoryError in the worker only
+    """
+    try:
+        import resource
+    except ImportError:  # no cov, not available on Windows
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_bytes = min(max_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+
+
+def _read_bands(path: str, keys: set[str]) -> dict[str, np.ndarray]:
+    """Read only the required bands (read_npp_viaes_l1 keys) of the I-band granule"""
+    from netCDF4 import Dataset
+
+    from viirs_tools.assimilator import reading_helpers as rh
+
+    readers = {"ref": rh.read_ref, "bt": rh.read_bt, "rad": rh.read_rad}
+    bands = {}
+    with Dataset(path, "r") as file:
+        for key in keys:
+            kind, band = _BAND_KEY.fullmatch(key).groups()
+            bands[key] = np.ma.filled(readers[kind](f"I{band}", file).astype(np.float64), np.nan)
+    return bands
+
+
+def _read_geo_bands(path: str, keys: set[str]) -> dict[str, np.ndarray]:
+    """Read GEO_BANDS from the M-band geolocation file and replicate them to the I-band resolution"""
+    from netCDF4 import Dataset
+
+    from viirs_tools.assimilator import reading_helpers as rh
+
+    readers = {"solza": rh.read_solza}
+    bands = {}
+    with Dataset(path, "r") as file:
+        for key in keys:
+            data = np.ma.filled(readers[key](file).astype(np.float64), np.nan)
+            bands[key] = data.repeat(2, axis=0).repeat(2, axis=1)
+    return bands
+
+
+def _read_geo(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Read M-band geolocation and replicate it to the I-band resolution"""
+    from netCDF4 import Dataset
+
+    from viirs_tools.assimilator import reading_helpers as rh
+
+    with Dataset(path, "r") as file:
+        lat = np.ma.filled(rh.read_lat(file).astype(np.float64), np.nan)
+        lon = np.ma.filled(rh.read_lon(file).astype(np.float64), np.nan)
+    return lat.repeat(2, axis=0).repeat(2, axis=1), lon.repeat(2, axis=0).repeat(2, axis=1)
+
+
+def process_granule(
+    path: str,
+    products: Sequence[AlgEnum],
+    out_dir: str,
+    grid: Grid | None = None,
+    geo_path: str | None = None,
+    runner: Runner | None = None,
+    overviews: int = 0,
+) -> GranuleReport:
+    """Compute products for the single granule and save them as .npy files
+    Exceptions are caught and reported, so one bad granule does not stop the batch
+
+    Args:
+        path : I-band granule file
+        products : desired products
+        out_dir : output directory, products are saved into out_dir/<granule name>/
+        grid : target grid, products are kept in swath geometry if not given
+        geo_path : M-band file with geolocation, required for gridding and GEO_BANDS inputs
+        runner : runner for getting algs, default one is used if not given
+        overviews : number of 2x, 4x... overview levels saved alongside each product
+            as <product>.overviews.npz, built from the computed product in memory
+
+    Returns:
+        Processing report
+    """
+    report = GranuleReport(path)
+    try:
+        t = time.perf_counter()
+        keys = required_bands(products)
+        if (grid is not None or keys & GEO_BANDS) and geo_path is None:
+            raise FileNotFoundError(f"No geolocation file for {path}")
+        # Only the required bands are read, e.g. no reflectance ones for night.solar
+        bands = _read_bands(path, keys - GEO_BANDS) if keys - GEO_BANDS else {}
+        if keys & GEO_BANDS:
+            bands.update(_read_geo_bands(geo_path, keys & GEO_BANDS))
+        if grid is not None:
+            index = grid_index(*_read_geo(geo_path), grid)
+        report.read_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        results = compute_products(bands, products, runner)
+        if grid is not None:
+            results = {alg: to_grid(results[alg], index, grid) for alg in products}
+        pyramids = (
+            {alg: build_overviews(np.asarray(results[alg]), overviews, default_reducer(alg)) for alg in products} if overviews else {}
+        )
+        report.compute_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        target = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+        os.makedirs(target, exist_ok=True)
+        for alg in products:
+            file = os.path.join(target, f"{product_name(alg)}.npy")
+            np.save(file, np.asarray(results[alg]))
+            if alg in pyramids:
+                save_overviews(overviews_path(file), pyramids[alg])
+        report.write_s = time.perf_counter() - t
+        report.ok = True
+    except Exception as e:  # noqa: BLE001
+        report.error = f"{type(e).__name__}: {e}"
+    return report
+
+
+def run(
+    granules: Sequence[str],
+    products: Sequence[AlgEnum],
+    out_dir: str,
+    workers: int = 1,
+    grid: Grid | None = None,
+    geo_files: Sequence[str] = (),
+    max_memory: int = 0,
+    overviews: int = 0,
+) -> list[GranuleReport]:
+    """Process granules in parallel
+
+    Args:
+        granules : granule files
+        products : desired products
+        out_dir : output directory
+        workers : number of worker processes
+        grid : target grid, products are kept in swath geometry if not given
+        geo_files : M-band files with geolocation, matched to granules by timestamp,
+            required by grid and GEO_BANDS inputs
+        max_memory : memory budget per worker in bytes, 0 means unlimited
+        overviews : number of overview levels saved alongside each product
+
+    Returns:
+        Reports in the order of granules
+    """
+    initializer, initargs = (_limit_memory, (max_memory,)) if max_memory > 0 else (None, ())
+    need_geo = grid is not None or bool(required_bands(products) & GEO_BANDS)
+    reports: dict[str, GranuleReport] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        futures = {
+            executor.submit(
+                process_granule, path, products, out_dir, grid, match_geo(path, geo_files) if need_geo else None, overviews=overviews
+            ): path
+            for path in granules
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                reports[path] = future.result()
+            except Exception as e:  # noqa: BLE001, worker crash, e.g. killed for memory
+                reports[path] = GranuleReport(path, error=f"{type(e).__name__}: {e}")
+    return [reports[path] for path in granules]
+
+
+def format_reports(reports: Sequence[GranuleReport]) -> str:
+    """Format per-granule timings table with the summary line"""
+    width = max([len("granule")] + [len(os.path.basename(r.path)) for r in reports])
+    lines = [f"{'granule':<{width}}  status  read,s  compute,s  write,s  total,s"]
+    for r in reports:
+        status = "ok" if r.ok else "FAILED"
+        lines.append(
+            f"{os.path.basename(r.path):<{width}}  {status:<6}  {r.read_s:6.2f}  {r.compute_s:9.2f}  {r.write_s:7.2f}  {r.total_s:7.2f}"
+        )
+        if not r.ok:
+            lines.append(f"    {r.error}")
+    ok = sum(r.ok for r in reports)
+    lines.append(f"{ok}/{len(reports)} granules processed, {sum(r.total_s for r in reports):.2f}s of worker time")
+    return "\n".join(lines)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="viirs-tools", description="Batch processing of VIIRS I-band granules")
+    parser.add_argument("inputs", nargs="+", help="granule files, directories or glob patterns")
+    parser.add_argument(
+        "-p",
+        "--product",
+        action="append",
+        required=True,
+        dest="products",
+        help="product as '<type>' or '<type>:<ALG>', e.g. 'cloud', 'index:NDSI'; could be repeated",
+    )
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-w", "--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--pattern", default="*02IMG*.nc", help="I-band granule file pattern inside directories (default: %(default)s)")
+    parser.add_argument("--grid", type=Grid.from_string, help="target grid as 'lon_min,lat_min,lon_max,lat_max,res' in degrees")
+    parser.add_argument(
+        "--geo", nargs="+", default=[], help="M-band geolocation files, directories or globs, required by --grid and night:SOLAR"
+    )
+    parser.add_argument("--max-memory", type=parse_size, help="memory budget per worker, e.g. '4G' (default: unlimited)")
+    parser.add_argument(
+        "--overviews", type=int, default=0, help="number of 2x, 4x... overviews saved as <product>.overviews.npz (default: %(default)s)"
+    )
+    parser.add_argument("--watch", action="store_true", help="watch the single input directory and process granules as they land")
+    parser.add_argument(
+        "--geo-pattern", default="*03MOD*.nc", help="geolocation file pattern inside --geo or watched directories (default: %(default)s)"
+    )
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="polling interval with --watch, seconds (default: %(default)s)")
+    return parser
+
+
+def _watch(args: argparse.Namespace, products: Sequence[AlgEnum]) -> int:
+    import logging
+
+    from viirs_tools.service import Service, make_watcher
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    image_pattern = args.pattern
+    need_geo = args.grid is not None or bool(required_bands(products) & GEO_BANDS)
+    patterns = [image_pattern] + ([args.geo_pattern] if need_geo else [])
+    service = Service(
+        args.inputs[0],
+        products,
+        args.output,
+        image_pattern=image_pattern,
+        geo_pattern=args.geo_pattern,
+        grid=args.grid,
+        overviews=args.overviews,
+        watcher=make_watcher(args.inputs[0], patterns, args.poll_interval),
+    )
+    try:
+        service.serve()
+    except KeyboardInterrupt:
+        pass
+    print(service.summary())
+    return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        products = [parse_product(p) for p in args.products]
+        required_bands(products)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers is not None and args.workers < 1:
+        parser.error("number of workers must be positive")
+    if args.overviews < 0:
+        parser.error("number of overviews must be non-negative")
+    if args.watch:
+        if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]):
+            parser.error("--watch requires a single input directory")
+        # the service processes sets one by one in its own process, geolocation lands with them
+        ignored = [flag for flag, value in (("--workers", args.workers), ("--max-memory", args.max_memory), ("--geo", args.geo)) if value]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} cannot be used with --watch, use --geo-pattern for the geolocation files")
+        return _watch(args, products)
+    if args.grid is not None and not args.geo:
+        parser.error("--grid requires --geo files")
+    if required_bands(products) & GEO_BANDS and not args.geo:
+        parser.error(f"{', '.join(sorted(required_bands(products) & GEO_BANDS))} inputs require --geo files")
+
+    # day directories also hold the geolocation and cloud mask files
+    granules = find_granules(args.inputs, args.pattern)
+    if not granules:
+        parser.error("no granules found")
+
+    reports = run(
+        granules,
+        products,
+        args.output,
+        workers=args.workers or os.cpu_count() or 1,
+        grid=args.grid,
+        geo_files=find_granules(args.geo, args.geo_pattern),
+        max_memory=args.max_memory or 0,
+        overviews=args.overviews,
+    )
+    print(format_reports(reports))
+    return 0 if all(r.ok for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
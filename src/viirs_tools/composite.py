@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+from viirs_tools.stats import _hist_quantile, _hist_update
+
+
+class Reducer(ABC):
+    """Running per-pixel reducer over the clear-sky observations of one product
+    State has the grid's shape and is updated in place by each granule
+
+    Args:
+        source : key of the product in the granules passed to Compositor.add
+    """
+
+    name = "reducer"
+
+    def __init__(self, source: str):
+        self.source = source
+
+    @abstractmethod
+    def init(self, shape: tuple[int, ...]):
+        """Allocate the state of the grid's shape"""
+
+    @abstractmethod
+    def update(self, values: np.ndarray, clear: np.ndarray, time: np.datetime64):
+        """Consume the single gridded granule
+
+        Args:
+            values : product values, NaN is missing
+            clear : clear-sky pixels with valid values
+            time : granule acquisition time
+        """
+
+    @abstractmethod
+    def result(self) -> dict[str, np.ndarray]:
+        """Get composites by '<source>_<name>' keys"""
+
+
+class ClearMax(Reducer):
+    """Maximum of the clear-sky values, e.g. max-NDVI composite"""
+
+    name = "max"
+
+    def init(self, shape):
+        self.value = np.full(shape, np.nan)
+
+    def update(self, values, clear, time):
+        # NaN in the state compares False, so the first observation always wins
+        np.copyto(self.value, values, where=clear & ~(values <= self.value))
+
+    def result(self):
+        return {f"{self.source}_{self.name}": self.value}
+
+
+class ClearMean(Reducer):
+    """Mean of the clear-sky values"""
+
+    name = "mean"
+
+    def init(self, shape):
+        self.sum = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.uint32)
+
+    def update(self, values, clear, time):
+        np.add(self.sum, values, out=self.sum, where=clear)
+        self.count += clear
+
+    def result(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {f"{self.source}_{self.name}": np.where(self.count > 0, self.sum / self.count, np.nan)}
+
+
+class ClearMedian(Reducer):
+    """Approximate median of the clear-sky values from the fixed-bin histogram
+    Error is within half of the bin width for the values inside [lo, hi),
+    values outside are counted in the edge bins. State takes bins * 2 bytes per pixel
+
+    Args:
+        source : product key
+        lo : lower edge of the histogram
+        hi : upper edge of the histogram
+        bins : number of bins, each bin counts at most 65535 observations per pixel
+            and saturates after that
+    """
+
+    name = "median"
+
+    def __init__(self, source: str, lo: float, hi: float, bins: int = 64):
+        super().__init__(source)
+        if hi <= lo or bins < 1:
+            raise ValueError(f"Invalid histogram: [{lo}, {hi}), {bins} bins")
+        self.lo, self.hi, self.bins = lo, hi, bins
+
+    def init(self, shape):
+        # bins go first, so each bin is a contiguous grid-sized plane
+        self.counts = np.zeros((self.bins, *shape), dtype=np.uint16)
+
+    def update(self, values, clear, time):
+        _hist_update(self.counts, values, clear, self.lo, self.hi)
+
+    def result(self):
+        return {f"{self.source}_{self.name}": _hist_quantile(self.counts, self.lo, self.hi, [0.5])[0]}
+
+
+class LastClear(Reducer):
+    """Latest clear-sky value and its acquisition time
+    Granules could be added in any order, the latest one by time wins
+    """
+
+    name = "last"
+
+    def init(self, shape):
+        self.value = np.full(shape, np.nan)
+        self.time = np.full(shape, np.datetime64("NaT"), dtype="datetime64[s]")
+
+    def update(self, values, clear, time):
+        time = np.datetime64(time, "s")
+        newer = clear & ~(self.time > time)
+        np.copyto(self.value, values, where=newer)
+        self.time[newer] = time
+
+    def result(self):
+        return {f"{self.source}_{self.name}": self.value, f"{self.source}_{self.name}_time": self.time}
+
+
+class ClearCount(Reducer):
+    """Number of clear-sky observations with valid values"""
+
+    name = "clear_count"
+
+    def init(self, shape):
+        self.count = np.zeros(shape, dtype=np.uint32)
+
+    def update(self, values, clear, time):
+        self.count += clear
+
+    def result(self):
+        return {f"{self.source}_{self.name}": self.count}
+
+
+class Compositor:
+    """Streaming temporal compositing of the gridded granules
+    Granules are consumed one by one, memory is O(grid), not O(grid * time)
+
+    Args:
+        shape : grid shape
+        reducers : reducers to update with each granule
+    """
+
+    def __init__(self, shape: tuple[int, ...], reducers: Sequence[Reducer]):
+        self.shape = tuple(shape)
+        self.reducers = list(reducers)
+        self.granules = 0
+        for reducer in self.reducers:
+            reducer.init(self.shape)
+
+    def add(self, products: dict[str, np.ndarray], cmask: np.ndarray, time: np.datetime64 | None = None):
+        """Update reducers with the single gridded granule
+
+        Args:
+            products : product arrays of the grid's shape by key, NaN is missing
+            cmask : integer cloud mask, 1 is clear pixel, as returned by the cloud algs
+            time : granule acquisition time, required by LastClear
+        """
+        cmask = np.asarray(cmask)
+        if cmask.shape != self.shape:
+            raise ValueError(f"Cloud mask shape {cmask.shape} does not match grid {self.shape}")
+        clear = cmask == 1
+        for reducer in self.reducers:
+            values = np.asarray(products[reducer.source], dtype=np.float64)
+            if values.shape != self.shape:
+                raise ValueError(f"'{reducer.source}' shape {values.shape} does not match grid {self.shape}")
+            if isinstance(reducer, LastClear) and time is None:
+                raise ValueError("LastClear reducer requires granule time")
+            reducer.update(values, clear & ~np.isnan(values), time)
+        self.granules += 1
+
+    def result(self) -> dict[str, np.ndarray]:
+        """Get composites by '<source>_<reducer>' keys"""
+        out = {}
+        for reducer in self.reducers:
+            out.update(reducer.result())
+        return out
+
+
+def composite(
+    granules: Iterable[tuple[dict[str, np.ndarray], np.ndarray, np.datetime64 | None]],
+    shape: tuple[int, ...],
+    reducers: Sequence[Reducer],
+) -> dict[str, np.ndarray]:
+    """Composite the stream of (products, cloud mask, time) gridded granules
+
+    Args:
+        granules : iterable of (products, cmask, time), e.g. a generator reading granules lazily
+        shape : grid shape
+        reducers : reducers to apply
+
+    Returns:
+        Composites by '<source>_<reducer>' keys
+    """
+    compositor = Compositor(shape, reducers)
+    for products, cmask, time in granules:
+        compositor.add(products, cmask, time)
+    return compositor.result()
@@ -0,0 +1,176 @@
+import inspect
+import os
+from collections.abc import Callable, Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import xarray as xr
+
+from viirs_tools.algs import cloud
+
+# Scene-wide reductions of the algs, computed once over the whole scene before splitting
+# into row blocks and passed to each block as extra keyword arguments; reductions get
+# the arguments of the call by parameter name, so positional and keyword calls are the same
+GLOBAL_REDUCTIONS: dict[Callable, Callable[[Mapping[str, Any]], dict[str, Any]]] = {
+    cloud.vibcm_day: lambda arguments: {"ri3_max": np.nanmax(arguments["ri3"], axis=(-2, -1), keepdims=True)},
+}
+
+BACKENDS = ("thread", "process")
+
+
+class BlockExecutor:
+    """Parallel execution of the pixel-wise algs over row blocks of the scene
+    Blocks are sized to keep the alg temporaries cache-friendly, results are
+    identical to the serial call: scene-wide reductions (GLOBAL_REDUCTIONS,
+    e.g. vibcm_day Test 4 I03 maximum) are computed once for the whole scene
+
+    Args:
+        backend : 'thread' for the NumPy paths, which release the GIL, or 'process',
+            sharing inputs and output with worker processes through shared memory;
+            process backend requires picklable (module-level) algs
+        workers : number of workers, CPU count by default
+        block_bytes : input bytes of all arguments per block
+    """
+
+    def __init__(self, backend: str = "thread", workers: int | None = None, block_bytes: int = 2**21):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.block_bytes = block_bytes
+        self._pool: Executor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc: object):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            pool_cls = ThreadPoolExecutor if self.backend == "thread" else ProcessPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return self._pool
+
+    def run(self, alg: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Call the alg over row blocks, e.g. run(runner.get_alg_cloud(), ri1, ri2, ri3, bi5)
+
+        Args:
+            alg : pixel-wise alg, the result has the shape of the data arguments
+            args : alg arguments, arrays of the scene shape are split by rows (axis -2),
+                others are passed to each block as is
+            kwargs : alg keyword arguments, split the same way
+
+        Returns:
+            Result of the alg(*args, **kwargs) call
+        """
+        like = next((a for a in (*args, *kwargs.values()) if isinstance(a, xr.DataArray)), None)
+        args = [np.asarray(a) if isinstance(a, xr.DataArray) else a for a in args]
+        kwargs = {k: np.asarray(v) if isinstance(v, xr.DataArray) else v for k, v in kwargs.items()}
+        shape = next(a.shape for a in (*args, *kwargs.values()) if isinstance(a, np.ndarray) and a.ndim >= 2)
+
+        base = inspect.unwrap(alg)
+        if base in GLOBAL_REDUCTIONS:
+            arguments = inspect.signature(base).bind(*args, **kwargs).arguments
+            kwargs = {**GLOBAL_REDUCTIONS[base](arguments), **kwargs}
+
+        rows = shape[-2]
+        row_bytes = sum(a.nbytes // rows for a in (*args, *kwargs.values()) if _is_split(a, shape))
+        step = max(1, self.block_bytes // max(row_bytes, 1))
+        blocks = [(r, min(r + step, rows)) for r in range(0, rows, step)]
+
+        if len(blocks) == 1:
+            out = np.asarray(alg(*args, **kwargs))
+        elif self.backend == "thread":
+            out = self._run_threads(alg, args, kwargs, shape, blocks)
+        else:
+            out = self._run_processes(base, args, kwargs, shape, blocks)
+
+        if like is not None:
+            return xr.DataArray(out, dims=like.dims, coords=like.coords)
+        return out
+
+    def _run_threads(self, alg, args, kwargs, shape, blocks) -> np.ndarray:
+        first = np.asarray(alg(*_block(args, shape, *blocks[0]), **_block(kwargs, shape, *blocks[0])))
+        out = np.empty(shape, dtype=first.dtype)
+        out[..., slice(*blocks[0]), :] = first
+
+        def _task(r0: int, r1: int):
+            out[..., r0:r1, :] = alg(*_block(args, shape, r0, r1), **_block(kwargs, shape, r0, r1))
+
+        for future in [self._get_pool().submit(_task, *b) for b in blocks[1:]]:
+            future.result()
+        return out
+
+    def _run_processes(self, alg, args, kwargs, shape, blocks) -> np.ndarray:
+        first = np.asarray(alg(*_block(args, shape, *blocks[0]), **_block(kwargs, shape, *blocks[0])))
+        segments = []
+        try:
+            out_spec = _share(np.empty(shape, dtype=first.dtype), segments, copy=False)
+            shared_args = [_share(a, segments) if _is_split(a, shape) else a for a in args]
+            shared_kwargs = {k: _share(v, segments) if _is_split(v, shape) else v for k, v in kwargs.items()}
+            futures = [
+                self._get_pool().submit(_run_shared_block, alg, shared_args, shared_kwargs, out_spec, shape, r0, r1)
+                for r0, r1 in blocks[1:]
+            ]
+            for future in futures:
+                future.result()
+            out = np.ndarray(shape, dtype=first.dtype, buffer=segments[0].buf).copy()
+        finally:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+        out[..., slice(*blocks[0]), :] = first
+        return out
+
+
+class _Shared:
+    """Picklable reference to the array in shared memory"""
+
+    def __init__(self, name: str, shape: tuple[int, ...], dtype: np.dtype):
+        self.name, self.shape, self.dtype = name, shape, dtype
+
+
+def _is_split(arg: Any, shape: tuple[int, ...]) -> bool:
+    return isinstance(arg, np.ndarray) and arg.shape == shape
+
+
+def _block(args: Any, shape: tuple[int, ...], r0: int, r1: int) -> Any:
+    if isinstance(args, dict):
+        return {k: v[..., r0:r1, :] if _is_split(v, shape) else v for k, v in args.items()}
+    return [a[..., r0:r1, :] if _is_split(a, shape) else a for a in args]
+
+
+def _share(array: np.ndarray, segments: list, copy: bool = True) -> _Shared:
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(segment)
+    if copy:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return _Shared(segment.name, array.shape, array.dtype)
+
+
+def _attach(ref: _Shared, segments: list) -> np.ndarray:
+    # Workers share the resource tracker of the parent, which owns and unlinks the segments
+    segment = shared_memory.SharedMemory(name=ref.name)
+    segments.append(segment)
+    return np.ndarray(ref.shape, dtype=ref.dtype, buffer=segment.buf)
+
+
+def _run_shared_block(alg, args, kwargs, out_ref: _Shared, shape, r0: int, r1: int):
+    segments: list = []
+    try:
+        args = [_attach(a, segments) if isinstance(a, _Shared) else a for a in args]
+        kwargs = {k: _attach(v, segments) if isinstance(v, _Shared) else v for k, v in kwargs.items()}
+        out = _attach(out_ref, segments)
+        out[..., r0:r1, :] = alg(*_block(args, shape, r0, r1), **_block(kwargs, shape, r0, r1))
+        del args, kwargs, out
+    finally:
+        for segment in segments:
+            segment.close()
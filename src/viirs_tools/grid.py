@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Grid:
+    """Regular lat/lon target grid, row 0 is the northern edge
+
+    Args:
+        lon_min : western edge, degrees
+        lat_min : southern edge, degrees
+        lon_max : eastern edge, degrees
+        lat_max : northern edge, degrees
+        res : cell size, degrees
+    """
+
+    lon_min: float
+    lat_min: float
+    lon_max: float
+    lat_max: float
+    res: float
+
+    def __post_init__(self):
+        if self.lon_max <= self.lon_min or self.lat_max <= self.lat_min:
+            raise ValueError(f"Empty grid extent: {self}")
+        if self.res <= 0:
+            raise ValueError(f"Grid resolution must be positive, got {self.res}")
+
+    @classmethod
+    def from_string(cls, spec: str) -> "Grid":
+        """Parse grid from the 'lon_min,lat_min,lon_max,lat_max,res' string"""
+        parts = spec.split(",")
+        if len(parts) != 5:
+            raise ValueError(f"Grid spec must be 'lon_min,lat_min,lon_max,lat_max,res', got '{spec}'")
+        return cls(*(float(p) for p in parts))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (
+            int(np.ceil((self.lat_max - self.lat_min) / self.res)),
+            int(np.ceil((self.lon_max - self.lon_min) / self.res)),
+        )
+
+    @property
+    def size(self) -> int:
+        rows, cols = self.shape
+        return rows * cols
+
+
+def grid_index(lat: np.ndarray, lon: np.ndarray, grid: Grid) -> np.ndarray:
+    """Get flat target grid cell for each swath pixel
+    Computed once per geolocation and reused for every product
+
+    Args:
+        lat : swath latitudes
+        lon : swath longitudes, same shape as lat
+        grid : target grid
+
+    Returns:
+        int64 array of lat's shape, -1 for pixels out of grid or without geolocation
+    """
+    rows, cols = grid.shape
+    with np.errstate(invalid="ignore"):
+        r = np.floor((grid.lat_max - np.asarray(lat, dtype=np.float64)) / grid.res)
+        c = np.floor((np.asarray(lon, dtype=np.float64) - grid.lon_min) / grid.res)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+    return np.where(inside, r * cols + c, -1).astype(np.int64)
+
+
+def to_grid(data: np.ndarray, index: np.ndarray, grid: Grid) -> np.ndarray:
+    """Nearest-neighbour binning of swath data onto the grid
+    Valid pixels falling into the same cell overwrite each other in swath order
+
+    Args:
+        data : swath data, same shape as index
+        index : flat cell index, from the grid_index
+        grid : target grid
+
+    Returns:
+        float array of grid's shape, NaN for empty cells
+    """
+    data = np.asarray(data)
+    valid = index >= 0
+    if np.issubdtype(data.dtype, np.floating):
+        valid &= ~np.isnan(data)
+    dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+    out = np.full(grid.size, np.nan, dtype=dtype)
+    out[index[valid]] = data[valid]
+    return out.reshape(grid.shape)
@@ -0,0 +1,129 @@
+from collections import deque
+from collections.abc import Hashable, Mapping, Sequence
+
+import numpy as np
+
+# Rows of the single VIIRS scan by resolution, granule is made of whole scans
+SCAN_ROWS = {"i": 32, "m": 16}
+
+
+class SwathRingBuffer:
+    """Preallocated along-track mosaic of the last granules of the band arrays
+    Granules are written in place, each row twice (at row % capacity and
+    row % capacity + capacity), so the last N rows are always one contiguous slice
+    and windows are zero-copy views. Memory is constant: 2 * capacity rows per band
+
+    Args:
+        bands : band keys, e.g. as returned by read_npp_viaes_l1
+        scans : capacity in scans
+        width : pixels across the track, e.g. 6400 for I-bands
+        resolution : 'i' or 'm', defines rows per scan
+        dtype : dtype of the bands
+        fill : initial value of the buffer
+    """
+
+    def __init__(
+        self,
+        bands: Sequence[str],
+        scans: int,
+        width: int,
+        resolution: str = "i",
+        dtype: np.dtype | type = np.float32,
+        fill: float = np.nan,
+    ):
+        if resolution not in SCAN_ROWS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {sorted(SCAN_ROWS)}")
+        if scans < 1:
+            raise ValueError("Capacity has to be at least one scan")
+        self.scan_rows = SCAN_ROWS[resolution]
+        self.capacity = scans * self.scan_rows
+        self.width = width
+        self._buffers = {band: np.full((2 * self.capacity, width), fill, dtype=dtype) for band in bands}
+        self._granules: deque[tuple[Hashable, int]] = deque()
+        self.total_rows = 0
+
+    @property
+    def bands(self) -> list[str]:
+        return list(self._buffers)
+
+    @property
+    def rows(self) -> int:
+        """Number of rows available for windows"""
+        return min(self.total_rows, self.capacity)
+
+    @property
+    def granules(self) -> list[Hashable]:
+        """Keys of the granules with at least one row still in the buffer, oldest first"""
+        return [key for key, _ in self._granules]
+
+    def append(self, granule: Mapping[str, np.ndarray], key: Hashable = None):
+        """Write the next along-track granule into the buffer
+
+        Args:
+            granule : (rows, width) arrays by band key, all bands of the buffer are required,
+                rows have to be whole scans; only the last capacity rows are kept
+            key : granule id, e.g. its timestamp, reported by granules
+        """
+        missing = set(self._buffers) - set(granule)
+        if missing:
+            raise ValueError(f"Granule misses bands {sorted(missing)}")
+        rows = {np.shape(granule[band]) for band in self._buffers}
+        if len(rows) != 1:
+            raise ValueError(f"Bands of the granule have different shapes: {sorted(rows)}")
+        ((nrows, width),) = rows
+        if width != self.width or nrows % self.scan_rows:
+            raise ValueError(f"Granule shape {(nrows, width)} is not of whole scans of width {self.width}")
+
+        keep = min(nrows, self.capacity)
+        # rows before the kept ones are skipped, so they end where the window ends
+        head = (self.total_rows + nrows - keep) % self.capacity
+        for band, buffer in self._buffers.items():
+            data = np.asarray(granule[band])[nrows - keep :]
+            first = min(keep, self.capacity - head)
+            for offset in (0, self.capacity):
+                buffer[offset + head : offset + head + first] = data[:first]
+                buffer[offset : offset + keep - first] = data[first:]
+        self.total_rows += nrows
+
+        self._granules.append((key, nrows))
+        held = sum(n for _, n in self._granules)
+        while held - self._granules[0][1] >= self.capacity:
+            held -= self._granules.popleft()[1]
+
+    def window(self, rows: int | None = None) -> dict[str, np.ndarray]:
+        """Get read-only zero-copy views of the last rows of each band
+
+        Args:
+            rows : number of rows, all available ones by default
+
+        Returns:
+            (rows, width) views by band key, oldest row first
+        """
+        rows = self.rows if rows is None else rows
+        if not 0 <= rows <= self.rows:
+            raise ValueError(f"Only {self.rows} rows are available, {rows} requested")
+        end = self.total_rows % self.capacity + self.capacity
+        views = {}
+        for band, buffer in self._buffers.items():
+            view = buffer[end - rows : end]
+            view.flags.writeable = False
+            views[band] = view
+        return views
+
+    def last_scans(self, n: int) -> dict[str, np.ndarray]:
+        """Get views of the last n scans, see window"""
+        return self.window(n * self.scan_rows)
+
+    def last_granules(self, n: int) -> dict[str, np.ndarray]:
+        """Get views of the last n granules, see window
+        The oldest granule is partial if it is overwritten already
+        """
+        if not 0 < n <= len(self._granules):
+            raise ValueError(f"Only {len(self._granules)} granules are available, {n} requested")
+        rows = sum(nrows for _, nrows in list(self._granules)[-n:])
+        return self.window(min(rows, self.capacity))
+
+    def reset(self):
+        """Forget all granules, e.g. on the along-track gap"""
+        self._granules.clear()
+        self.total_rows = 0
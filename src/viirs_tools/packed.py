@@ -0,0 +1,197 @@
+from collections.abc import Callable, Sequence
+from typing import Any
+
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+# NumPy functions with PackedArray implementations, used by the numpy path of the algs
+_HANDLED: dict[Callable, Callable] = {}
+
+
+def _implements(func: Callable) -> Callable:
+    def decorator(impl: Callable) -> Callable:
+        _HANDLED[func] = impl
+        return impl
+
+    return decorator
+
+
+class PackedArray(NDArrayOperatorsMixin):
+    """Valid pixels of the dense array: flat vector of values and their flat indices
+    Algs in viirs_tools.algs accept and return it through the NumPy protocols,
+    so compute scales with the number of valid pixels instead of the swath area.
+    All packed arguments of the alg have to share the same layout (shape and index),
+    use pack_bands for packing bands of one granule
+
+    Args:
+        values : values of the valid pixels
+        index : sorted flat indices of the valid pixels in the dense array
+        shape : dense array shape
+    """
+
+    def __init__(self, values: np.ndarray, index: np.ndarray, shape: tuple[int, ...]):
+        if values.shape != index.shape:
+            raise ValueError(f"Values {values.shape} do not match index {index.shape}")
+        self.values = values
+        self.index = index
+        self.shape = tuple(shape)
+
+    @classmethod
+    def pack(cls, data: np.ndarray, valid: np.ndarray | None = None) -> "PackedArray":
+        """Pack the dense array
+
+        Args:
+            data : dense array
+            valid : pixels to keep, not NaN ones by default
+        """
+        data = np.asarray(data)
+        index = np.flatnonzero(~np.isnan(data) if valid is None else valid)
+        return cls(data.reshape(-1)[index], index, data.shape)
+
+    def unpack(self, fill: Any = np.nan) -> np.ndarray:
+        """Get the dense array, filling missing pixels
+
+        Args:
+            fill : value of the missing pixels, dtype is promoted if needed,
+                e.g. boolean masks become float with NaN
+        """
+        out = np.full(self.size, fill, dtype=np.result_type(self.values, fill))
+        out[self.index] = self.values
+        return out.reshape(self.shape)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def nvalid(self) -> int:
+        return self.values.size
+
+    def astype(self, dtype: Any) -> "PackedArray":
+        return self._wrap(self.values.astype(dtype))
+
+    def copy(self) -> "PackedArray":
+        return self._wrap(self.values.copy())
+
+    def __repr__(self) -> str:
+        return f"PackedArray(shape={self.shape}, dtype={self.dtype}, valid={self.nvalid}/{self.size})"
+
+    def __array__(self, dtype: Any = None, copy: bool | None = None) -> np.ndarray:
+        out = self.unpack()
+        return out if dtype is None else out.astype(dtype)
+
+    def __array_ufunc__(self, ufunc: np.ufunc, method: str, *inputs: Any, out: tuple | None = None, **kwargs: Any):
+        if method != "__call__":
+            return NotImplemented
+        _check_layout(*inputs, *(out or ()))
+        result = ufunc(*_unwrap(inputs), **({"out": tuple(_unwrap(out))} if out else {}), **kwargs)
+        if out:
+            return out[0] if len(out) == 1 else out
+        if isinstance(result, tuple):
+            return tuple(self._wrap(r) for r in result)
+        return self._wrap(result)
+
+    def __array_function__(self, func: Callable, types: tuple, args: tuple, kwargs: dict):
+        if func not in _HANDLED:
+            return NotImplemented
+        return _HANDLED[func](*args, **kwargs)
+
+    def _wrap(self, values: np.ndarray) -> "PackedArray":
+        return PackedArray(values, self.index, self.shape)
+
+
+def pack_bands(bands: Sequence[np.ndarray], valid: np.ndarray | None = None) -> list[PackedArray]:
+    """Pack bands of one granule into the shared layout
+
+    Args:
+        bands : dense arrays of the same shape
+        valid : pixels to keep, pixels with any not NaN band by default,
+            so unpacked alg results equal the dense ones
+
+    Returns:
+        Packed bands in the same order
+    """
+    bands = [np.asarray(b) for b in bands]
+    if valid is None:
+        valid = np.zeros(bands[0].shape, dtype=bool)
+        for band in bands:
+            valid |= ~np.isnan(band)
+    index = np.flatnonzero(valid)
+    return [PackedArray(band.reshape(-1)[index], index, band.shape) for band in bands]
+
+
+def _check_layout(*args: Any):
+    first = None
+    for arg in args:
+        if isinstance(arg, PackedArray):
+            if first is None:
+                first = arg
+            elif arg.index is not first.index and (arg.shape != first.shape or not np.array_equal(arg.index, first.index)):
+                raise ValueError("Packed arrays have different layouts, pack them with pack_bands")
+        elif np.ndim(arg) != 0:
+            raise TypeError(f"Cannot mix packed and dense {type(arg).__name__} of shape {np.shape(arg)}")
+
+
+def _unwrap(args: Sequence[Any]) -> list[Any]:
+    return [arg.values if isinstance(arg, PackedArray) else arg for arg in args]
+
+
+def _like(*args: Any) -> PackedArray:
+    return next(arg for arg in args if isinstance(arg, PackedArray))
+
+
+@_implements(np.where)
+def _where(condition: Any, x: Any, y: Any) -> PackedArray:
+    _check_layout(condition, x, y)
+    return _like(condition, x, y)._wrap(np.where(*_unwrap((condition, x, y))))
+
+
+@_implements(np.putmask)
+def _putmask(a: PackedArray, mask: Any, values: Any):
+    _check_layout(a, mask, values)
+    np.putmask(*_unwrap((a, mask, values)))
+
+
+@_implements(np.copyto)
+def _copyto(dst: PackedArray, src: Any, casting: str = "same_kind", where: Any = True):
+    _check_layout(dst, src, where)
+    np.copyto(*_unwrap((dst, src)), casting=casting, where=_unwrap((where,))[0])
+
+
+@_implements(np.result_type)
+def _result_type(*arrays_and_dtypes: Any) -> np.dtype:
+    return np.result_type(*_unwrap(arrays_and_dtypes))
+
+
+@_implements(np.ndim)
+def _ndim(a: PackedArray) -> int:
+    return a.ndim
+
+
+@_implements(np.shape)
+def _shape(a: PackedArray) -> tuple[int, ...]:
+    return a.shape
+
+
+@_implements(np.nanmax)
+def _nanmax(a: PackedArray, axis: Any = None, keepdims: bool = False) -> Any:
+    if axis is None and not keepdims:
+        return np.nanmax(a.values) if a.nvalid else np.nan
+    if axis is None or not keepdims or sorted(int(ax) % a.ndim for ax in np.atleast_1d(axis)) != [a.ndim - 2, a.ndim - 1]:
+        # other reductions are not on the hot path of the algs, the dense array is reduced
+        return np.nanmax(a.unpack(), axis=axis, keepdims=keepdims)
+    # Per-scene maximum, broadcast back onto the valid pixels of the scene
+    if a.nvalid == 0:
+        return a.copy()
+    scene = a.index // (a.shape[-2] * a.shape[-1])
+    starts = np.flatnonzero(np.diff(scene, prepend=-1))
+    maxima = np.fmax.reduceat(a.values, starts)
+    return a._wrap(np.repeat(maxima, np.diff(starts, append=a.nvalid)))
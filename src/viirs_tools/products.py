@@ -0,0 +1,118 @@
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight, AlgsUtils, AlgsWater, Runner
+from viirs_tools.utils.enums import AlgEnum
+
+# Product type name -> (alg enum, Runner getter)
+_TYPES: dict[str, tuple[type[AlgEnum], str]] = {
+    "cloud": (AlgsCloud, "get_alg_cloud"),
+    "index": (AlgsIndex, "get_alg_index"),
+    "lst": (AlgsLST, "get_alg_lst"),
+    "night": (AlgsNight, "get_alg_night"),
+    "water": (AlgsWater, "get_alg_water"),
+    "utils": (AlgsUtils, "get_alg_utils"),
+}
+
+# Band keys read from the M-band geolocation file at the I-band resolution
+GEO_BANDS = frozenset({"solza"})
+
+# Inputs of the algs that could be computed from the single I-band granule (and its geolocation)
+# String items are band keys from read_npp_viaes_l1 or GEO_BANDS, enum items are other products
+INPUTS: dict[AlgEnum, tuple[str | AlgEnum, ...]] = {
+    AlgsIndex.NDVI: ("refi2", "refi1"),
+    AlgsIndex.NDSI: ("refi1", "refi3"),
+    AlgsNight.NAIVE: ("refi1", "bti4"),
+    AlgsNight.SOLAR: ("solza",),
+    AlgsCloud.VIBCM_DAY: ("refi1", "refi2", "refi3", "bti5"),
+    AlgsCloud.VIFCM_DAY: ("refi1", "refi2", "bti5"),
+    AlgsCloud.VIFCM_NIGHT: ("bti4", "bti5"),
+    AlgsWater.WBODIES_DAY: ("refi1", "refi2", "refi3"),
+    AlgsLST.MONO_WINDOW_I05: ("bti5", AlgsIndex.NDVI),
+}
+
+
+def parse_product(spec: str) -> AlgEnum:
+    """Resolve product name into the alg enum member
+
+    Args:
+        spec : '<type>' for the default alg of the type or '<type>:<ALG>',
+            e.g. 'cloud', 'index:NDSI', 'lst:MONO_WINDOW_I05'
+
+    Returns:
+        Alg enum member
+    """
+    name, _, alg = spec.partition(":")
+    if name.lower() not in _TYPES:
+        raise ValueError(f"Unknown product type '{name}', expected one of {sorted(_TYPES)}")
+    algs, _ = _TYPES[name.lower()]
+    if not alg:
+        return next(iter(algs))
+    try:
+        return algs[alg.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown alg '{alg}' for '{name}', expected one of {[a.name for a in algs]}") from None
+
+
+def product_name(alg: AlgEnum) -> str:
+    """Get short file-friendly product name, e.g. 'cloud_vibcm_day'"""
+    for name, (algs, _) in _TYPES.items():
+        if isinstance(alg, algs):
+            return f"{name}_{alg.name.lower()}"
+    raise ValueError(f"Unknown alg {alg}")
+
+
+def get_alg(runner: Runner, alg: AlgEnum) -> Callable:
+    """Get implementation of the alg through the runner"""
+    for algs, getter in _TYPES.values():
+        if isinstance(alg, algs):
+            return getattr(runner, getter)(alg)
+    raise ValueError(f"Unknown alg {alg}")
+
+
+def required_bands(products: Iterable[AlgEnum]) -> set[str]:
+    """Get set of band keys required for computing the products"""
+    bands: set[str] = set()
+    for alg in products:
+        if alg not in INPUTS:
+            raise ValueError(f"{alg.name} cannot be computed from a single granule")
+        for item in INPUTS[alg]:
+            if isinstance(item, str):
+                bands.add(item)
+            else:
+                bands |= required_bands([item])
+    return bands
+
+
+def compute_products(
+    bands: dict[str, np.ndarray],
+    products: Iterable[AlgEnum],
+    runner: Runner | None = None,
+) -> dict[AlgEnum, np.ndarray]:
+    """Compute products from the granule bands, resolving dependencies between them
+    Each product is computed once, even if required by several others
+
+    Args:
+        bands : band data by key, as returned by read_npp_viaes_l1
+        products : desired products
+        runner : runner for getting algs, default one is used if not given
+
+    Returns:
+        Desired products with their dependencies
+    """
+    runner = Runner() if runner is None else runner
+    done: dict[AlgEnum, np.ndarray] = {}
+
+    def _compute(alg: AlgEnum):
+        if alg in done:
+            return done[alg]
+        if alg not in INPUTS:
+            raise ValueError(f"{alg.name} cannot be computed from a single granule")
+        args = [bands[item] if isinstance(item, str) else _compute(item) for item in INPUTS[alg]]
+        done[alg] = get_alg(runner, alg)(*args)
+        return done[alg]
+
+    for alg in products:
+        _compute(alg)
+    return done
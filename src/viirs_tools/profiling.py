@@ -0,0 +1,181 @@
+import functools
+import logging
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from viirs_tools.utils.enums import AlgEnum
+
+Sink = Callable[["CallRecord"], None]
+
+# Sinks of the active profile() contexts, innermost last
+_SINKS: list[Sink] = []
+
+
+@dataclass
+class CallRecord:
+    """Single alg call measurements
+
+    Args:
+        alg : alg name, e.g. 'AlgsCloud.VIBCM_DAY'
+        path : 'xarray' if any of the arguments is xr.DataArray, 'numpy' otherwise
+        wall_s : wall time, seconds
+        cpu_s : process CPU time, seconds
+        alloc_bytes : peak of memory allocated during the call,
+            None if memory tracing is off
+        shapes : shapes of the array arguments
+        dtypes : dtypes of the array arguments
+    """
+
+    alg: str
+    path: str
+    wall_s: float
+    cpu_s: float
+    alloc_bytes: int | None
+    shapes: tuple[tuple[int, ...], ...]
+    dtypes: tuple[str, ...]
+
+
+@dataclass
+class AlgStats:
+    calls: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    alloc_bytes: int = 0
+    shapes: set[tuple[tuple[int, ...], ...]] = field(default_factory=set)
+    dtypes: set[tuple[str, ...]] = field(default_factory=set)
+
+
+class StatsSink:
+    """Sink aggregating records per (alg, path) pair
+
+    Args:
+        keep_records : also keep every record in the records list
+    """
+
+    def __init__(self, keep_records: bool = False):
+        self.stats: dict[tuple[str, str], AlgStats] = {}
+        self.records: list[CallRecord] = []
+        self._keep_records = keep_records
+
+    def __call__(self, record: CallRecord):
+        stats = self.stats.setdefault((record.alg, record.path), AlgStats())
+        stats.calls += 1
+        stats.wall_s += record.wall_s
+        stats.cpu_s += record.cpu_s
+        stats.alloc_bytes = max(stats.alloc_bytes, record.alloc_bytes or 0)
+        stats.shapes.add(record.shapes)
+        stats.dtypes.add(record.dtypes)
+        if self._keep_records:
+            self.records.append(record)
+
+    def summary(self) -> str:
+        """Table of the collected stats, sorted by total wall time"""
+        lines = [f"{'alg':<32} {'path':<6} {'calls':>6} {'wall,s':>9} {'cpu,s':>9} {'peak,MB':>9}"]
+        for (alg, path), s in sorted(self.stats.items(), key=lambda item: -item[1].wall_s):
+            lines.append(f"{alg:<32} {path:<6} {s.calls:>6} {s.wall_s:>9.3f} {s.cpu_s:>9.3f} {s.alloc_bytes / 2**20:>9.1f}")
+        return "\n".join(lines)
+
+
+class LoggingSink:
+    """Sink writing each record into the logger
+
+    Args:
+        logger : target logger, 'viirs_tools.profiling' one by default
+        level : logging level of the records
+    """
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO):
+        self._logger = logging.getLogger(__name__) if logger is None else logger
+        self._level = level
+
+    def __call__(self, record: CallRecord):
+        self._logger.log(
+            self._level,
+            "%s [%s] wall=%.4fs cpu=%.4fs alloc=%s shapes=%s dtypes=%s",
+            record.alg,
+            record.path,
+            record.wall_s,
+            record.cpu_s,
+            record.alloc_bytes,
+            record.shapes,
+            record.dtypes,
+        )
+
+
+def is_active() -> bool:
+    return len(_SINKS) != 0
+
+
+@contextmanager
+def profile(sink: Sink | None = None, trace_memory: bool = True) -> Iterator[Sink]:
+    """Enable instrumentation of the algs returned by Runner.get_alg_* inside the context
+    Algs got outside of any profile() context are returned as is, without any overhead,
+    so they are never measured, even when called inside the context: algs fetched once
+    and reused have to be got from the Runner again inside the context to be profiled
+
+    Args:
+        sink : callable receiving CallRecord of each call, new StatsSink by default
+        trace_memory : measure allocated bytes with tracemalloc, which slows the algs down;
+            tracing is started for the context if it was not running yet
+
+    Returns:
+        Context manager yielding the sink
+    """
+    sink = StatsSink() if sink is None else sink
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    _SINKS.append(sink)
+    try:
+        yield sink
+    finally:
+        _SINKS.remove(sink)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+def _describe(args: tuple, kwargs: dict) -> tuple[str, tuple, tuple]:
+    path = "numpy"
+    shapes, dtypes = [], []
+    for arg in (*args, *kwargs.values()):
+        if type(arg).__module__.startswith("xarray"):
+            path = "xarray"
+        if hasattr(arg, "shape") and hasattr(arg, "dtype"):
+            shapes.append(tuple(arg.shape))
+            dtypes.append(str(arg.dtype))
+    return path, tuple(shapes), tuple(dtypes)
+
+
+def instrument(alg: AlgEnum, func: Callable) -> Callable:
+    """Wrap the alg implementation for reporting its calls into the active sinks
+    Calls made after leaving all profile() contexts are not measured
+    """
+    name = f"{type(alg).__name__}.{alg.name}"
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any):
+        if not _SINKS:
+            return func(*args, **kwargs)
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        result = func(*args, **kwargs)
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        alloc = tracemalloc.get_traced_memory()[1] - base if tracing else None
+
+        path, shapes, dtypes = _describe(args, kwargs)
+        record = CallRecord(name, path, wall, cpu, alloc, shapes, dtypes)
+        for sink in tuple(_SINKS):
+            sink(record)
+        return result
+
+    return wrapper
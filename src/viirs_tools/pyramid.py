@@ -0,0 +1,124 @@
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+from viirs_tools.runner import AlgsIndex, AlgsLST
+from viirs_tools.utils.enums import AlgEnum
+
+REDUCERS = ("mean", "majority")
+
+# Majority overviews count each value of the mask separately, masks have a few of them
+MAX_CLASSES = 16
+
+OVERVIEWS_SUFFIX = ".overviews.npz"
+
+
+def default_reducer(alg: AlgEnum) -> str:
+    """Get reducer of the product overviews: mean for the continuous index and LST values,
+    majority for the masks
+    """
+    return "mean" if isinstance(alg, (AlgsIndex, AlgsLST)) else "majority"
+
+
+def build_overviews(data: np.ndarray, levels: int, reducer: str = "mean") -> list[np.ndarray]:
+    """Build 2x, 4x, 8x... overviews of the product over its last two axes
+    Each level is reduced from the block sums of the previous one, not from its values,
+    so the 2**k overview is exactly the reduction of the 2**k x 2**k block of the data,
+    while the data is traversed once. Edge blocks of the odd sizes are partial ones
+
+    Args:
+        data : product values, NaN is missing
+        levels : number of overviews
+        reducer : 'mean' for NaN-ignoring mean, 'majority' for the most frequent
+            valid value of the masks of integer values, ties go to the smallest value
+
+    Returns:
+        Overviews from the 2x one, float arrays with NaN for the blocks without valid values
+    """
+    if reducer not in REDUCERS:
+        raise ValueError(f"Unknown reducer '{reducer}', expected one of {REDUCERS}")
+    if levels < 0:
+        raise ValueError(f"Number of overview levels must be non-negative, got {levels}")
+    data = np.asarray(data)
+    if data.ndim < 2:
+        raise ValueError(f"Overviews require at least 2D data, got {data.ndim}D")
+    dtype = data.dtype if data.dtype.kind == "f" else np.dtype(np.float64)
+    valid = ~np.isnan(data) if data.dtype.kind == "f" else np.ones(data.shape, dtype=bool)
+
+    if reducer == "mean":
+        # (sum, count) of the valid values
+        state = [np.where(valid, data, 0.0), valid]
+        classes = None
+    else:
+        # masks have integer values, so the classes are the range of them,
+        # found without sorting the data as np.unique does
+        lo, hi = (np.nanmin(data), np.nanmax(data)) if valid.any() else (0, 0)
+        if hi - lo >= MAX_CLASSES:
+            raise ValueError(f"Majority overviews are for masks of at most {MAX_CLASSES} integer values, got range [{lo}, {hi}]")
+        classes = np.arange(lo, hi + 1, dtype=np.float64)
+        # counts of each class
+        state = [data == c for c in classes]
+        if lo != np.floor(lo) or sum(np.count_nonzero(s) for s in state) != np.count_nonzero(valid):
+            raise ValueError("Majority overviews are for masks of integer values")
+
+    overviews = []
+    for _ in range(levels):
+        state = [_block_sum(s) for s in state]
+        overviews.append(_reduce(state, classes).astype(dtype, copy=False))
+    return overviews
+
+
+def overviews_path(product_path: str) -> str:
+    """Get path of the product overviews stored alongside, e.g. 'cloud_vibcm_day.overviews.npz'"""
+    return os.path.splitext(product_path)[0] + OVERVIEWS_SUFFIX
+
+
+def save_overviews(path: str, overviews: Sequence[np.ndarray]):
+    """Save overviews as the compressed .npz file, keyed by the factor as 'x2', 'x4'..."""
+    np.savez_compressed(path, **{f"x{2 ** (i + 1)}": overview for i, overview in enumerate(overviews)})
+
+
+def load_overview(path: str, factor: int) -> np.ndarray:
+    """Load the single overview, other ones are not read
+
+    Args:
+        path : overviews file, see overviews_path
+        factor : reduction factor, power of 2
+
+    Returns:
+        Overview of the product
+    """
+    with np.load(path) as file:
+        key = f"x{factor}"
+        if key not in file.files:
+            raise KeyError(f"No {factor}x overview in {path}, available: {file.files}")
+        return file[key]
+
+
+def _block_sum(values: np.ndarray) -> np.ndarray:
+    # Sum of the 2x2 blocks of the last two axes, odd edges are partial blocks.
+    # Strided adds are several times faster than the sum over the reshaped blocks
+    rows, cols = values.shape[-2:]
+    dtype = np.float64 if values.dtype.kind == "f" else np.uint32
+    out = np.zeros((*values.shape[:-2], (rows + 1) // 2, (cols + 1) // 2), dtype=dtype)
+    for r in (0, 1):
+        for c in (0, 1):
+            part = values[..., r::2, c::2]
+            out[..., : part.shape[-2], : part.shape[-1]] += part
+    return out
+
+
+def _reduce(state: list[np.ndarray], classes: np.ndarray | None) -> np.ndarray:
+    if classes is None:
+        total, count = state
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+    # the first of the equal counts wins, classes are increasing
+    best = state[0].copy()
+    out = np.where(best > 0, classes[0], np.nan)
+    for value, count in zip(classes[1:], state[1:], strict=True):
+        more = count > best
+        out[more] = value
+        np.maximum(best, count, out=best)
+    return out
@@ -1,9 +1,15 @@
-from collections.abc import Callable
+import importlib
+from collections.abc import Callable, Iterator, Mapping
 from enum import Enum
 from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-from viirs_tools.algs import cloud, index, lst, night, utils, water
-from viirs_tools.utils.types import AlgEnum
+from viirs_tools import profiling
+from viirs_tools.backends import AUTO, BACKEND_NAMES, Backend, Calibration, Dispatcher, make_backends
+from viirs_tools.utils.enums import AlgEnum
+
+if TYPE_CHECKING:
+    from viirs_tools.cache import ResultCache
 
 
 class AlgsCloud(AlgEnum):
@@ -25,6 +31,7 @@ class AlgsLST(AlgEnum):
 
 class AlgsNight(AlgEnum):
     NAIVE = "AlgsNight.NAIVE: Naive, any time, [default]"
+    SOLAR = "AlgsNight.SOLAR: Solar zenith angle threshold, any time"
 
 
 class AlgsWater(AlgEnum):
@@ -35,25 +42,66 @@ class AlgsUtils(AlgEnum):
     MERGE_DAY_NIGHT = "AlgsUtils.MERGE_DAY_NIGHT: Merge data by day-night mask, [default]"
 
 
+class _LazyImpls(Mapping):
+    """Read-only mapping of algs to their implementations, given as
+    '<module>.<function>' paths inside viirs_tools.algs
+    Alg modules (and numpy with xarray) are imported on the first access to the implementation
+    """
+
+    def __init__(self, paths: dict[AlgEnum, str]):
+        self._paths = paths
+        self._impls: dict[AlgEnum, Callable] = {}
+
+    def __getitem__(self, alg: AlgEnum) -> Callable:
+        if alg not in self._impls:
+            module, _, name = self._paths[alg].rpartition(".")
+            self._impls[alg] = getattr(importlib.import_module(f"viirs_tools.algs.{module}"), name)
+        return self._impls[alg]
+
+    def __iter__(self) -> Iterator[AlgEnum]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def path(self, alg: AlgEnum) -> str:
+        return self._paths[alg]
+
+
+# numba kernels of the algs, inside viirs_tools.algs
+_JIT_PATHS = {
+    AlgsCloud.VIFCM_DAY: "jit.vifcm_day",
+    AlgsCloud.VIFCM_NIGHT: "jit.vifcm_night",
+    AlgsNight.NAIVE: "jit.naive",
+    AlgsWater.WBODIES_DAY: "jit.water_bodies_day",
+}
+
+
+def _make_registry(impls: Mapping[type[AlgEnum], _LazyImpls]) -> Mapping[AlgEnum, Mapping[str, Backend]]:
+    return MappingProxyType(
+        {alg: MappingProxyType(make_backends(algs.path(alg), _JIT_PATHS.get(alg))) for algs in impls.values() for alg in algs}
+    )
+
+
 class Runner:
-    _IMPL_AlgsIndex = MappingProxyType({AlgsIndex.NDVI: index.ndvi, AlgsIndex.NDSI: index.ndsi})
-    _IMPL_AlgsNight = MappingProxyType({AlgsNight.NAIVE: night.naive})
-    _IMPL_AlgsCloud = MappingProxyType(
+    _IMPL_AlgsIndex = _LazyImpls({AlgsIndex.NDVI: "index.ndvi", AlgsIndex.NDSI: "index.ndsi"})
+    _IMPL_AlgsNight = _LazyImpls({AlgsNight.NAIVE: "night.naive", AlgsNight.SOLAR: "night.solar"})
+    _IMPL_AlgsCloud = _LazyImpls(
         {
-            AlgsCloud.VIBCM_DAY: cloud.vibcm_day,
-            AlgsCloud.VIFCM_DAY: cloud.vifcm_day,
-            AlgsCloud.VIFCM_NIGHT: cloud.vifcm_night,
+            AlgsCloud.VIBCM_DAY: "cloud.vibcm_day",
+            AlgsCloud.VIFCM_DAY: "cloud.vifcm_day",
+            AlgsCloud.VIFCM_NIGHT: "cloud.vifcm_night",
         }
     )
-    _IMPL_AlgsLST = MappingProxyType(
+    _IMPL_AlgsLST = _LazyImpls(
         {
-            AlgsLST.MONO_WINDOW_I05: lst.mono_window_i05,
-            AlgsLST.MONO_WINDOW_M15: lst.mono_window_m15,
-            AlgsLST.MONO_WINDOW_M16: lst.mono_window_m16,
+            AlgsLST.MONO_WINDOW_I05: "lst.mono_window_i05",
+            AlgsLST.MONO_WINDOW_M15: "lst.mono_window_m15",
+            AlgsLST.MONO_WINDOW_M16: "lst.mono_window_m16",
         }
     )
-    _IMPL_AlgsWater = MappingProxyType({AlgsWater.WBODIES_DAY: water.water_bodies_day})
-    _IMPL_AlgsUtils = MappingProxyType({AlgsUtils.MERGE_DAY_NIGHT: utils.merge_day_night})
+    _IMPL_AlgsWater = _LazyImpls({AlgsWater.WBODIES_DAY: "water.water_bodies_day"})
+    _IMPL_AlgsUtils = _LazyImpls({AlgsUtils.MERGE_DAY_NIGHT: "utils.merge_day_night"})
 
     _IMPLS = MappingProxyType(
         {
@@ -66,10 +114,38 @@ class Runner:
         }
     )
 
-    def __init__(self):
-        pass
-
-    def _show_algs(self, algs: dict[Enum, Callable]):
+    # Backends of each alg by name, see backends.make_backends
+    _BACKENDS = _make_registry(_IMPLS)
+
+    def __init__(
+        self,
+        cache: "ResultCache | None" = None,
+        backend: str | Mapping[AlgEnum, str] | None = None,
+        calibration: Calibration | None = None,
+    ):
+        """
+        Args:
+            cache : result cache wrapping the returned algs, results are not cached if not given
+            backend : backend of all algs or by alg, one of backends.BACKEND_NAMES or 'auto' for the fastest
+                one by the calibration; algs dispatch by the input type themselves if not given
+            calibration : calibration of the 'auto' backend, the one in default_calibration_path() by default
+        """
+        names = [backend] if isinstance(backend, str) else [] if backend is None else list(backend.values())
+        for name in names:
+            if name != AUTO and name not in BACKEND_NAMES:
+                raise ValueError(f"Unknown backend '{name}', expected one of {(AUTO, *BACKEND_NAMES)}")
+        self.cache = cache
+        self.backend = backend
+        self._calibration = calibration
+
+    @property
+    def calibration(self) -> Calibration:
+        """Calibration of the 'auto' backend, loaded on the first access"""
+        if self._calibration is None:
+            self._calibration = Calibration()
+        return self._calibration
+
+    def _show_algs(self, algs: Mapping[Enum, Callable]):
         print("<Key>: <Description>")
         for item in algs:
             print(item.value)
@@ -100,7 +176,15 @@ class Runner:
     def _get_alg(self, impls, algs, alg=None) -> Callable:
         if alg is None:
             alg = next(iter(algs))
-        return impls[alg]
+        policy = self.backend.get(alg) if isinstance(self.backend, Mapping) else self.backend
+        impl = impls[alg]
+        if policy is not None:
+            impl = Dispatcher(alg, Runner._BACKENDS[alg], policy, self.calibration if policy == AUTO else None)
+        if self.cache is not None:
+            impl = self.cache.wrap(alg, impl)
+        if profiling.is_active():
+            return profiling.instrument(alg, impl)
+        return impl
 
     def get_alg_index(self, alg: AlgsIndex | None = None) -> Callable:
         return self._get_alg(Runner._IMPL_AlgsIndex, AlgsIndex, alg=alg)
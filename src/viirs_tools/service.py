@@ -0,0 +1,323 @@
+import fnmatch
+import glob
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from viirs_tools.cli import _TIMESTAMP, GranuleReport, process_granule
+from viirs_tools.grid import Grid
+from viirs_tools.products import GEO_BANDS, required_bands
+from viirs_tools.runner import Runner
+from viirs_tools.utils.enums import AlgEnum
+
+logger = logging.getLogger(__name__)
+
+# (path, arrival time as time.time())
+Arrival = tuple[str, float]
+
+
+class PollingWatcher:
+    """Directory watcher comparing listings, works on any filesystem
+    File is reported once its size and mtime are the same on two consecutive polls,
+    so files still being written are not picked up
+
+    Args:
+        directory : watched directory
+        patterns : file name patterns to report
+        interval : seconds between polls
+    """
+
+    def __init__(self, directory: str, patterns: Sequence[str], interval: float = 1.0):
+        self.directory = directory
+        self.patterns = tuple(patterns)
+        self.interval = interval
+        self._stats: dict[str, tuple[int, float]] = {}
+        self._arrivals: dict[str, float] = {}
+        self._reported: set[str] = set()
+
+    def poll(self) -> list[Arrival]:
+        """Single listing of the directory
+
+        Returns:
+            Newly completed files with the time they were first seen
+        """
+        now = time.time()
+        stats = {}
+        for pattern in self.patterns:
+            for path in glob.glob(os.path.join(self.directory, pattern)):
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                stats[path] = (st.st_size, st.st_mtime)
+
+        ready = []
+        for path, stat in stats.items():
+            if path in self._reported:
+                continue
+            self._arrivals.setdefault(path, now)
+            if self._stats.get(path) == stat:
+                ready.append((path, self._arrivals.pop(path)))
+                self._reported.add(path)
+        self._stats = stats
+        self._reported &= stats.keys()
+        return sorted(ready)
+
+    def wait(self, timeout: float) -> list[Arrival]:
+        """Poll until some files are completed or timeout is reached"""
+        deadline = time.monotonic() + timeout
+        while True:
+            ready = self.poll()
+            if ready or time.monotonic() >= deadline:
+                return ready
+            time.sleep(min(self.interval, max(deadline - time.monotonic(), 0)))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify directory watcher, requires inotify_simple (service extra)
+    Files are reported when closed after writing or moved into the directory,
+    files already present on start are reported by the first wait
+
+    Args:
+        directory : watched directory
+        patterns : file name patterns to report
+    """
+
+    def __init__(self, directory: str, patterns: Sequence[str]):
+        from inotify_simple import INotify, flags
+
+        self.directory = directory
+        self.patterns = tuple(patterns)
+        self._inotify = INotify()
+        self._inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO)
+        now = time.time()
+        self._pending = sorted((os.path.join(directory, name), now) for name in os.listdir(directory) if self._match(name))
+
+    def _match(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def wait(self, timeout: float) -> list[Arrival]:
+        ready, self._pending = self._pending, []
+        events = self._inotify.read(timeout=0 if ready else int(timeout * 1000))
+        now = time.time()
+        ready += [(os.path.join(self.directory, e.name), now) for e in events if self._match(e.name)]
+        return ready
+
+    def close(self):
+        self._inotify.close()
+
+
+def make_watcher(directory: str, patterns: Sequence[str], interval: float = 1.0, inotify: bool | None = None):
+    """Get inotify watcher if available, polling one otherwise
+
+    Args:
+        directory : watched directory
+        patterns : file name patterns to report
+        interval : polling interval, seconds
+        inotify : force (True) or disable (False) inotify, auto by default
+    """
+    if inotify is not False:
+        try:
+            return InotifyWatcher(directory, patterns)
+        except (ImportError, OSError):
+            if inotify:
+                raise
+            logger.info("inotify is not available, polling %s every %.1fs", directory, interval)
+    return PollingWatcher(directory, patterns, interval)
+
+
+@dataclass
+class LatencyRecord:
+    """Timings of the single granule set, times are time.time() values
+
+    Args:
+        key : acquisition timestamp (AYYYYDDD.HHMM)
+        files : files of the set by role
+        arrived : arrival of the first file of the set
+        completed : arrival of the last file, processing could start
+        finished : products are written
+        report : processing report
+    """
+
+    key: str
+    files: dict[str, str]
+    arrived: float
+    completed: float
+    finished: float
+    report: GranuleReport
+
+    @property
+    def wait_s(self) -> float:
+        """Time waiting for the set to complete"""
+        return self.completed - self.arrived
+
+    @property
+    def latency_s(self) -> float:
+        """Time from the set completion to the products"""
+        return self.finished - self.completed
+
+
+@dataclass
+class _PendingSet:
+    files: dict[str, str] = field(default_factory=dict)
+    arrived: float = 0.0
+    completed: float = 0.0
+
+
+class GranuleSets:
+    """Matching of the arrived files into sets by acquisition timestamp
+
+    Args:
+        roles : file name pattern by role, e.g. {'image': '*02IMG*', 'geo': '*03MOD*'}
+        max_age : seconds after which the incomplete set is dropped
+    """
+
+    def __init__(self, roles: dict[str, str], max_age: float = 3600.0):
+        self.roles = dict(roles)
+        self.max_age = max_age
+        self._pending: dict[str, _PendingSet] = {}
+
+    def add(self, path: str, arrived: float) -> tuple[str, _PendingSet] | None:
+        """Add the arrived file
+
+        Returns:
+            (key, set) if the file completes its set, None otherwise
+        """
+        name = os.path.basename(path)
+        ts = _TIMESTAMP.search(name)
+        role = next((r for r, pattern in self.roles.items() if fnmatch.fnmatch(name, pattern)), None)
+        if ts is None or role is None:
+            logger.debug("Skipping unmatched file %s", path)
+            return None
+
+        pending = self._pending.setdefault(ts[0], _PendingSet(arrived=arrived))
+        pending.files[role] = path
+        pending.arrived = min(pending.arrived, arrived)
+        pending.completed = max(pending.completed, arrived)
+        if pending.files.keys() != self.roles.keys():
+            return None
+        return ts[0], self._pending.pop(ts[0])
+
+    def expire(self, now: float) -> list[str]:
+        """Drop incomplete sets older than max_age
+
+        Returns:
+            Keys of the dropped sets
+        """
+        expired = [key for key, pending in self._pending.items() if now - pending.arrived > self.max_age]
+        for key in expired:
+            logger.warning("Dropping incomplete granule set %s: %s", key, sorted(self._pending.pop(key).files))
+        return expired
+
+
+class Service:
+    """Long-running processing of granule sets landing into the directory
+    Set is processed as soon as all of its files arrive, in the same process,
+    so the runner and imported modules stay warm between granules
+
+    Args:
+        directory : landing directory
+        products : desired products
+        out_dir : output directory, products are saved into out_dir/<granule name>/
+        image_pattern : I-band granule file pattern
+        geo_pattern : M-band geolocation file pattern, required for gridding and GEO_BANDS inputs
+        grid : target grid, products are kept in swath geometry if not given
+        overviews : number of overview levels saved alongside each product
+        watcher : directory watcher, make_watcher one by default
+        sink : callable receiving LatencyRecord of each set, e.g. for exporting metrics
+        max_age : seconds after which the incomplete set is dropped
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        products: Sequence[AlgEnum],
+        out_dir: str,
+        image_pattern: str = "*02IMG*.nc",
+        geo_pattern: str = "*03MOD*.nc",
+        grid: Grid | None = None,
+        overviews: int = 0,
+        watcher: PollingWatcher | InotifyWatcher | None = None,
+        sink: Callable[[LatencyRecord], None] | None = None,
+        max_age: float = 3600.0,
+    ):
+        self.products = list(products)
+        self.out_dir = out_dir
+        self.grid = grid
+        self.overviews = overviews
+        roles = {"image": image_pattern}
+        if grid is not None or required_bands(self.products) & GEO_BANDS:
+            roles["geo"] = geo_pattern
+        self.sets = GranuleSets(roles, max_age)
+        self.watcher = make_watcher(directory, list(roles.values())) if watcher is None else watcher
+        self.sink = sink
+        self.records: list[LatencyRecord] = []
+        self.runner = Runner()
+
+    def process(self, arrivals: Iterable[Arrival]) -> list[LatencyRecord]:
+        """Match the arrived files and process completed sets"""
+        records = []
+        for path, arrived in arrivals:
+            matched = self.sets.add(path, arrived)
+            if matched is None:
+                continue
+            key, pending = matched
+            report = process_granule(
+                pending.files["image"],
+                self.products,
+                self.out_dir,
+                self.grid,
+                pending.files.get("geo"),
+                runner=self.runner,
+                overviews=self.overviews,
+            )
+
+            record = LatencyRecord(key, pending.files, pending.arrived, pending.completed, time.time(), report)
+            if report.ok:
+                logger.info("%s processed, latency %.2fs (waited %.2fs for the set)", key, record.latency_s, record.wait_s)
+            else:
+                logger.error("%s failed: %s", key, report.error)
+            if self.sink is not None:
+                self.sink(record)
+            records.append(record)
+        self.records += records
+        self.sets.expire(time.time())
+        return records
+
+    def step(self, timeout: float = 1.0) -> list[LatencyRecord]:
+        """Wait for new files and process completed sets"""
+        return self.process(self.watcher.wait(timeout))
+
+    def serve(self, stop: threading.Event | None = None, max_sets: int | None = None):
+        """Process granule sets until stopped
+
+        Args:
+            stop : event stopping the service, runs forever if not given
+            max_sets : stop after processing this many sets
+        """
+        stop = threading.Event() if stop is None else stop
+        done = 0
+        try:
+            while not stop.is_set() and (max_sets is None or done < max_sets):
+                done += len(self.step())
+        finally:
+            self.watcher.close()
+
+    def summary(self) -> str:
+        """Latency statistics of the processed sets"""
+        ok = [r for r in self.records if r.report.ok]
+        if not ok:
+            return f"0/{len(self.records)} granule sets processed"
+        latency = np.array([r.latency_s for r in ok])
+        return (
+            f"{len(ok)}/{len(self.records)} granule sets processed, latency "
+            f"mean {latency.mean():.2f}s, p95 {np.percentile(latency, 95):.2f}s, max {latency.max():.2f}s"
+        )
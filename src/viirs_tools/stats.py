@@ -0,0 +1,192 @@
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+
+def _hist_update(counts: np.ndarray, values: np.ndarray, valid: np.ndarray, lo: float, hi: float):
+    """Count valid values into the per-pixel fixed-bin histogram in place
+    Values outside of [lo, hi) are counted in the edge bins, full bins of the integer
+    histogram saturate instead of wrapping around
+
+    Args:
+        counts : (bins, *shape) histogram
+        values : values of the shape
+        valid : pixels to count
+        lo : lower edge of the histogram
+        hi : upper edge of the histogram
+    """
+    bins = counts.shape[0]
+    cells = np.flatnonzero(valid)
+    idx = np.clip(((values.ravel()[cells] - lo) // ((hi - lo) / bins)).astype(np.int64), 0, bins - 1)
+    # each cell is hit at most once per update, so fancy indexing is enough
+    flat = counts.reshape(-1)
+    at = idx * valid.size + cells
+    flat[at] = np.minimum(flat[at], np.iinfo(counts.dtype).max - 1) + 1
+
+
+def _hist_quantile(counts: np.ndarray, lo: float, hi: float, q: Sequence[float]) -> np.ndarray:
+    """Get approximate quantiles from the per-pixel histogram, as centers of the bins
+    where the cumulative count reaches q of total, error is within half of the bin
+
+    Args:
+        counts : (bins, *shape) histogram
+        lo : lower edge of the histogram
+        hi : upper edge of the histogram
+        q : quantiles in [0, 1]
+
+    Returns:
+        (len(q), *shape) array, NaN for pixels without values
+    """
+    bins = counts.shape[0]
+    width = (hi - lo) / bins
+    total = np.zeros(counts.shape[1:], dtype=np.int64)
+    for plane in counts:
+        total += plane
+    targets = [qi * total for qi in q]
+
+    out = np.full((len(q), *counts.shape[1:]), np.nan)
+    running = np.zeros_like(total)
+    for b, plane in enumerate(counts):
+        running += plane
+        for i, target in enumerate(targets):
+            np.copyto(out[i], lo + (b + 0.5) * width, where=np.isnan(out[i]) & (running > 0) & (running >= target))
+    return out
+
+
+class PixelStats:
+    """Online per-pixel statistics: count, mean, variance, min/max and approximate quantiles
+    Updates are vectorised Welford steps, so raw history is never kept.
+    States are mergeable, accumulators filled from disjoint data (e.g. date ranges
+    processed by different workers) combine into the same result as the single pass
+
+    Args:
+        shape : grid shape
+        lo : lower edge of the quantile histogram
+        hi : upper edge of the quantile histogram
+        bins : number of histogram bins, 0 disables quantiles;
+            histogram takes bins * 4 bytes per pixel
+    """
+
+    _FIELDS = ("count", "mean", "m2", "min", "max", "hist")
+
+    def __init__(self, shape: tuple[int, ...], lo: float = 0.0, hi: float = 1.0, bins: int = 0):
+        if bins > 0 and hi <= lo:
+            raise ValueError(f"Invalid histogram range: [{lo}, {hi})")
+        self.shape = tuple(shape)
+        self.lo, self.hi, self.bins = float(lo), float(hi), int(bins)
+        self.count = np.zeros(self.shape, dtype=np.int64)
+        self.mean = np.zeros(self.shape)
+        self.m2 = np.zeros(self.shape)
+        self.min = np.full(self.shape, np.nan)
+        self.max = np.full(self.shape, np.nan)
+        self.hist = np.zeros((self.bins, *self.shape), dtype=np.uint32)
+
+    def update(self, values: np.ndarray, mask: np.ndarray | None = None):
+        """Add the single observation per pixel
+
+        Args:
+            values : values of the grid's shape, NaN is missing
+            mask : optional pixels to use, e.g. clear-sky ones
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != self.shape:
+            raise ValueError(f"Values shape {values.shape} does not match {self.shape}")
+        valid = ~np.isnan(values)
+        if mask is not None:
+            valid &= np.asarray(mask, dtype=bool)
+
+        self.count += valid
+        delta = np.subtract(values, self.mean, out=np.zeros(self.shape), where=valid)
+        self.mean += np.divide(delta, self.count, out=np.zeros(self.shape), where=valid)
+        self.m2 += delta * np.subtract(values, self.mean, out=np.zeros(self.shape), where=valid)
+        np.fmin(self.min, values, out=self.min, where=valid)
+        np.fmax(self.max, values, out=self.max, where=valid)
+        if self.bins:
+            _hist_update(self.hist, values, valid, self.lo, self.hi)
+
+    def merge(self, other: "PixelStats") -> "PixelStats":
+        """Combine other accumulator into this one in place (Chan et al. parallel update)
+
+        Returns:
+            self
+        """
+        if other.shape != self.shape or (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("Cannot merge accumulators with different shapes or histograms")
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(count > 0, other.count / count, 0)
+        self.m2 += other.m2 + delta**2 * self.count * weight
+        self.mean += delta * weight
+        self.count = count
+        np.fmin(self.min, other.min, out=self.min)
+        np.fmax(self.max, other.max, out=self.max)
+        self.hist += other.hist
+        return self
+
+    def variance(self, ddof: int = 0) -> np.ndarray:
+        """Per-pixel variance, NaN where count <= ddof"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.variance(ddof))
+
+    def quantile(self, q: float | Sequence[float]) -> np.ndarray:
+        """Approximate per-pixel quantiles, error is within half of the histogram bin
+
+        Args:
+            q : quantile or sequence of quantiles in [0, 1]
+
+        Returns:
+            Array of the grid's shape for scalar q, (len(q), *shape) otherwise
+        """
+        if not self.bins:
+            raise ValueError("Quantiles are disabled, set bins > 0")
+        scalar = np.isscalar(q)
+        out = _hist_quantile(self.hist, self.lo, self.hi, [q] if scalar else list(q))
+        return out[0] if scalar else out
+
+    def result(self) -> dict[str, np.ndarray]:
+        """Get count, mean, var, min and max by keys"""
+        return {
+            "count": self.count,
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "var": self.variance(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        """Get serialisable state, arrays only"""
+        state = {name: getattr(self, name) for name in self._FIELDS}
+        state["histogram"] = np.array([self.lo, self.hi, self.bins])
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict[str, np.ndarray]) -> "PixelStats":
+        lo, hi, bins = state["histogram"]
+        stats = cls(state["count"].shape, lo, hi, int(bins))
+        for name in cls._FIELDS:
+            setattr(stats, name, np.array(state[name], dtype=getattr(stats, name).dtype))
+        return stats
+
+    def save(self, path: str):
+        """Save state into the .npz file"""
+        np.savez_compressed(path, **self.to_dict())
+
+    @classmethod
+    def load(cls, path: str) -> "PixelStats":
+        """Load state saved by the save method"""
+        with np.load(path) as file:
+            return cls.from_dict(dict(file))
+
+
+def merge_all(accumulators: Iterable[PixelStats]) -> PixelStats:
+    """Merge accumulators, e.g. returned by parallel workers, into the new one"""
+    it = iter(accumulators)
+    first = next(it)
+    out = PixelStats.from_dict(first.to_dict())
+    for stats in it:
+        out.merge(stats)
+    return out
@@ -0,0 +1,5 @@
+from enum import Enum
+
+
+class AlgEnum(Enum):
+    pass
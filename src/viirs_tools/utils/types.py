@@ -1,9 +1,10 @@
-from enum import Enum
 from typing import Any
 
 import numpy as np
 import xarray as xr
 
+from viirs_tools.utils.enums import AlgEnum  # noqa: F401, kept for compatibility
+
 ArrayLike = np.ndarray | xr.DataArray
 
 
@@ -23,5 +24,8 @@ def _check_data(*args: Any):
     return all(not (type(arg) is not target_type or arg.shape != target_shape) for arg in args[1:])
 
 
-class AlgEnum(Enum):
-    pass
+def _is_xr(*args: Any) -> bool:
+    """Check if any of the args is xr.DataArray, algs take their xarray path then
+    and the pure NumPy one otherwise
+    """
+    return any(isinstance(arg, xr.DataArray) for arg in args)
@@ -0,0 +1,176 @@
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Clear_Sky_Confidence thresholds of the CLDMSK_L2 confident cloudy / probably cloudy /
+# probably clear / confident clear classes
+CONF_EDGES = (0.66, 0.95, 0.99)
+DAY_NIGHT = ("day", "night")
+
+Pair = tuple[np.ndarray, np.ndarray, np.ndarray | None, np.ndarray | None]
+
+
+class ConfusionCounter:
+    """Cloud mask confusion matrices stratified by day/night and Clear_Sky_Confidence bin
+    counts[day_night, conf_bin, predicted, reference], where 0 is cloud and 1 is clear
+
+    Args:
+        conf_edges : inner edges of the Clear_Sky_Confidence bins
+    """
+
+    def __init__(self, conf_edges: Sequence[float] = CONF_EDGES):
+        self.conf_edges = tuple(float(e) for e in conf_edges)
+        self.counts = np.zeros((len(DAY_NIGHT), len(self.conf_edges) + 1, 2, 2), dtype=np.int64)
+
+    def update(
+        self,
+        pred: np.ndarray,
+        ref: np.ndarray,
+        nmask: np.ndarray | None = None,
+        clear_conf: np.ndarray | None = None,
+    ):
+        """Count the single matched granule pair, all arrays are of the same shape
+
+        Args:
+            pred : integer cloud mask to validate, 1 is clear pixel, NaN is missing,
+                e.g. the vibcm_day output
+            ref : Integer_Cloud_Mask of CLDMSK_L2 (0 cloudy, 1 probably cloudy,
+                2 probably clear, 3 confident clear), negative or masked values are missing
+            nmask : day/night mask, 1 is night, NaN is missing, all pixels are day if not given
+            clear_conf : Clear_Sky_Confidence of CLDMSK_L2, NaN or masked values are missing,
+                all pixels go into the first bin if not given
+        """
+        pred = np.asarray(np.ma.filled(pred, np.nan), dtype=np.float64)
+        ref = np.asarray(np.ma.filled(ref, -1))
+        if pred.shape != ref.shape:
+            raise ValueError(f"Shapes of the masks differ: {pred.shape} and {ref.shape}")
+
+        valid = ~np.isnan(pred) & (ref >= 0)
+        idx = (ref >= 2).astype(np.int64)
+        idx += 2 * (pred == 1)
+        if clear_conf is not None:
+            clear_conf = np.asarray(np.ma.filled(clear_conf, np.nan), dtype=np.float64)
+            valid &= ~np.isnan(clear_conf)
+            idx += 4 * np.digitize(clear_conf, self.conf_edges)
+        if nmask is not None:
+            nmask = np.asarray(np.ma.filled(nmask, np.nan), dtype=np.float64)
+            valid &= ~np.isnan(nmask)
+            idx += 4 * self.counts.shape[1] * (nmask == 1)
+
+        self.counts += np.bincount(idx[valid], minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other: "ConfusionCounter") -> "ConfusionCounter":
+        """Add counts of the other counter in place
+
+        Returns:
+            self
+        """
+        if other.conf_edges != self.conf_edges:
+            raise ValueError("Cannot merge counters with different confidence bins")
+        self.counts += other.counts
+        return self
+
+    def matrix(self, day_night: str | None = None, conf_bin: int | None = None) -> np.ndarray:
+        """Get 2x2 [predicted, reference] confusion matrix, summed over the not given strata
+
+        Args:
+            day_night : 'day' or 'night'
+            conf_bin : index of the Clear_Sky_Confidence bin
+        """
+        counts = self.counts
+        if day_night is not None:
+            counts = counts[DAY_NIGHT.index(day_night)][None]
+        if conf_bin is not None:
+            counts = counts[:, conf_bin][:, None]
+        return counts.sum(axis=(0, 1))
+
+    def metrics(self, day_night: str | None = None, conf_bin: int | None = None) -> dict[str, float]:
+        """Get scores of the cloud detection, NaN if undefined
+
+        Returns:
+            total count, accuracy, cloud probability of detection, cloud false alarm ratio,
+                clear probability of detection and Heidke skill score
+        """
+        m = self.matrix(day_night, conf_bin).astype(np.float64)
+        n = m.sum()
+        hits, misses, false_alarms, clear_hits = m[0, 0], m[1, 0], m[0, 1], m[1, 1]
+
+        def _div(a, b):
+            return a / b if b else np.nan
+
+        expected = ((hits + misses) * (hits + false_alarms) + (clear_hits + misses) * (clear_hits + false_alarms)) / n if n else np.nan
+        return {
+            "count": n,
+            "accuracy": _div(hits + clear_hits, n),
+            "cloud_pod": _div(hits, hits + misses),
+            "cloud_far": _div(false_alarms, hits + false_alarms),
+            "clear_pod": _div(clear_hits, clear_hits + false_alarms),
+            "hss": _div(hits + clear_hits - expected, n - expected),
+        }
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        return {"counts": self.counts, "conf_edges": np.array(self.conf_edges)}
+
+    @classmethod
+    def from_dict(cls, state: dict[str, np.ndarray]) -> "ConfusionCounter":
+        counter = cls(state["conf_edges"])
+        counter.counts += state["counts"]
+        return counter
+
+    def save(self, path: str):
+        np.savez(path, **self.to_dict())
+
+    @classmethod
+    def load(cls, path: str) -> "ConfusionCounter":
+        with np.load(path) as file:
+            return cls.from_dict(dict(file))
+
+
+def validate(pairs: Iterable[Pair], conf_edges: Sequence[float] = CONF_EDGES) -> ConfusionCounter:
+    """Validate the stream of matched (pred, ref, nmask, clear_conf) granule pairs
+    Only one pair is held in memory if pairs are generated lazily
+
+    Args:
+        pairs : iterable of arguments for ConfusionCounter.update
+        conf_edges : inner edges of the Clear_Sky_Confidence bins
+
+    Returns:
+        Accumulated counter
+    """
+    counter = ConfusionCounter(conf_edges)
+    for pair in pairs:
+        counter.update(*pair)
+    return counter
+
+
+def _validate_key(load_pair: Callable[[Hashable], Pair], key: Hashable, conf_edges: Sequence[float]) -> np.ndarray:
+    counter = ConfusionCounter(conf_edges)
+    counter.update(*load_pair(key))
+    return counter.counts
+
+
+def validate_parallel(
+    load_pair: Callable[[Hashable], Pair],
+    keys: Iterable[Hashable],
+    workers: int,
+    conf_edges: Sequence[float] = CONF_EDGES,
+) -> ConfusionCounter:
+    """Validate granule pairs in worker processes, merging their counters
+
+    Args:
+        load_pair : picklable (module-level) function, loading the matched
+            (pred, ref, nmask, clear_conf) pair by key, e.g. by the granule timestamp
+        keys : granule pair keys
+        workers : number of worker processes
+        conf_edges : inner edges of the Clear_Sky_Confidence bins
+
+    Returns:
+        Accumulated counter
+    """
+    counter = ConfusionCounter(conf_edges)
+    keys = list(keys)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for counts in executor.map(_validate_key, [load_pair] * len(keys), keys, [counter.conf_edges] * len(keys)):
+            counter.counts += counts
+    return counter
@@ -3,6 +3,7 @@ import pytest
 
 from tests.algs.utils import (
     IMAGE_SHAPE,
+    _np2xr,
     get_data_np,
     get_data_xr,
     get_np_from_list,
@@ -182,3 +183,56 @@ class TestVifcmNight:
 
         mask = cloud.vifcm_night(get_xr_seq_from_list(bi4), get_xr_seq_from_list(bi5))
         assert mask.equals(get_xr_seq_from_list(expected))
+
+
+def _scene(shape: tuple[int, ...]):
+    rng = np.random.default_rng(0)
+    ri1, ri2, ri3 = (rng.uniform(0, 60, shape) for _ in range(3))
+    bi5 = rng.uniform(230, 330, shape)
+    for band in (ri1, ri2, ri3, bi5):
+        band[..., 0, 0] = np.nan
+    return ri1, ri2, ri3, bi5
+
+
+class TestVibcmDaySweep:
+    @pytest.mark.parametrize("shape", [(16, 16), (2, 16, 16)])
+    def test_matches_single(self, shape):
+        ri1, ri2, ri3, bi5 = _scene(shape)
+        t3, t4 = np.array([312, 300, 280]), np.array([410, 225, 100])
+        out = cloud.vibcm_day_sweep(ri1, ri2, ri3, bi5, t3, t4)
+
+        assert out.shape == (3, *shape)
+        assert np.array_equal(out[0], cloud.vibcm_day(ri1, ri2, ri3, bi5), equal_nan=True)
+        assert np.array_equal(out[1], cloud.vibcm_day(ri1, ri2, ri3, bi5, use_alt_thresholds=True), equal_nan=True)
+        assert not np.array_equal(out[1], out[2], equal_nan=True)
+
+    def test_grid(self):
+        ri1, ri2, ri3, bi5 = _scene((16, 16))
+        t3, t4 = np.array([312, 300]), np.array([410, 225, 100])
+        out = cloud.vibcm_day_sweep(ri1, ri2, ri3, bi5, t3[:, None], t4[None, :])
+
+        assert out.shape == (2, 3, 16, 16)
+        assert np.array_equal(out[1, 1], cloud.vibcm_day(ri1, ri2, ri3, bi5, use_alt_thresholds=True), equal_nan=True)
+
+    def test_xr(self):
+        ri1, ri2, ri3, bi5 = _scene((16, 16))
+        args = [_np2xr(a) for a in (ri1, ri2, ri3, bi5)]
+        out = cloud.vibcm_day_sweep(*args, [312, 300], [410, 225])
+
+        assert out.dims == ("threshold", "x", "y")
+        assert list(out["t3_thr"].values) == [312, 300]
+        assert np.array_equal(out[1].values, cloud.vibcm_day(*args, use_alt_thresholds=True).values, equal_nan=True)
+
+
+class TestVifcmDaySweep:
+    def test_matches_single(self):
+        ri1, ri2, _, bi5 = _scene((2, 16, 16))
+        out = cloud.vifcm_day_sweep(ri1, ri2, bi5, t1_thr=[265, 250], t3_ref_thr=[70, 80])
+
+        assert out.shape == (2, 2, 16, 16)
+        assert np.array_equal(out[0], cloud.vifcm_day(ri1, ri2, bi5), equal_nan=True)
+        assert not np.array_equal(out[0], out[1], equal_nan=True)
+
+    def test_defaults(self):
+        ri1, ri2, _, bi5 = _scene((16, 16))
+        assert np.array_equal(cloud.vifcm_day_sweep(ri1, ri2, bi5), cloud.vifcm_day(ri1, ri2, bi5), equal_nan=True)
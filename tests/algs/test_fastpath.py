@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from tests.algs.utils import _np2xr
+from viirs_tools.algs import cloud, index, lst, night, utils, water
+
+
+def _get_scene(dtype, shape=(2, 16, 16)):
+    rng = np.random.default_rng(42)
+    scene = {
+        "ri1": rng.uniform(0, 40, shape),
+        "ri2": rng.uniform(0, 40, shape),
+        "ri3": rng.uniform(0, 40, shape),
+        "bi4": rng.uniform(240, 320, shape),
+        "bi5": rng.uniform(200, 330, shape),
+        "ndvi": rng.uniform(-0.3, 0.8, shape),
+        "cmask": (rng.random(shape) < 0.5).astype(float),
+        "nmask": rng.choice([0.0, 1.0, np.nan], shape),
+    }
+    missing = rng.random(shape) < 0.2
+    for name in ("ri1", "ri2", "ri3", "bi4", "bi5", "ndvi"):
+        scene[name][missing] = np.nan
+    scene["solza"] = np.where(missing, np.nan, rng.uniform(0, 180, shape))
+    scene["solza"][..., 1, :4] = 90  # threshold
+    scene["ri1"][..., 0, :4] = 0  # zero division
+    return {k: v.astype(dtype) for k, v in scene.items()}
+
+
+CASES = [
+    (cloud.vibcm_day, ("ri1", "ri2", "ri3", "bi5"), {}),
+    (cloud.vibcm_day, ("ri1", "ri2", "ri3", "bi5"), {"use_alt_thresholds": True}),
+    (cloud.vibcm_day, ("ri1", "ri2", "ri3", "bi5", "ndvi"), {}),
+    (cloud.vifcm_day, ("ri1", "ri2", "bi5"), {}),
+    (cloud.vifcm_night, ("bi4", "bi5"), {}),
+    (cloud.vifcm_night, ("bi4", "bi5", "nmask"), {}),
+    (index.ndvi, ("ri2", "ri1"), {}),
+    (index.ndsi, ("ri1", "ri3"), {}),
+    (night.naive, ("ri1", "bi4"), {}),
+    (night.solar, ("solza",), {}),
+    (night.solar, ("solza",), {"threshold": 96.0}),
+    (water.water_bodies_day, ("ri1", "ri2", "ri3"), {}),
+    (lst.mono_window_i05, ("bi5", "ndvi"), {}),
+    (lst.mono_window_m15, ("bi5", "ndvi", "cmask"), {}),
+    (lst.mono_window_m16, ("bi5", "ndvi", "cmask"), {}),
+    (utils.merge_day_night, ("ri1", "bi4", "nmask"), {}),
+]
+
+
+class TestFastPath:
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize(("alg", "names", "kwargs"), CASES)
+    def test_equivalence(self, alg, names, kwargs, dtype):
+        scene = _get_scene(dtype)
+        args = [scene[n] for n in names]
+
+        result_np = alg(*args, **kwargs)
+        result_xr = alg(*[_np2xr(a) for a in args], **kwargs)
+
+        assert type(result_np) is np.ndarray
+        assert result_np.dtype == result_xr.dtype
+        assert np.array_equal(result_np, result_xr.values, equal_nan=True)
+        assert result_xr.dims == ("time", "x", "y")
+        assert all(result_xr[d].equals(_np2xr(args[0])[d]) for d in result_xr.dims)
+
+    def test_inputs_untouched(self):
+        scene = _get_scene("float32")
+        copy = {k: v.copy() for k, v in scene.items()}
+        for alg, names, kwargs in CASES:
+            alg(*[scene[n] for n in names], **kwargs)
+        assert all(np.array_equal(scene[k], copy[k], equal_nan=True) for k in scene)
@@ -1,4 +1,6 @@
-from tests.algs.utils import IMAGE_SHAPE, get_data_np, get_data_xr
+import numpy as np
+
+from tests.algs.utils import IMAGE_SHAPE, get_data_np, get_data_xr, get_np_from_list, get_xr_from_list
 from viirs_tools.algs import index, lst
 
 
@@ -20,3 +22,15 @@ class TestLst:
 
         _test(IMAGE_SHAPE)
         _test((2, *IMAGE_SHAPE))
+
+    def test_cmask(self):
+        bt = [300, 300, np.nan]
+        ndvi = [0.3, 0.3, 0.3]
+        cmask = [1, 0, 1]
+
+        result = lst.mono_window_i05(get_np_from_list(bt), get_np_from_list(ndvi), get_np_from_list(cmask))
+        assert np.isnan(result[1:]).all()
+        assert not np.isnan(result[0]).any()
+
+        result = lst.mono_window_i05(get_xr_from_list(bt), get_xr_from_list(ndvi), get_xr_from_list(cmask))
+        assert result.isnull().values.ravel().tolist() == [False, True, True]
@@ -55,3 +55,64 @@ class TestNaive:
 
         mask = night.naive(get_xr_seq_from_list(ref), get_xr_seq_from_list(bt))
         assert mask.equals(get_xr_seq_from_list(expected))
+
+
+class TestSolar:
+    def test_alg(self):
+        solza = [np.nan, 10, 90, 90.5, 170]
+        expected = [np.nan, 0, 0, 1, 1]
+        mask = night.solar(get_np_from_list(solza))
+        assert np.allclose(mask, get_np_from_list(expected), equal_nan=True)
+
+        mask = night.solar(get_xr_seq_from_list(solza))
+        assert mask.equals(get_xr_seq_from_list(expected))
+
+        mask = night.solar(get_np_from_list(solza), threshold=96)
+        assert np.allclose(mask, get_np_from_list([np.nan, 0, 0, 0, 1]), equal_nan=True)
+
+
+class TestSolarZenith:
+    def test_known_values(self):
+        # Equinox noon at Greenwich: the sun is close to zenith at the equator
+        lat, lon = np.array([[0.0, 51.5, -89.0]]), np.zeros((1, 3))
+        zenith = night.solar_zenith(lat, lon, np.datetime64("2024-03-20T12:00"), step=1)
+        assert np.allclose(zenith, [[0, 51.5, 89]], atol=2.5)
+        # and below the horizon at the antimeridian
+        zenith = night.solar_zenith(lat[:, :1], lon[:, :1] + 180, np.datetime64("2024-03-20T12:00"), step=1)
+        assert zenith[0, 0] > 175
+
+    def test_step(self):
+        lat, lon = np.meshgrid(np.linspace(70, 40, 96), np.linspace(-20, 30, 80), indexing="ij")
+        time = np.datetime64("2024-06-01T06:00") + np.arange(96).reshape(-1, 1) * np.timedelta64(100, "ms")
+        full = night.solar_zenith(lat, lon, time, step=1)
+        coarse = night.solar_zenith(lat, lon, time, step=8)
+        assert coarse.shape == full.shape
+        # pixels are ~30 km apart here, the error is far below that on the real ~375 m ones
+        assert np.abs(coarse - full).max() < 0.05
+        assert np.array_equal(coarse[::8, ::8], full[::8, ::8])
+
+    def test_xr(self):
+        lat, lon = get_data_xr((2, *IMAGE_SHAPE))[:2]
+        lat, lon = lat * 2 - 40, lon * 4
+        zenith = night.solar_zenith(lat, lon, np.datetime64("2024-01-01T00:00"))
+        assert zenith.dims == lat.dims
+        assert np.allclose(zenith.values, night.solar_zenith(lat.values, lon.values, np.datetime64("2024-01-01T00:00")), equal_nan=True)
+
+    def test_missing(self):
+        lat = np.full((9, 9), 45.0)
+        lat[4, 4] = np.nan
+        zenith = night.solar_zenith(lat, np.zeros((9, 9)), np.datetime64("2024-01-01T00:00"), step=1)
+        assert np.isnan(zenith[4, 4]) and np.isnan(zenith).sum() == 1
+
+    def test_missing_step(self):
+        lat, lon = np.meshgrid(np.linspace(70, 40, 96), np.linspace(-20, 30, 80), indexing="ij")
+        time = np.datetime64("2024-06-01T06:00") + np.arange(96).reshape(-1, 1) * np.timedelta64(100, "ms")
+        # tie point, edge column and the pixel between the tie points
+        lat[8, 8] = np.nan
+        lon[:, -1] = np.nan
+        lat[13, 3] = np.nan
+        missing = np.isnan(lat) | np.isnan(lon)
+        full = night.solar_zenith(lat, lon, time, step=1)
+        coarse = night.solar_zenith(lat, lon, time, step=8)
+        assert np.array_equal(np.isnan(coarse), missing)
+        assert np.abs(coarse - full)[~missing].max() < 0.05
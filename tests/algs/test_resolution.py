@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from tests.algs.utils import _np2xr
+from viirs_tools.algs import lst, resolution
+
+
+def _blocked(data):
+    return data.reshape(*data.shape[:-2], data.shape[-2] // 2, 2, data.shape[-1] // 2, 2)
+
+
+def _get_mask(shape):
+    rng = np.random.default_rng(3)
+    mask = rng.choice([0.0, 1.0, np.nan], shape, p=[0.4, 0.4, 0.2])
+    mask[..., :2, :2] = np.nan  # fully missing block
+    return mask
+
+
+class TestIToM:
+    @pytest.mark.parametrize("shape", [(8, 12), (2, 8, 12)])
+    def test_mean(self, shape):
+        data = np.random.default_rng(0).uniform(0, 1, shape)
+        data[..., 0, 0] = np.nan
+        expected = _blocked(data).mean(axis=(-3, -1))
+        assert np.allclose(resolution.i_to_m(data, "mean"), expected, equal_nan=True)
+
+    @pytest.mark.filterwarnings("ignore:Mean of empty slice")
+    def test_nanmean(self):
+        data = _get_mask((2, 8, 12)) * 0.5
+        expected = np.nanmean(_blocked(data), axis=(-3, -1))
+        out = resolution.i_to_m(data)
+        assert out.shape == (2, 4, 6)
+        assert np.allclose(out, expected, equal_nan=True)
+
+    def test_majority(self):
+        data = _get_mask((8, 12))
+        blocks = _blocked(data)
+        valid = (~np.isnan(blocks)).sum(axis=(-3, -1))
+        ones = (blocks == 1).sum(axis=(-3, -1))
+        expected = np.where(valid == 0, np.nan, ones * 2 > valid)
+        assert np.array_equal(resolution.i_to_m(data, "majority"), expected, equal_nan=True)
+
+    def test_any_all(self):
+        data = np.array([[1, 0, 0, 0], [0, 0, 0, 0]], dtype=float)
+        data[:, 2:] = [[1, 1], [np.nan, 1]]
+        assert np.array_equal(resolution.i_to_m(data, "any"), [[1, 1]])
+        assert np.array_equal(resolution.i_to_m(data, "all"), [[0, 1]])
+        assert np.array_equal(resolution.i_to_m(data > 0, "any"), [[True, True]])
+        assert np.array_equal(resolution.i_to_m(np.full((2, 2), np.nan), "all"), [[np.nan]], equal_nan=True)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            resolution.i_to_m(np.zeros((3, 4)))
+        with pytest.raises(ValueError):
+            resolution.i_to_m(np.zeros((4, 4)), "median")
+
+    def test_xr(self):
+        data = _np2xr(_get_mask((2, 8, 12)))
+        out = resolution.i_to_m(data, "majority")
+        assert out.dims == data.dims
+        assert out.shape == (2, 4, 6)
+        assert "time" in out.coords and "x" not in out.coords
+
+
+class TestMToI:
+    def test_replicate(self):
+        data = np.arange(6.0).reshape(2, 3)
+        out = resolution.m_to_i(data)
+        assert np.array_equal(out, np.repeat(np.repeat(data, 2, axis=0), 2, axis=1))
+        assert np.array_equal(resolution.i_to_m(out, "mean"), data)
+
+    def test_chain(self):
+        rng = np.random.default_rng(5)
+        ndvi_i = rng.uniform(-0.3, 0.8, (8, 12))
+        bt_m = rng.uniform(250, 320, (4, 6))
+        out = lst.mono_window_m15(bt_m, resolution.i_to_m(ndvi_i))
+        assert out.shape == bt_m.shape
@@ -3,6 +3,7 @@ import pytest
 
 from tests.algs.utils import (
     IMAGE_SHAPE,
+    _np2xr,
     get_data_np,
     get_data_xr,
     get_np_from_list,
@@ -10,7 +11,7 @@ from tests.algs.utils import (
     get_xr_from_list,
     get_xr_seq_from_list,
 )
-from viirs_tools.algs import night, utils
+from viirs_tools.algs import cloud, night, utils
 
 
 class TestMerge:
@@ -59,3 +60,48 @@ class TestMerge:
 
         mask = utils.merge_day_night(get_xr_seq_from_list(day), get_xr_seq_from_list(night), get_xr_seq_from_list(nmask))
         assert mask.equals(get_xr_seq_from_list(expected))
+
+
+def _terminator_scene(shape: tuple[int, ...], day_cols: int):
+    rng = np.random.default_rng(1)
+    ri1, ri2, ri3 = (rng.uniform(0, 60, shape) for _ in range(3))
+    bi4, bi5 = rng.uniform(250, 320, shape), rng.uniform(230, 330, shape)
+    for band in (ri1, ri2, ri3):
+        band[..., day_cols:] = np.nan
+    for band in (ri1, ri2, ri3, bi4, bi5):
+        band[..., 0, 0] = np.nan
+    return ri1, ri2, ri3, bi4, bi5
+
+
+class TestRunDayNight:
+    @pytest.mark.filterwarnings("ignore:All-NaN slice")
+    @pytest.mark.parametrize("day_cols", [0, 5, 16])
+    @pytest.mark.parametrize("shape", [(16, 16), (2, 16, 16)])
+    def test_matches_merge(self, shape, day_cols):
+        ri1, ri2, ri3, bi4, bi5 = _terminator_scene(shape, day_cols)
+        nmask = night.naive(ri1, bi4)
+        expected = utils.merge_day_night(cloud.vibcm_day(ri1, ri2, ri3, bi5), cloud.vifcm_night(bi4, bi5, nmask), nmask)
+
+        out = utils.run_day_night(cloud.vibcm_day, cloud.vifcm_night, nmask, (ri1, ri2, ri3, bi5), (bi4, bi5, nmask))
+        assert out.dtype == expected.dtype
+        assert np.array_equal(out, expected, equal_nan=True)
+
+    def test_skips_absent_regime(self):
+        ri1, ri2, ri3, bi4, bi5 = _terminator_scene((16, 16), 0)
+        nmask = night.naive(ri1, bi4)
+
+        def _fail(*args):
+            raise AssertionError("day alg called for the night scene")
+
+        out = utils.run_day_night(_fail, cloud.vifcm_night, nmask, (ri1, ri2, ri3, bi5), (bi4, bi5))
+        assert np.array_equal(out, cloud.vifcm_night(bi4, bi5), equal_nan=True)
+
+    def test_xr(self):
+        args = [_np2xr(a) for a in _terminator_scene((16, 16), 5)]
+        ri1, ri2, ri3, bi4, bi5 = args
+        nmask = night.naive(ri1, bi4)
+        expected = utils.merge_day_night(cloud.vibcm_day(ri1, ri2, ri3, bi5), cloud.vifcm_day(ri1, ri2, bi5), nmask)
+
+        out = utils.run_day_night(cloud.vibcm_day, cloud.vifcm_day, nmask, (ri1, ri2, ri3, bi5), (ri1, ri2, bi5))
+        assert out.dims == expected.dims
+        assert np.array_equal(out.values, expected.values, equal_nan=True)
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+from viirs_tools.assimilator import assimilator
+from viirs_tools.assimilator.store import GranuleStore
+
+DAY_BYTES = 1000
+
+
+def _consume(path):
+    # slow callback releasing the space of the day
+    time.sleep(0.05)
+    shutil.rmtree(path)
+
+
+def _fail(path):
+    raise ValueError(f"cannot consume {path}")
+
+
+def _count(path):
+    # callback with the result, fails on the single day
+    count = len(os.listdir(path))
+    shutil.rmtree(path)
+    if path.endswith("2024-01-03"):
+        raise ValueError("broken day")
+    return count
+
+
+def _write_day(path):
+    os.makedirs(path, exist_ok=True)
+    for i in range(2):
+        with open(os.path.join(path, f"VNP02IMG.{i}.nc"), "wb") as file:
+            file.write(b"\0" * (DAY_BYTES // 2))
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch, tmp_path):
+    # Downloads are files of DAY_BYTES per day, records the bytes on disk before each one
+    on_disk = []
+
+    def _get_data_for_interval(path, start_d, end_d, names, geobox, dconc=4):
+        on_disk.append(assimilator._dir_size(str(tmp_path)))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "VNP02IMG.nc"), "wb") as file:
+            file.write(b"\0" * DAY_BYTES)
+
+    monkeypatch.setattr(assimilator, "_test_cmrfetch", lambda: None)
+    monkeypatch.setattr(assimilator, "_get_data_for_interval", _get_data_for_interval)
+    return on_disk
+
+
+def _assimilate(path, **kwargs):
+    assimilator.assimilate(["VNP02IMG"], "", datetime(2024, 1, 1), datetime(2024, 1, 8), str(path), 4, **kwargs)
+
+
+class TestThrottling:
+    def test_max_bytes(self, tmp_path, fake_fetch):
+        _assimilate(tmp_path, max_queue=100, assim_callback=_consume, max_bytes=2500)
+        assert len(fake_fetch) == 8
+        # the next day fits into the budget with at most one day pending
+        assert max(fake_fetch) <= 2500 - DAY_BYTES
+        assert os.listdir(tmp_path) == []
+
+    def test_unlimited(self, tmp_path, fake_fetch):
+        _assimilate(tmp_path, max_queue=100, assim_callback=_consume)
+        assert max(fake_fetch) > 2500 - DAY_BYTES
+
+    def test_min_free_bytes(self, tmp_path, fake_fetch, monkeypatch):
+        # 4000 bytes disk
+        monkeypatch.setattr(assimilator, "_free_bytes", lambda path: 4000 - assimilator._dir_size(path))
+        _assimilate(tmp_path, max_queue=100, assim_callback=_consume, min_free_bytes=1500)
+        assert max(fake_fetch) <= 4000 - 1500 - DAY_BYTES
+
+    def test_no_space(self, tmp_path, fake_fetch, monkeypatch):
+        monkeypatch.setattr(assimilator, "_free_bytes", lambda path: 100)
+        with pytest.raises(RuntimeError):
+            _assimilate(tmp_path, assim_callback=_consume, min_free_bytes=1000)
+
+    def test_callback_error(self, tmp_path, fake_fetch):
+        with pytest.raises(ValueError):
+            _assimilate(tmp_path, max_queue=1, assim_callback=_fail, max_bytes=1500)
+
+
+@pytest.fixture
+def fake_fetch_async(monkeypatch, tmp_path):
+    on_disk = []
+
+    async def _get_data_for_interval_async(path, start_d, end_d, names, geobox, dconc=4):
+        on_disk.append(assimilator._dir_size(str(tmp_path)))
+        await asyncio.sleep(0.01)
+        if start_d == "2024-01-05":
+            raise RuntimeError(f"Cannot download data for {start_d},{end_d}")
+        _write_day(path)
+
+    monkeypatch.setattr(assimilator, "_test_cmrfetch", lambda: None)
+    monkeypatch.setattr(assimilator, "_get_data_for_interval_async", _get_data_for_interval_async)
+    return on_disk
+
+
+def _collect(path, limit=None, **kwargs):
+    async def _run():
+        results = []
+        stream = assimilator.assimilate_async(["VNP02IMG"], "", datetime(2024, 1, 1), datetime(2024, 1, 8), str(path), 2, **kwargs)
+        async for interval in stream:
+            results.append(interval)
+            if len(results) == limit:
+                await stream.aclose()
+                break
+        return results
+
+    return asyncio.run(_run())
+
+
+class TestAsync:
+    def test_stream(self, tmp_path, fake_fetch_async):
+        results = _collect(tmp_path, assim_callback=_count, max_bytes=2500)
+        by_day = {r.day: r for r in results}
+        assert sorted(by_day) == [f"2024-01-0{d}" for d in range(1, 9)]
+        assert by_day["2024-01-05"].error == "RuntimeError: Cannot download data for 2024-01-05,2024-01-06"
+        assert by_day["2024-01-03"].error == "ValueError: broken day"
+        ok = [r for r in results if r.ok]
+        assert len(ok) == 6
+        assert all(r.result == 2 and r.nbytes == DAY_BYTES and r.fetch_s > 0 and r.callback_s >= 0 for r in ok)
+        assert max(fake_fetch_async) <= 2500 - DAY_BYTES
+
+    def test_loop_not_blocked(self, tmp_path, fake_fetch_async):
+        async def _run():
+            ticks = 0
+
+            async def _tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            ticker = asyncio.create_task(_tick())
+            stream = assimilator.assimilate_async(
+                ["VNP02IMG"], "", datetime(2024, 1, 1), datetime(2024, 1, 8), str(tmp_path), 1, 1, _consume
+            )
+            t = time.perf_counter()
+            results = [r async for r in stream]
+            ticker.cancel()
+            return results, ticks, time.perf_counter() - t
+
+        results, ticks, wall = asyncio.run(_run())
+        # 7 callbacks of 50 ms run one by one in the worker, the loop ticks meanwhile
+        assert len(results) == 8 and wall > 0.35
+        assert ticks > wall / 0.005 / 4
+
+    def test_no_callback(self, tmp_path, fake_fetch_async):
+        results = _collect(tmp_path)
+        assert len(results) == 8 and all(r.result is None for r in results)
+
+    def test_early_close(self, tmp_path, fake_fetch_async):
+        results = _collect(tmp_path, limit=2, assim_callback=_count)
+        assert len(results) == 2
+        assert len(fake_fetch_async) < 8
+
+    def test_no_space(self, tmp_path, fake_fetch_async, monkeypatch):
+        monkeypatch.setattr(assimilator, "_free_bytes", lambda path: 100)
+        with pytest.raises(RuntimeError):
+            _collect(tmp_path, min_free_bytes=1000)
+
+    def test_fetch_retries(self, tmp_path, monkeypatch):
+        calls = []
+
+        def _fetch_cli(*args):
+            calls.append(args)
+            return [sys.executable, "-c", "import sys; sys.exit(1)"]
+
+        monkeypatch.setattr(assimilator, "_fetch_cli", _fetch_cli)
+        with pytest.raises(RuntimeError):
+            asyncio.run(assimilator._get_data_for_interval_async(str(tmp_path), "2024-01-01", "2024-01-02", ["VNP02IMG"], ""))
+        assert len(calls) == 5
+
+    @pytest.mark.parametrize("with_store", [False, True])
+    def test_close_stops_fetch(self, tmp_path, monkeypatch, with_store):
+        pid_file = tmp_path / "cmrfetch.pid"
+        script = f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); time.sleep(60)"
+        monkeypatch.setattr(assimilator, "_test_cmrfetch", lambda: None)
+        monkeypatch.setattr(assimilator, "_fetch_cli", lambda *args: [sys.executable, "-c", script])
+
+        async def _run():
+            store = GranuleStore(str(tmp_path / "store")) if with_store else None
+            stream = assimilator.assimilate_async(
+                ["VNP02IMG"], "", datetime(2024, 1, 1), datetime(2024, 1, 8), str(tmp_path / "days"), 1, store=store
+            )
+            first = asyncio.create_task(anext(stream))
+            while not pid_file.exists() or not pid_file.read_text():
+                await asyncio.sleep(0.01)
+            t = time.perf_counter()
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            await stream.aclose()
+            wall = time.perf_counter() - t
+            # checked before asyncio.run waits for the threads of the loop
+            try:
+                os.kill(int(pid_file.read_text()), 0)
+            except ProcessLookupError:
+                return False, wall
+            return True, wall
+
+        alive, wall = asyncio.run(_run())
+        assert not alive and wall < 5
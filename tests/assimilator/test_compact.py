@@ -0,0 +1,173 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+from numpy import ma
+
+netcdf4 = pytest.importorskip("netCDF4")
+
+from viirs_tools.assimilator import compact
+from viirs_tools.assimilator.compact import COMPACT_SUFFIX, Compactor, read_compact
+
+M_SHAPE = (8, 10)
+I_SHAPE = (16, 20)
+BBOX = (22.0, 52.0, 25.5, 54.0)
+
+
+def _so_variable(file, name, raw, scale=1.0, offset=0.0):
+    # SDR-style variable: raw integers with Scale/Offset and FILL_TEST_VALUE
+    dims = ("lines", "pixels") if raw.shape == I_SHAPE else ("m_lines", "m_pixels")
+    variable = file.createVariable(name, raw.dtype, dims)
+    variable.setncatts({"Scale": scale, "Offset": offset, "FILL_TEST_VALUE": "V >= 65528"})
+    variable.set_auto_maskandscale(False)
+    variable[:] = raw
+
+
+def _granule(directory, ts, lat0=51.0):
+    rng = np.random.default_rng(0)
+    files = {}
+
+    path = files["geo"] = os.path.join(directory, f"VNP03MOD.{ts}.002.nc")
+    with netcdf4.Dataset(path, "w") as file:
+        file.createDimension("m_lines", M_SHAPE[0])
+        file.createDimension("m_pixels", M_SHAPE[1])
+        lat, lon = np.meshgrid(lat0 + np.arange(M_SHAPE[0]) * 0.5, 20 + np.arange(M_SHAPE[1]) * 0.5, indexing="ij")
+        _so_variable(file, "Latitude", lat.astype(np.float32))
+        _so_variable(file, "Longitude", lon.astype(np.float32))
+        _so_variable(file, "SolarZenithAngle", rng.uniform(0, 180, M_SHAPE).astype(np.float32))
+
+    path = files["image"] = os.path.join(directory, f"VNP02IMG.{ts}.002.nc")
+    with netcdf4.Dataset(path, "w") as file:
+        file.createDimension("lines", I_SHAPE[0])
+        file.createDimension("pixels", I_SHAPE[1])
+        for band in ("I1", "I2", "I3"):
+            raw = rng.integers(0, 60000, I_SHAPE).astype(np.uint16)
+            raw[0, :3] = 65535
+            _so_variable(file, f"Reflectance_{band}", raw, scale=2e-5, offset=-0.01)
+        for band in ("I4", "I5"):
+            _so_variable(file, f"BrightnessTemperature_{band}", rng.integers(0, 60000, I_SHAPE).astype(np.uint16), 0.003, 150.0)
+
+    path = files["cldmsk"] = os.path.join(directory, f"CLDMSK_L2_VIIRS_SNPP.{ts}.001.nc")
+    with netcdf4.Dataset(path, "w") as file:
+        file.createDimension("number_of_lines", M_SHAPE[0])
+        file.createDimension("number_of_pixels", M_SHAPE[1])
+        group = file.createGroup("geophysical_data")
+        swath = ("number_of_lines", "number_of_pixels")
+        mask = rng.integers(0, 4, M_SHAPE).astype(np.int8)
+        mask[1, 1] = -128
+        group.createVariable("Integer_Cloud_Mask", "i1", swath, fill_value=-128)[:] = mask
+        conf = rng.random(M_SHAPE).astype(np.float32)
+        conf[2, 2] = -999
+        group.createVariable("Clear_Sky_Confidence", "f4", swath, fill_value=-999)[:] = conf
+    return files
+
+
+def _read(path, name):
+    with netcdf4.Dataset(path, "r") as file:
+        return compact._read_variable(file, name)
+
+
+class TestCompactor:
+    def test_whole_swath(self, tmp_path):
+        files = _granule(str(tmp_path), "A2024001.0000")
+        sources = {role: {name: _read(path, name) for name in names} for role, path, names in _expected(files)}
+
+        reports = Compactor()(str(tmp_path))
+        assert len(reports) == 3
+        assert all(r.ok and r.deleted for r in reports), [r.error for r in reports]
+        assert not any(os.path.exists(p) for p in files.values())
+        with netcdf4.Dataset(reports[1].output) as file:
+            variable = file["Reflectance_I1"]
+            assert variable.dtype == np.uint16
+            assert variable.filters()["zlib"] and variable.chunking() == list(I_SHAPE)
+
+        for role, path, names in _expected(files):
+            data = read_compact(os.path.splitext(path)[0] + COMPACT_SUFFIX)
+            assert set(data) == set(names)
+            for name in names:
+                source, written = sources[role][name], data[name]
+                assert np.array_equal(np.ma.getmaskarray(written), np.ma.getmaskarray(source))
+                if source.dtype.kind == "i":
+                    assert written.dtype == source.dtype
+                    assert np.array_equal(written, source)
+                else:
+                    step = (source.max() - source.min()) / 65534
+                    assert np.abs(written - source).max() <= step / 2 * (1 + 1e-6)
+
+    def test_area_subset(self, tmp_path):
+        inside = _granule(str(tmp_path), "A2024001.0000")
+        outside = _granule(str(tmp_path), "A2024001.0006", lat0=-30.0)
+        lat = _read(inside["geo"], "Latitude")
+
+        reports = Compactor(bbox=BBOX, quantize={"Latitude": (1e-4, 50.0)})(str(tmp_path))
+        assert all(r.ok for r in reports)
+        assert {r.output for r in reports if r.source in outside.values()} == {None}
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p).replace(".nc", COMPACT_SUFFIX) for p in inside.values())
+
+        # lat 52..54 are rows 2..6, lon 22..25.5 are cols 4..9 (the last) of the M-band swath
+        data = read_compact(os.path.splitext(inside["geo"])[0] + COMPACT_SUFFIX)
+        assert data["Latitude"].shape == (5, 6)
+        assert np.abs(data["Latitude"] - lat[2:7, 4:10]).max() <= 5e-5 * (1 + 1e-6)
+        data = read_compact(os.path.splitext(inside["image"])[0] + COMPACT_SUFFIX)
+        assert data["Reflectance_I1"].shape == (10, 12)
+
+    def test_clipped_quantization_keeps_source(self, tmp_path):
+        files = _granule(str(tmp_path), "A2024001.0000")
+        reports = Compactor(quantize={"Latitude": (1e-4, -90.0)})(str(tmp_path))
+        failed = [r for r in reports if not r.ok]
+        assert [r.source for r in failed] == [files["geo"]]
+        assert "Verification of 'Latitude' failed" in failed[0].error
+        assert os.path.exists(files["geo"])
+
+    def test_non_finite(self, tmp_path):
+        files = _granule(str(tmp_path), "A2024001.0000")
+        with netcdf4.Dataset(files["geo"], "a") as file:
+            file["Latitude"].set_auto_maskandscale(False)
+            file["Latitude"][0, :2] = [np.nan, np.inf]
+        source = _read(files["geo"], "Latitude")
+
+        reports = Compactor()(str(tmp_path))
+        assert all(r.ok and r.deleted for r in reports), [r.error for r in reports]
+        data = read_compact(os.path.splitext(files["geo"])[0] + COMPACT_SUFFIX)["Latitude"]
+        assert ma.getmaskarray(data)[0, :2].all()
+        valid = ~ma.getmaskarray(data)
+        assert np.isfinite(data[valid]).all()
+        assert np.abs(data[valid] - source[valid]).max() <= 3.5 / 65534 / 2 * (1 + 1e-6)
+
+    def test_non_finite_quantization_keeps_source(self, tmp_path):
+        files = _granule(str(tmp_path), "A2024001.0000")
+        reports = Compactor(quantize={"Latitude": (np.nan, 0.0)})(str(tmp_path))
+        failed = [r for r in reports if not r.ok]
+        assert [r.source for r in failed] == [files["geo"]]
+        assert os.path.exists(files["geo"])
+
+    def test_failed_verification_keeps_source(self, tmp_path, monkeypatch):
+        files = _granule(str(tmp_path), "A2024001.0000")
+
+        def _verify(path, data):
+            raise ValueError("corrupted")
+
+        monkeypatch.setattr(compact, "_verify", _verify)
+        reports = Compactor()(str(tmp_path))
+        assert all(not r.ok and not r.deleted and r.error == "ValueError: corrupted" for r in reports)
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in files.values())
+
+    def test_no_geo(self, tmp_path):
+        files = _granule(str(tmp_path), "A2024001.0000")
+        os.remove(files["geo"])
+        reports = Compactor(bbox=BBOX)(str(tmp_path))
+        assert all(not r.ok for r in reports)
+        assert os.path.exists(files["image"])
+
+    def test_parallel(self, tmp_path):
+        for ts in ("A2024001.0000", "A2024001.0006"):
+            _granule(str(tmp_path), ts)
+        compactor = pickle.loads(pickle.dumps(Compactor(workers=2, delete=False)))
+        reports = compactor(str(tmp_path))
+        assert len(reports) == 6 and all(r.ok and not r.deleted for r in reports)
+        assert len(os.listdir(tmp_path)) == 12
+
+
+def _expected(files):
+    return [(role, files[role], names) for role, names in zip(("image", "geo", "cldmsk"), compact.DEFAULT_VARIABLES.values(), strict=True)]
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from viirs_tools.assimilator.flags import CLOUD_MASK_FLAGS, QA_FLAGS, BitFlags
+
+
+def _packed(shape=(6, 12, 10)):
+    rng = np.random.default_rng(0)
+    return rng.integers(-128, 128, shape, dtype=np.int8)
+
+
+def _bit(data, bit):
+    # reference decoding, bit by bit
+    return (data.view(np.uint8)[bit // 8].astype(int) >> (bit % 8)) & 1
+
+
+class TestBitFlags:
+    def test_decoding(self):
+        data = _packed()
+        flags = BitFlags(data)
+        for name, (bit, width, inverted) in CLOUD_MASK_FLAGS.items():
+            expected = sum(_bit(data, bit + i) << i for i in range(width))
+            if inverted:
+                expected ^= (1 << width) - 1
+            assert flags[name].dtype == np.uint8
+            assert flags[name].shape == (12, 10)
+            assert np.array_equal(flags[name], expected)
+
+    def test_lazy(self):
+        flags = BitFlags(_packed())
+        assert flags._planes == {}
+        confidence = flags["confidence"]
+        assert list(flags._planes) == ["confidence"]
+        assert flags["confidence"] is confidence
+        assert not confidence.flags.writeable
+
+    def test_mask(self):
+        data = _packed()
+        flags = BitFlags(data)
+        mask = flags.mask("day")
+        assert mask.dtype == np.bool_
+        assert np.shares_memory(mask, flags["day"])
+        assert np.array_equal(mask, _bit(data, 3) == 1)
+        with pytest.raises(ValueError):
+            flags.mask("surface")
+
+    def test_axis(self):
+        data = _packed((12, 10, 2))
+        flags = BitFlags(data, QA_FLAGS, axis=-1)
+        assert flags.shape == (12, 10)
+        assert np.array_equal(flags["useful"], _bit(np.moveaxis(data, -1, 0), 0))
+
+    def test_unpack(self):
+        data = _packed((2, 4, 4))
+        bits = BitFlags(data, {}).unpack()
+        assert bits.shape == (16, 4, 4)
+        assert all(np.array_equal(bits[i], _bit(data, i)) for i in range(16))
+
+    def test_invalid(self):
+        with pytest.raises(TypeError):
+            BitFlags(np.zeros((6, 2, 2), dtype=np.int16))
+        with pytest.raises(ValueError):
+            BitFlags(np.zeros((1, 2, 2), dtype=np.uint8))
+        with pytest.raises(ValueError):
+            BitFlags(np.zeros((6, 2, 2), dtype=np.uint8), {"crossing": (7, 2, False)})
+
+
+class TestReading:
+    def test_read_cldmsk_flags(self, tmp_path):
+        netcdf4 = pytest.importorskip("netCDF4")
+        from viirs_tools.assimilator.reading import read_npp_cldmsk_l2
+
+        path = str(tmp_path / "CLDMSK_L2_VIIRS_SNPP.A2024001.0000.001.nc")
+        mask, qa = _packed((6, 4, 3)), _packed((4, 3, 10))
+        with netcdf4.Dataset(path, "w") as file:
+            file.createDimension("number_of_lines", 4)
+            file.createDimension("number_of_pixels", 3)
+            file.createDimension("byte_segment", 6)
+            file.createDimension("qa_dim", 10)
+            group = file.createGroup("geophysical_data")
+            swath = ("number_of_lines", "number_of_pixels")
+            group.createVariable("Clear_Sky_Confidence", "f4", swath)[:] = 0.5
+            group.createVariable("Integer_Cloud_Mask", "i1", swath)[:] = 1
+            group.createVariable("Cloud_Mask", "i1", ("byte_segment", *swath), fill_value=0)[:] = mask
+            group.createVariable("Quality_Assurance", "i1", (*swath, "qa_dim"), fill_value=0)[:] = qa
+
+        data = read_npp_cldmsk_l2(path)
+        assert set(data) == {"clear_conf", "cloud_mask"}
+
+        data = read_npp_cldmsk_l2(path, flags=True)
+        assert np.array_equal(data["cloud_mask_flags"]["day"], _bit(mask, 3))
+        assert np.array_equal(data["qa_flags"]["useful"], _bit(np.moveaxis(qa, -1, 0), 0))
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from viirs_tools.assimilator.geolocation import EARTH_RADIUS_M, TiePointGeolocation, _to_xyz
+
+
+def _swath(scans=4, width=3200, scan_rows=16, lat0=60.0, lon0=175.0, heading=-12.0):
+    # VIIRS-like swath: 833 km orbit, +-56 deg scan, growing along-track footprint,
+    # crossing the antimeridian
+    h = 833e3
+    theta = np.radians((np.arange(width) - (width - 1) / 2) / width * 2 * 56.06)
+    across = np.arcsin((EARTH_RADIUS_M + h) / EARTH_RADIUS_M * np.sin(theta)) - theta
+    rows = np.arange(scans * scan_rows)
+    detector = rows % scan_rows - (scan_rows - 1) / 2
+    along = (rows // scan_rows * scan_rows * 750)[:, None] + detector[:, None] * 750 * np.cos(theta) ** -1.5
+    along = along / EARTH_RADIUS_M
+
+    lat0, lon0, heading = np.radians(lat0), np.radians(lon0), np.radians(heading)
+    p0 = np.array([np.cos(lat0) * np.cos(lon0), np.cos(lat0) * np.sin(lon0), np.sin(lat0)])
+    east = np.array([-np.sin(lon0), np.cos(lon0), 0.0])
+    track = np.cos(heading) * np.cross(p0, east) + np.sin(heading) * east
+    normal = np.cross(p0, track)
+    p = np.cos(along)[..., None] * p0 + np.sin(along)[..., None] * track
+    p = np.cos(across)[..., None] * p + np.sin(across)[..., None] * normal
+
+    lat = np.degrees(np.arcsin(p[..., 2]))
+    lon = np.degrees(np.arctan2(p[..., 1], p[..., 0]))
+    satza = np.broadcast_to(np.degrees(np.abs(theta + across)), lat.shape)
+    sataa = np.where(theta > 0, 78.0, -102.0) + 0.01 * rows[:, None]  # flips at nadir
+    return lat, lon, {"satza": satza, "sataa": sataa}
+
+
+def _distance_m(lat1, lon1, lat2, lon2):
+    return np.linalg.norm(np.stack(_to_xyz(lat1, lon1)) - np.stack(_to_xyz(lat2, lon2)), axis=0) * EARTH_RADIUS_M
+
+
+class TestTiePointGeolocation:
+    def test_accuracy_bound(self):
+        lat, lon, angles = _swath()
+        geo = TiePointGeolocation.from_full(lat, lon, angles)
+        full = geo.window()
+
+        error = _distance_m(full["lat"], full["lon"], lat, lon)
+        assert geo.max_error["position"] * 0.9 < error.max() <= geo.max_error["position"]
+        assert geo.max_error["position"] < 200
+        assert np.abs(full["satza"] - angles["satza"]).max() <= geo.max_error["satza"] + 1e-12
+        assert geo.max_error["sataa"] < 1e-3
+        assert geo.nbytes < lat.nbytes * 4 / 30
+
+    def test_step(self):
+        lat, lon, _ = _swath(scans=1)
+        errors = [TiePointGeolocation.from_full(lat, lon, step=step).max_error["position"] for step in (4, 8, 16)]
+        assert errors == sorted(errors)
+
+    def test_tie_points_exact(self):
+        lat, lon, angles = _swath(scans=2)
+        geo = TiePointGeolocation.from_full(lat, lon, angles)
+        full = geo.window()
+        for row in (0, 15, 16, 31):
+            cols = geo.columns
+            assert _distance_m(full["lat"][row, cols], full["lon"][row, cols], lat[row, cols], lon[row, cols]).max() < 1e-3
+
+    def test_window(self):
+        lat, lon, angles = _swath(scans=3)
+        geo = TiePointGeolocation.from_full(lat, lon, angles)
+        full = geo.window()
+        window = geo.window(slice(10, 37), slice(1590, 1700), names=["lon", "sataa"])
+        assert list(window) == ["lon", "sataa"]
+        assert np.array_equal(window["lon"], full["lon"][10:37, 1590:1700])
+        assert np.array_equal(window["sataa"], full["sataa"][10:37, 1590:1700])
+        assert np.array_equal(geo["satza"], full["satza"])
+        with pytest.raises(ValueError):
+            geo.window(slice(0, 10, 2))
+
+    def test_antimeridian(self):
+        lat, lon, _ = _swath(lon0=179.9)
+        assert lon.min() < -170 and lon.max() > 170
+        full = TiePointGeolocation.from_full(lat, lon).window()
+        assert _distance_m(full["lat"], full["lon"], lat, lon).max() < 200
+        assert np.abs(full["lon"]).max() <= 180
+
+    def test_missing(self):
+        lat, lon, _ = _swath(scans=2, width=400)
+        lat = np.ma.masked_array(lat, mask=np.zeros(lat.shape, bool))
+        lat[16:, :] = np.ma.masked
+        geo = TiePointGeolocation.from_full(lat, lon, resolution="m", step=8)
+        full = geo.window()
+        assert np.isnan(full["lat"][16:]).all()
+        assert not np.isnan(full["lat"][:16]).any()
+
+    def test_invalid(self):
+        lat, lon, _ = _swath(scans=1, width=64)
+        with pytest.raises(ValueError):
+            TiePointGeolocation.from_full(lat[:10], lon[:10])
+        with pytest.raises(ValueError):
+            TiePointGeolocation.from_full(lat, lon[:, :10])
+        with pytest.raises(ValueError):
+            TiePointGeolocation.from_full(lat, lon, resolution="x")
+
+    def test_missing_pixels(self):
+        lat, lon, angles = _swath(scans=2)
+        lat, lon, satza = lat.copy(), lon.copy(), angles["satza"].copy()
+        # tie-point, pixel between the tie-points, lon only and angle only
+        lat[0, 8] = np.nan
+        lat[5, 13] = np.nan
+        lon[20, 3199] = np.nan
+        satza[31, 16] = np.nan
+        geo = TiePointGeolocation.from_full(lat, lon, {"satza": satza})
+        full = geo.window()
+
+        missing = np.isnan(lat) | np.isnan(lon)
+        assert np.array_equal(np.isnan(full["lat"]), missing) and np.array_equal(np.isnan(full["lon"]), missing)
+        assert np.array_equal(np.isnan(full["satza"]), np.isnan(satza))
+        # valid pixels of the cells of the missing tie-points are kept
+        valid = ~missing
+        assert _distance_m(full["lat"][valid], full["lon"][valid], lat[valid], lon[valid]).max() <= geo.max_error["position"]
+        assert geo.max_error["position"] < 200
+
+        window = geo.window(slice(3, 22), slice(10, 3200))
+        assert np.array_equal(window["lat"], full["lat"][3:22, 10:3200], equal_nan=True)
+        assert np.array_equal(window["satza"], full["satza"][3:22, 10:3200], equal_nan=True)
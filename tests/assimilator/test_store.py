@@ -0,0 +1,136 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from viirs_tools.assimilator import assimilator
+from viirs_tools.assimilator.store import GranuleStore
+
+GEOBOX = "23.1,51.2,32.8,56.2"
+
+
+def fake_fetch_function(calls):
+    # Two granules per collection and day, contents depend on them only
+    def _get_data_for_interval(path, start_d, end_d, names, geobox, dconc=4):
+        calls.append((start_d, tuple(names)))
+        os.makedirs(path, exist_ok=True)
+        for name in names:
+            for hhmm in ("0000", "0006"):
+                with open(os.path.join(path, f"{name}.{start_d}.{hhmm}.nc"), "w") as file:
+                    file.write(f"{name} {start_d} {hhmm}" * 100)
+
+    return _get_data_for_interval
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(assimilator, "_test_cmrfetch", lambda: None)
+    monkeypatch.setattr(assimilator, "_get_data_for_interval", fake_fetch_function(calls))
+    return calls
+
+
+def _stored(store):
+    objects = os.path.join(store.root, "objects")
+    return [c for prefix in os.listdir(objects) for c in os.listdir(os.path.join(objects, prefix))]
+
+
+class TestGranuleStore:
+    def test_fetch_missing_only(self, tmp_path, fake_fetch):
+        store = GranuleStore(str(tmp_path / "store"))
+        first = store.fetch(str(tmp_path / "a" / "day"), "2024-01-01", "2024-01-02", ["VNP02IMG", "VNP03MOD"], GEOBOX)
+        assert len(first) == 4
+        second = store.fetch(str(tmp_path / "b" / "day"), "2024-01-01", "2024-01-02", ["VNP02IMG", "CLDMSK"], GEOBOX)
+        assert fake_fetch == [("2024-01-01", ("VNP02IMG", "VNP03MOD")), ("2024-01-01", ("CLDMSK",))]
+        assert len(second) == 4 and len(_stored(store)) == 6
+
+        name = "VNP02IMG.2024-01-01.0000.nc"
+        a, b = os.stat(tmp_path / "a" / "day" / name), os.stat(tmp_path / "b" / "day" / name)
+        assert a.st_ino == b.st_ino
+        assert store.refcount(first[name]) == 2
+        assert not a.st_mode & 0o222  # shared content is read-only
+
+    def test_dedup_across_queries(self, tmp_path, fake_fetch):
+        store = GranuleStore(str(tmp_path / "store"))
+        store.fetch(str(tmp_path / "a"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        granules = store.fetch(str(tmp_path / "b"), "2024-01-01", "2024-01-02", ["VNP02IMG"], "0,0,1,1")
+        assert len(fake_fetch) == 2
+        assert len(_stored(store)) == 2
+        assert all(store.refcount(c) == 2 for c in granules.values())
+
+    def test_refcount_cleanup(self, tmp_path, fake_fetch):
+        store = GranuleStore(str(tmp_path / "store"))
+        granules = store.fetch(str(tmp_path / "a"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        store.fetch(str(tmp_path / "b"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+
+        # callback of the run a cleans its day directory up
+        for name in os.listdir(tmp_path / "a"):
+            os.remove(tmp_path / "a" / name)
+        assert store.collect() == 0
+        assert all(store.refcount(c) == 1 for c in granules.values())
+        assert len(os.listdir(tmp_path / "b")) == 2
+
+        for name in os.listdir(tmp_path / "b"):
+            os.remove(tmp_path / "b" / name)
+        assert store.collect() == sum(len(f"VNP02IMG 2024-01-01 {hhmm}" * 100) for hhmm in ("0000", "0006"))
+        assert _stored(store) == []
+
+        # collected granules are fetched again
+        store.fetch(str(tmp_path / "c"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        assert len(fake_fetch) == 2
+
+    def test_failed_fetch(self, tmp_path, monkeypatch):
+        def _get_data_for_interval(path, start_d, end_d, names, geobox, dconc=4):
+            os.makedirs(path)
+            open(os.path.join(path, "VNP02IMG.partial.nc"), "w").close()
+            raise RuntimeError("Cannot download data")
+
+        monkeypatch.setattr(assimilator, "_get_data_for_interval", _get_data_for_interval)
+        store = GranuleStore(str(tmp_path / "store"))
+        with pytest.raises(RuntimeError):
+            store.fetch(str(tmp_path / "a"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        assert store.lookup(store.query_key("VNP02IMG", GEOBOX, "2024-01-01", "2024-01-02")) is None
+        assert os.listdir(tmp_path / "store" / "staging") == []
+
+    def test_empty_fetch_not_recorded(self, tmp_path, fake_fetch, monkeypatch):
+        # cmrfetch timeout: exits fine with nothing of VNP03MOD downloaded
+        def _get_data_for_interval(path, start_d, end_d, names, geobox, dconc=4):
+            fake_fetch.append((start_d, tuple(names)))
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, f"VNP02IMG.{start_d}.0000.nc"), "w") as file:
+                file.write("partial")
+
+        monkeypatch.setattr(assimilator, "_get_data_for_interval", _get_data_for_interval)
+        store = GranuleStore(str(tmp_path / "store"))
+        store.fetch(str(tmp_path / "a"), "2024-01-01", "2024-01-02", ["VNP02IMG", "VNP03MOD"], GEOBOX)
+        assert store.lookup(store.query_key("VNP03MOD", GEOBOX, "2024-01-01", "2024-01-02")) is None
+
+        # the partial VNP02IMG download is dropped on demand and fetched again
+        assert store.invalidate("VNP02IMG", GEOBOX, "2024-01-01", "2024-01-02")
+        assert not store.invalidate("VNP02IMG", GEOBOX, "2024-01-01", "2024-01-02")
+        monkeypatch.setattr(assimilator, "_get_data_for_interval", fake_fetch_function(fake_fetch))
+        granules = store.fetch(str(tmp_path / "b"), "2024-01-01", "2024-01-02", ["VNP02IMG", "VNP03MOD"], GEOBOX)
+        assert fake_fetch[-1] == ("2024-01-01", ("VNP02IMG", "VNP03MOD")) and len(granules) == 4
+
+    def test_record_expires(self, tmp_path, fake_fetch, monkeypatch):
+        store = GranuleStore(str(tmp_path / "store"), max_age=60)
+        store.fetch(str(tmp_path / "a"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        store.fetch(str(tmp_path / "b"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        assert len(fake_fetch) == 1
+
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        store.fetch(str(tmp_path / "c"), "2024-01-01", "2024-01-02", ["VNP02IMG"], GEOBOX)
+        assert len(fake_fetch) == 2
+        assert GranuleStore(str(tmp_path / "store"), max_age=None).lookup(store.query_key("VNP02IMG", GEOBOX, "2024-01-01", "2024-01-02"))
+
+    def test_assimilate(self, tmp_path, fake_fetch):
+        store = GranuleStore(str(tmp_path / "store"))
+        for run in ("a", "b"):
+            assimilator.assimilate(
+                ["VNP02IMG"], GEOBOX, datetime(2024, 1, 1), datetime(2024, 1, 2), str(tmp_path / run), 1, assim_callback=print, store=store
+            )
+        assert len(fake_fetch) == 2
+        assert sorted(os.listdir(tmp_path / "b")) == ["2024-01-01", "2024-01-02"]
+        assert len(_stored(store)) == 4
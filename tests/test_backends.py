@@ -0,0 +1,193 @@
+import json
+
+import numpy as np
+import pytest
+
+from tests.algs.test_fastpath import _get_scene
+from tests.algs.utils import _np2xr
+from viirs_tools import backends
+from viirs_tools.backends import Backend, Calibration, CallInfo, Dispatcher
+from viirs_tools.executor import BlockExecutor
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight, AlgsUtils, AlgsWater, Runner
+
+ARGS = {
+    AlgsIndex.NDVI: ("ri2", "ri1"),
+    AlgsIndex.NDSI: ("ri1", "ri3"),
+    AlgsNight.NAIVE: ("ri1", "bi4"),
+    AlgsNight.SOLAR: ("solza",),
+    AlgsCloud.VIBCM_DAY: ("ri1", "ri2", "ri3", "bi5"),
+    AlgsCloud.VIFCM_DAY: ("ri1", "ri2", "bi5"),
+    AlgsCloud.VIFCM_NIGHT: ("bi4", "bi5", "nmask"),
+    AlgsLST.MONO_WINDOW_I05: ("bi5", "ndvi"),
+    AlgsLST.MONO_WINDOW_M15: ("bi5", "ndvi", "cmask"),
+    AlgsLST.MONO_WINDOW_M16: ("bi5", "ndvi", "cmask"),
+    AlgsWater.WBODIES_DAY: ("ri1", "ri2", "ri3"),
+    AlgsUtils.MERGE_DAY_NIGHT: ("ri1", "bi4", "nmask"),
+}
+
+CASES = [(alg, name) for alg, algs in Runner._BACKENDS.items() for name in algs]
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    with BlockExecutor("thread", workers=2, block_bytes=1024) as executor:
+        monkeypatch.setattr(backends, "_EXECUTOR", executor)
+        yield
+
+
+class TestRegistry:
+    def test_all_algs(self):
+        assert set(Runner._BACKENDS) == set(ARGS)
+        for algs in Runner._BACKENDS.values():
+            assert {"reference", "numpy", "blocked"} <= set(algs)
+            assert set(algs) <= set(backends.BACKEND_NAMES)
+
+    def test_capabilities(self):
+        algs = Runner._BACKENDS[AlgsCloud.VIFCM_DAY]
+        assert algs["reference"].lazy and not algs["reference"].numpy
+        assert not algs["numpy"].xarray
+        assert algs["numba"].out and algs["numba"].dtypes == ("float32", "float64")
+        assert not algs["numba"].supports(CallInfo("numpy", "float16", 10))
+
+
+class TestParity:
+    @pytest.mark.parametrize("kind", ["numpy", "xarray"])
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize(("alg", "name"), CASES)
+    def test_matches_reference(self, alg, name, dtype, kind):
+        backend = Runner._BACKENDS[alg][name]
+        if not backend.available:
+            pytest.skip(f"{backend.requires} is not installed")
+        scene = _get_scene(dtype, shape=(2, 64, 16))
+        args = [scene[n] for n in ARGS[alg]]
+        expected = Runner._BACKENDS[alg]["reference"].load()(*[_np2xr(a) for a in args])
+
+        result = backend(*[_np2xr(a) for a in args] if kind == "xarray" else args)
+
+        if kind == "xarray":
+            assert result.dims == expected.dims
+            assert all(result[d].equals(expected[d]) for d in result.dims)
+            result = result.values
+        assert type(result) is np.ndarray
+        assert result.dtype == expected.dtype
+        assert np.array_equal(result, expected.values, equal_nan=True)
+
+    @pytest.mark.parametrize(("alg", "name"), CASES)
+    def test_out(self, alg, name):
+        backend = Runner._BACKENDS[alg][name]
+        if not backend.available:
+            pytest.skip(f"{backend.requires} is not installed")
+        scene = _get_scene("float32")
+        args = [scene[n] for n in ARGS[alg]]
+        expected = backend(*args)
+        out = np.empty_like(expected)
+        assert backend(*args, out=out) is out
+        assert np.array_equal(out, expected, equal_nan=True)
+
+
+class TestDispatcher:
+    def test_explicit(self):
+        scene = _get_scene("float32")
+        runner = Runner(backend={AlgsCloud.VIFCM_DAY: "blocked"})
+        alg = runner.get_alg_cloud(AlgsCloud.VIFCM_DAY)
+        assert isinstance(alg, Dispatcher)
+        assert alg.select(CallInfo("numpy", "float32", 512)).name == "blocked"
+        assert np.array_equal(
+            alg(scene["ri1"], scene["ri2"], scene["bi5"]),
+            Runner().get_alg_cloud(AlgsCloud.VIFCM_DAY)(scene["ri1"], scene["ri2"], scene["bi5"]),
+            equal_nan=True,
+        )
+        assert not isinstance(runner.get_alg_cloud(AlgsCloud.VIBCM_DAY), Dispatcher)
+
+    def test_fallback(self):
+        runner = Runner(backend="numba")
+        alg = runner.get_alg_index()
+        assert alg.select(CallInfo("numpy", "float32", 512)).name == "reference"
+        alg = Runner(backend="numpy").get_alg_cloud()
+        assert alg.select(CallInfo("xarray", "float32", 512, lazy=True)).name == "reference"
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            Runner(backend="gpu")
+        with pytest.raises(ValueError):
+            Runner(backend={AlgsCloud.VIBCM_DAY: "gpu"})
+
+    def test_wraps_alg(self):
+        from viirs_tools.algs import cloud
+
+        alg = Runner(backend="numpy").get_alg_cloud()
+        assert alg.__wrapped__ is cloud.vibcm_day
+        scene = _get_scene("float32", shape=(2, 64, 16))
+        args = [scene[n] for n in ARGS[AlgsCloud.VIBCM_DAY]]
+        with BlockExecutor(block_bytes=1024) as executor:
+            assert np.array_equal(executor.run(alg, *args), cloud.vibcm_day(*args), equal_nan=True)
+
+
+class TestCalibration:
+    def _timings(self, monkeypatch, order):
+        calls = []
+
+        def _time(self, backend, args):
+            calls.append((backend.name, args[0].size))
+            return order.index(backend.name) if backend.name in order else 99
+
+        monkeypatch.setattr(Calibration, "_time", _time)
+        return calls
+
+    def test_auto(self, tmp_path, monkeypatch):
+        calls = self._timings(monkeypatch, ["blocked", "numpy", "reference"])
+        path = tmp_path / "backends.json"
+        runner = Runner(backend="auto", calibration=Calibration(str(path), sizes=(2**6, 2**10)))
+        alg = runner.get_alg_cloud()
+        scene = _get_scene("float32")
+        args = [scene[n] for n in ARGS[AlgsCloud.VIBCM_DAY]]
+
+        assert np.array_equal(alg(*args), Runner().get_alg_cloud()(*args), equal_nan=True)
+        assert alg.select(CallInfo("numpy", "float32", 512)).name == "blocked"
+        assert {size for _, size in calls} == {2**6, 2**10}
+        assert len(calls) == 6
+
+        # calibrated once, other calls of the kind and dtype are looked up
+        alg(*args)
+        assert len(calls) == 6
+        results = json.loads(path.read_text())["results"]
+        assert set(results) == {"AlgsCloud.VIBCM_DAY/numpy/float32"}
+
+    def test_lazy_calls(self, tmp_path, monkeypatch):
+        self._timings(monkeypatch, ["numpy", "reference"])
+        calibration = Calibration(str(tmp_path / "backends.json"), sizes=(2**6,))
+        algs = Runner._BACKENDS[AlgsCloud.VIBCM_DAY]
+        assert calibration.best(AlgsCloud.VIBCM_DAY, algs, CallInfo("xarray", "float64", 10, lazy=True)) == "reference"
+        assert calibration.best(AlgsCloud.VIBCM_DAY, algs, CallInfo("xarray", "float64", 10)) == "numpy"
+
+    def test_persistence(self, tmp_path, monkeypatch):
+        calls = self._timings(monkeypatch, ["numpy"])
+        path = str(tmp_path / "backends.json")
+        algs = Runner._BACKENDS[AlgsIndex.NDVI]
+        call = CallInfo("numpy", "float64", 2**8)
+        assert Calibration(path, sizes=(2**6,)).best(AlgsIndex.NDVI, algs, call) == "numpy"
+        measured = len(calls)
+
+        assert Calibration(path, sizes=(2**6,)).best(AlgsIndex.NDVI, algs, call) == "numpy"
+        assert len(calls) == measured
+
+        # other environment
+        assert Calibration(path, sizes=(2**7,)).best(AlgsIndex.NDVI, algs, call) == "numpy"
+        assert len(calls) == 2 * measured
+
+    def test_measure(self, tmp_path):
+        calibration = Calibration(str(tmp_path / "backends.json"), sizes=(2**6,), repeat=1)
+        algs = {name: b for name, b in Runner._BACKENDS[AlgsUtils.MERGE_DAY_NIGHT].items() if b.available}
+        results = calibration.measure(AlgsUtils.MERGE_DAY_NIGHT, algs, "xarray", "float32")
+        assert set(results["64"]) == set(algs)
+        assert all(t > 0 for t in results["64"].values())
+
+
+class TestJit:
+    def test_kernels(self):
+        pytest.importorskip("numba")
+        backend = Backend("numba", "jit.vifcm_night", xarray=False, out=True, requires="numba")
+        scene = _get_scene("float32")
+        from viirs_tools.algs import cloud
+
+        assert np.array_equal(backend(scene["bi4"], scene["bi5"]), cloud.vifcm_night(scene["bi4"], scene["bi5"]), equal_nan=True)
@@ -0,0 +1,22 @@
+import dataclasses
+
+from benchmarks import bench_algs
+from viirs_tools.runner import Runner
+
+
+class TestBenchAlgs:
+    def test_coverage(self):
+        registered = {alg for impls in Runner._IMPLS.values() for alg in impls}
+        assert set(bench_algs.ARGS) == registered
+
+    def test_run(self, capsys):
+        tiny = {name: shape[:-2] + (8, 8) for name, shape in bench_algs.SHAPES.items()}
+        results = bench_algs.run(shapes=("m", "m-stack"), pattern="ndvi", repeat=1, shape_override=tiny)
+        assert len(results) == 2 * len(bench_algs.KINDS) * len(bench_algs.DTYPES)
+        assert {r.pixels for r in results} == {64, 256}
+        assert all(r.wall_s > 0 and r.mpix_s > 0 for r in results)
+
+        fast = dataclasses.replace(results[0], wall_s=results[0].wall_s / 2)
+        assert bench_algs.compare(results, {fast.case: fast}, 0.2) == [fast.case]
+        assert bench_algs.compare(results, {r.case: r for r in results}, 0.2) == []
+        capsys.readouterr()
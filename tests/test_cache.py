@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from tests.algs.utils import _np2xr, get_data_np
+from viirs_tools.algs import cloud
+from viirs_tools.cache import ResultCache
+from viirs_tools.packed import pack_bands
+from viirs_tools.products import compute_products
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, Runner
+
+
+def _counting(func):
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return func(*args, **kwargs)
+
+    wrapper.calls = 0
+    return wrapper
+
+
+class TestResultCache:
+    def test_hit_on_equal_content(self):
+        cache = ResultCache()
+        ndvi = _counting(lambda nir, r: (nir - r) / (nir + r))
+        alg = cache.wrap(AlgsIndex.NDVI, ndvi)
+        _, ri2, ri1, _, _ = get_data_np((2, 8, 8))
+
+        first = alg(ri2, ri1)
+        second = alg(ri2.copy(), ri1.copy())
+        assert second is first
+        assert ndvi.calls == 1
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert not first.flags.writeable
+
+        alg(ri1, ri2)
+        assert ndvi.calls == 2
+
+    def test_key_includes_parameters(self):
+        cache = ResultCache()
+        ri1, ri2, ri3, _, bi5 = get_data_np((8, 8))
+        args = (ri1, ri2, ri3, bi5)
+        assert cache.key("a", args, {}) != cache.key("a", args, {"use_alt_thresholds": True})
+        assert cache.key("a", args, {}) != cache.key("b", args, {})
+        assert cache.key("a", (ri1.astype(np.float32),), {}) != cache.key("a", (ri1,), {})
+        assert cache.key("a", (ri1,), {}) != cache.key("a", (ri1.reshape(4, 16),), {})
+        assert cache.key("a", (bi5, 10.9), {}) != cache.key("a", (bi5, 12.0), {})
+        assert cache.key("a", (_np2xr(ri1),), {}) != cache.key("a", (ri1,), {})
+        packed = pack_bands([ri1])
+        assert cache.key("a", tuple(packed), {}) == cache.key("a", tuple(pack_bands([ri1.copy()])), {})
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_bytes=3 * 800)
+        for i in range(4):
+            cache.put(str(i), np.full(100, i, dtype=np.float64))
+        assert len(cache) == 3
+        assert cache.nbytes == 2400
+        assert cache.stats.evictions == 1 and cache.stats.evicted_bytes == 800
+        assert cache.get("0") == (False, None)
+
+        cache.get("1")  # 1 becomes the most recent one
+        cache.put("4", np.zeros(100))
+        assert cache.get("1")[0] and not cache.get("2")[0]
+
+        cache.put("big", np.zeros(1000))
+        assert not cache.get("big")[0]
+
+    def test_disk_tier(self, tmp_path):
+        cache = ResultCache(disk_dir=str(tmp_path))
+        cache.put("k", np.arange(4.0))
+
+        other = ResultCache(disk_dir=str(tmp_path))
+        found, value = other.get("k")
+        assert found and np.array_equal(value, np.arange(4.0))
+        assert other.stats.disk_hits == 1
+
+    def test_disk_budget(self, tmp_path):
+        cache = ResultCache(disk_dir=str(tmp_path), disk_max_bytes=2000)
+        for i in range(5):
+            cache.put(str(i), np.zeros(100))
+        assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 2000
+
+
+class TestRunnerCache:
+    def test_runner_algs(self):
+        runner = Runner(cache=ResultCache())
+        ri1, ri2, ri3, _, bi5 = get_data_np((2, 8, 8))
+        alg = runner.get_alg_cloud(AlgsCloud.VIBCM_DAY)
+
+        expected = cloud.vibcm_day(ri1, ri2, ri3, bi5, use_alt_thresholds=True)
+        assert np.array_equal(alg(ri1, ri2, ri3, bi5, use_alt_thresholds=True), expected, equal_nan=True)
+        assert np.array_equal(alg(ri1, ri2, ri3, bi5, use_alt_thresholds=True), expected, equal_nan=True)
+        alg(ri1, ri2, ri3, bi5)
+        assert (runner.cache.stats.hits, runner.cache.stats.misses) == (1, 2)
+
+    def test_compute_products(self):
+        runner = Runner(cache=ResultCache())
+        _, _, _, _, bi5 = get_data_np((8, 8))
+        ri1, ri2, _, _, _ = get_data_np((8, 8))
+        bands = {"refi1": ri1, "refi2": ri2, "bti5": bi5}
+        first = compute_products(bands, [AlgsLST.MONO_WINDOW_I05, AlgsIndex.NDVI], runner)
+        second = compute_products({k: v.copy() for k, v in bands.items()}, [AlgsIndex.NDVI, AlgsLST.MONO_WINDOW_I05], runner)
+        assert all(second[alg] is first[alg] for alg in first)
+        assert runner.cache.stats.hits == 2
+
+    def test_no_cache_by_default(self):
+        assert Runner().cache is None
+        with pytest.raises(ValueError):
+            Runner(cache=ResultCache()).get_alg_index()(np.ones(2), np.ones(2)).__setitem__(0, 1)
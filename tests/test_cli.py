@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pytest
+
+from tests.algs.utils import get_data_np
+from viirs_tools import cli
+from viirs_tools.grid import Grid
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsNight
+
+
+@pytest.fixture
+def fake_reader(monkeypatch):
+    def _read_bands(path, keys):
+        if "broken" in path:
+            raise OSError("cannot read")
+        ri1, ri2, ri3, bi4, bi5 = get_data_np((4, 6))
+        bands = {"refi1": ri1, "refi2": ri2, "refi3": ri3, "bti4": bi4, "bti5": bi5}
+        return {k: bands[k] for k in keys}
+
+    def _read_geo(path):
+        lat, lon = np.meshgrid(np.linspace(1.9, 0.1, 4), np.linspace(0.1, 2.9, 6), indexing="ij")
+        return lat, lon
+
+    def _read_geo_bands(path, keys):
+        return {"solza": np.linspace(60, 120, 24).reshape(4, 6)}
+
+    monkeypatch.setattr(cli, "_read_bands", _read_bands)
+    monkeypatch.setattr(cli, "_read_geo", _read_geo)
+    monkeypatch.setattr(cli, "_read_geo_bands", _read_geo_bands)
+
+
+class TestCli:
+    @pytest.mark.parametrize(("size", "expected"), [("1024", 1024), ("4G", 4 * 2**30), ("1.5k", 1536), ("512MB", 512 * 2**20)])
+    def test_parse_size(self, size, expected):
+        assert cli.parse_size(size) == expected
+
+    def test_parse_size_invalid(self):
+        with pytest.raises(ValueError):
+            cli.parse_size("lots")
+
+    def test_find_granules(self, tmp_path):
+        for name in ["a.nc", "b.nc", "c.txt"]:
+            (tmp_path / name).touch()
+        (tmp_path / "sub").mkdir()
+        expected = [str(tmp_path / "a.nc"), str(tmp_path / "b.nc")]
+        assert cli.find_granules([str(tmp_path)]) == expected
+        assert cli.find_granules([str(tmp_path / "*.nc"), str(tmp_path / "a.nc")]) == expected
+        assert cli.find_granules([str(tmp_path)], pattern="*.txt") == [str(tmp_path / "c.txt")]
+
+    def test_match_geo(self):
+        geo = ["/d/VNP03MOD.A2012061.1130.nc", "/d/VNP03MOD.A2012061.1136.nc"]
+        assert cli.match_geo("/d/VNP02IMG.A2012061.1136.nc", geo) == geo[1]
+        assert cli.match_geo("/d/VNP02IMG.A2012061.1200.nc", geo) is None
+        assert cli.match_geo("/d/granule.nc", geo) is None
+
+    def test_process_granule(self, tmp_path, fake_reader):
+        report = cli.process_granule("VNP02IMG.A2012061.1136.nc", [AlgsCloud.VIBCM_DAY, AlgsIndex.NDVI], str(tmp_path))
+        assert report.ok, report.error
+        assert np.load(tmp_path / "VNP02IMG.A2012061.1136" / "cloud_vibcm_day.npy").shape == (4, 6)
+        assert os.path.exists(tmp_path / "VNP02IMG.A2012061.1136" / "index_ndvi.npy")
+
+    def test_process_granule_overviews(self, tmp_path, fake_reader):
+        report = cli.process_granule("g.nc", [AlgsCloud.VIBCM_DAY, AlgsIndex.NDVI], str(tmp_path), overviews=2)
+        assert report.ok, report.error
+        with np.load(tmp_path / "g" / "index_ndvi.overviews.npz") as overviews:
+            assert overviews.files == ["x2", "x4"]
+            assert overviews["x2"].shape == (2, 3)
+            assert overviews["x4"].shape == (1, 2)
+        with np.load(tmp_path / "g" / "cloud_vibcm_day.overviews.npz") as overviews:
+            assert set(np.unique(overviews["x2"][~np.isnan(overviews["x2"])])) <= {0, 1}
+
+    def test_process_granule_grid(self, tmp_path, fake_reader):
+        grid = Grid(0, 0, 3, 2, 1)
+        report = cli.process_granule("g.nc", [AlgsIndex.NDVI], str(tmp_path), grid=grid, geo_path="geo.nc")
+        assert report.ok, report.error
+        assert np.load(tmp_path / "g" / "index_ndvi.npy").shape == grid.shape
+
+        report = cli.process_granule("g.nc", [AlgsIndex.NDVI], str(tmp_path), grid=grid)
+        assert not report.ok
+        assert "FileNotFoundError" in report.error
+
+    def test_process_granule_solar(self, tmp_path, fake_reader, monkeypatch):
+        read = []
+        monkeypatch.setattr(cli, "_read_bands", lambda path, keys: read.append(keys))
+        report = cli.process_granule("g.nc", [AlgsNight.SOLAR], str(tmp_path), geo_path="geo.nc")
+        assert report.ok, report.error
+        assert read == []  # no I-band is read
+        mask = np.load(tmp_path / "g" / "night_solar.npy")
+        assert mask[0, 0] == 0 and mask[-1, -1] == 1
+
+        report = cli.process_granule("g.nc", [AlgsNight.SOLAR], str(tmp_path))
+        assert "FileNotFoundError" in report.error
+
+    def test_process_granule_failed(self, tmp_path, fake_reader):
+        report = cli.process_granule("broken.nc", [AlgsIndex.NDVI], str(tmp_path))
+        assert not report.ok
+        assert report.error == "OSError: cannot read"
+        assert "FAILED" in cli.format_reports([report])
+
+    def test_main_mixed_directory(self, tmp_path, fake_reader, capsys):
+        day = tmp_path / "2012-03-01"
+        day.mkdir()
+        for name in ("VNP02IMG", "VNP03MOD", "CLDMSK_L2_VIIRS_SNPP"):
+            (day / f"{name}.A2012061.1136.nc").touch()
+        args = [str(day), "-p", "index:NDVI", "-o", str(tmp_path / "out"), "--workers", "1", "--grid", "0,0,3,2,1", "--geo", str(day)]
+        assert cli.main(args) == 0
+        assert "1/1 granules processed" in capsys.readouterr().out
+        assert os.listdir(tmp_path / "out") == ["VNP02IMG.A2012061.1136"]
+
+    def test_main_errors(self, tmp_path):
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "nonsense", "-o", str(tmp_path)])
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "utils", "-o", str(tmp_path)])
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "cloud", "-o", str(tmp_path)])
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "cloud", "-o", str(tmp_path), "--grid", "0,0,1,1,0.1"])
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "night:SOLAR", "-o", str(tmp_path)])
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "cloud", "-o", str(tmp_path), "--overviews", "-1"])
@@ -0,0 +1,89 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from viirs_tools.composite import ClearCount, ClearMax, ClearMean, ClearMedian, Compositor, LastClear, Reducer, composite
+
+SHAPE = (6, 5)
+
+
+def _get_granules(n=7, seed=0):
+    rng = np.random.default_rng(seed)
+    granules = []
+    for t in range(n):
+        ndvi = rng.uniform(-0.2, 0.9, SHAPE)
+        lst = rng.uniform(250, 320, SHAPE)
+        cmask = rng.choice([0.0, 1.0, np.nan], SHAPE, p=[0.3, 0.6, 0.1])
+        lst[rng.random(SHAPE) < 0.1] = np.nan
+        time = np.datetime64("2024-06-01T10:00") + np.timedelta64(t, "D")
+        granules.append(({"ndvi": ndvi, "lst": lst}, cmask, time))
+    return granules
+
+
+def _stack(granules, key):
+    values = np.stack([g[0][key] for g in granules])
+    clear = np.stack([g[1] == 1 for g in granules])
+    return np.where(clear, values, np.nan)
+
+
+class TestComposite:
+    def test_reducers(self):
+        granules = _get_granules()
+        reducers = [ClearMax("ndvi"), ClearMean("lst"), ClearMedian("lst", 250, 320, bins=140), LastClear("lst"), ClearCount("lst")]
+        result = composite(iter(granules), SHAPE, reducers)
+
+        ndvi, lst = _stack(granules, "ndvi"), _stack(granules, "lst")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN pixels
+            assert np.allclose(result["ndvi_max"], np.nanmax(ndvi, axis=0), equal_nan=True)
+            assert np.allclose(result["lst_mean"], np.nanmean(lst, axis=0), equal_nan=True)
+
+        # histogram gives the lower median for even counts, within half of the 0.5 bin
+        for i, j in np.ndindex(SHAPE):
+            valid = np.sort(lst[:, i, j][~np.isnan(lst[:, i, j])])
+            if len(valid) == 0:
+                assert np.isnan(result["lst_median"][i, j])
+            else:
+                assert abs(result["lst_median"][i, j] - valid[(len(valid) - 1) // 2]) <= 0.25
+        assert np.array_equal(result["lst_clear_count"], (~np.isnan(lst)).sum(axis=0))
+
+        last = np.full(SHAPE, np.nan)
+        for layer in lst:
+            last = np.where(np.isnan(layer), last, layer)
+        assert np.array_equal(result["lst_last"], last, equal_nan=True)
+        assert result["lst_last_time"].dtype == np.dtype("datetime64[s]")
+
+    def test_median_odd(self):
+        values = [300.2, 260.7, 310.1, 290.4, 270.9]
+        granules = [({"lst": np.full(SHAPE, v)}, np.ones(SHAPE), None) for v in values]
+        result = composite(granules, SHAPE, [ClearMedian("lst", 250, 350, bins=200)])
+        assert np.allclose(result["lst_median"], np.median(values), atol=0.25)
+
+    def test_last_clear_out_of_order(self):
+        granules = _get_granules(4)
+        forward = composite(granules, SHAPE, [LastClear("lst")])
+        backward = composite(granules[::-1], SHAPE, [LastClear("lst")])
+        assert np.array_equal(forward["lst_last"], backward["lst_last"], equal_nan=True)
+        assert np.array_equal(forward["lst_last_time"].astype(np.int64), backward["lst_last_time"].astype(np.int64))
+
+    def test_errors(self):
+        compositor = Compositor(SHAPE, [LastClear("lst")])
+        with pytest.raises(ValueError):
+            compositor.add({"lst": np.zeros(SHAPE)}, np.ones((2, 2)), np.datetime64("2024-01-01"))
+        with pytest.raises(ValueError):
+            compositor.add({"lst": np.zeros(SHAPE)}, np.ones(SHAPE))
+        with pytest.raises(ValueError):
+            ClearMedian("lst", 1, 0)
+        with pytest.raises(TypeError):
+            Reducer("lst")
+
+    def test_median_saturates(self):
+        median = ClearMedian("lst", 0, 2, bins=2)
+        median.init((1, 2))
+        median.counts[0] = [65534, 10]
+        median.counts[1] = [3, 10]
+        for _ in range(2):
+            median.update(np.zeros((1, 2)), np.ones((1, 2), dtype=bool), None)
+        assert median.counts[0].tolist() == [[65535, 12]]
+        assert median.result()["lst_median"].tolist() == [[0.5, 0.5]]
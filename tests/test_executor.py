@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from tests.algs.test_fastpath import CASES, _get_scene
+from tests.algs.utils import _np2xr
+from viirs_tools.algs import cloud
+from viirs_tools.cache import ResultCache
+from viirs_tools.executor import BlockExecutor
+from viirs_tools.runner import AlgsCloud, Runner
+
+
+@pytest.fixture(scope="module", params=["thread", "process"])
+def executor(request):
+    with BlockExecutor(request.param, workers=2, block_bytes=1024) as ex:
+        yield ex
+
+
+class TestBlockExecutor:
+    @pytest.mark.parametrize(("alg", "names", "kwargs"), CASES)
+    def test_matches_serial(self, executor, alg, names, kwargs):
+        scene = _get_scene("float32", shape=(2, 40, 16))
+        args = [scene[n] for n in names]
+
+        expected = alg(*args, **kwargs)
+        result = executor.run(alg, *args, **kwargs)
+        assert result.dtype == expected.dtype
+        assert np.array_equal(result, expected, equal_nan=True)
+
+    def test_scene_max(self, executor):
+        # I03 maximum is in the last rows, blocks without it would differ
+        scene = _get_scene("float64", shape=(40, 16))
+        scene["ri3"][-1, -1] = 1000
+        args = [scene[n] for n in ("ri1", "ri2", "ri3", "bi5")]
+        assert np.array_equal(executor.run(cloud.vibcm_day, *args), cloud.vibcm_day(*args), equal_nan=True)
+
+    def test_scene_max_keywords(self, executor):
+        scene = _get_scene("float64", shape=(40, 16))
+        scene["ri3"][-1, -1] = 1000
+        expected = cloud.vibcm_day(scene["ri1"], scene["ri2"], scene["ri3"], scene["bi5"])
+        bands = {n: scene[n] for n in ("ri1", "ri2", "ri3", "bi5")}
+        assert np.array_equal(executor.run(cloud.vibcm_day, **bands), expected, equal_nan=True)
+        mixed = executor.run(cloud.vibcm_day, scene["ri1"], scene["ri2"], bi5=scene["bi5"], ri3=scene["ri3"])
+        assert np.array_equal(mixed, expected, equal_nan=True)
+
+    def test_xr(self, executor):
+        scene = _get_scene("float32", shape=(2, 40, 16))
+        args = [_np2xr(scene[n]) for n in ("ri1", "ri2", "ri3", "bi5")]
+        result = executor.run(cloud.vibcm_day, *args, use_alt_thresholds=True)
+        expected = cloud.vibcm_day(*args, use_alt_thresholds=True)
+        assert result.dims == expected.dims
+        assert np.array_equal(result.values, expected.values, equal_nan=True)
+
+    def test_runner_alg(self, executor):
+        scene = _get_scene("float32", shape=(40, 16))
+        args = [scene[n] for n in ("ri1", "ri2", "ri3", "bi5")]
+        alg = Runner(cache=ResultCache()).get_alg_cloud(AlgsCloud.VIBCM_DAY)
+        assert np.array_equal(executor.run(alg, *args), cloud.vibcm_day(*args), equal_nan=True)
+
+    def test_invalid_backend(self):
+        with pytest.raises(ValueError):
+            BlockExecutor("gpu")
+
+
+class TestVibcmDayRi3Max:
+    def test_given_max(self):
+        scene = _get_scene("float32")
+        args = [scene[n] for n in ("ri1", "ri2", "ri3", "bi5")]
+        ri3_max = np.nanmax(scene["ri3"], axis=(-2, -1), keepdims=True)
+        assert np.array_equal(cloud.vibcm_day(*args, ri3_max=ri3_max), cloud.vibcm_day(*args), equal_nan=True)
+        assert not np.array_equal(cloud.vibcm_day(*args, ri3_max=ri3_max * 10), cloud.vibcm_day(*args), equal_nan=True)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from viirs_tools.grid import Grid, grid_index, to_grid
+
+
+class TestGrid:
+    def test_from_string(self):
+        grid = Grid.from_string("23,51,33,56,0.5")
+        assert grid == Grid(23, 51, 33, 56, 0.5)
+        assert grid.shape == (10, 20)
+        assert grid.size == 200
+
+    @pytest.mark.parametrize("spec", ["1,2,3", "0,0,0,1,1", "0,0,1,1,-1"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            Grid.from_string(spec)
+
+    def test_index(self):
+        grid = Grid(0, 0, 2, 2, 1)
+        lat = np.array([[1.5, 1.5], [0.5, np.nan], [3, 0.5]])
+        lon = np.array([[0.5, 1.5], [0.5, 0.5], [0.5, -1]])
+        index = grid_index(lat, lon, grid)
+        assert np.array_equal(index, [[0, 1], [2, -1], [-1, -1]])
+
+    def test_to_grid(self):
+        grid = Grid(0, 0, 2, 2, 1)
+        index = np.array([0, 1, 1, 3, -1])
+        data = np.array([1.0, 2.0, np.nan, 4.0, 5.0])
+        out = to_grid(data, index, grid)
+        assert np.allclose(out, [[1, 2], [np.nan, 4]], equal_nan=True)
+
+    def test_to_grid_int(self):
+        grid = Grid(0, 0, 2, 1, 1)
+        out = to_grid(np.array([1, 0]), np.array([1, 0]), grid)
+        assert out.dtype == np.float64
+        assert np.array_equal(out, [[0, 1]])
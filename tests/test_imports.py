@@ -0,0 +1,39 @@
+import subprocess as sp
+import sys
+
+import pytest
+
+
+def _loaded(statement: str, modules: list[str]) -> list[str]:
+    check = f"import sys; {statement}; print(); print(' '.join(m for m in {modules!r} if m in sys.modules))"
+    out = sp.run([sys.executable, "-c", check], check=True, capture_output=True, text=True).stdout
+    return out.splitlines()[-1].split()
+
+
+class TestLazyImports:
+    @pytest.mark.parametrize(
+        "statement",
+        [
+            "import viirs_tools",
+            "from viirs_tools import Runner, AlgsCloud; Runner().show_algs_all()",
+            "import viirs_tools.runner",
+        ],
+    )
+    def test_no_heavy_imports(self, statement):
+        assert _loaded(statement, ["numpy", "xarray", "viirs_tools.algs.cloud"]) == []
+
+    def test_alg_import_on_access(self):
+        statement = "from viirs_tools import Runner; Runner().get_alg_cloud()"
+        assert _loaded(statement, ["xarray", "viirs_tools.algs.cloud", "viirs_tools.algs.lst"]) == ["xarray", "viirs_tools.algs.cloud"]
+
+    def test_cli_without_xarray(self):
+        assert _loaded("import viirs_tools.cli", ["xarray"]) == []
+
+    def test_getattr(self):
+        import viirs_tools
+        from viirs_tools import runner
+
+        assert viirs_tools.Runner is runner.Runner
+        assert "AlgsCloud" in dir(viirs_tools)
+        with pytest.raises(AttributeError):
+            _ = viirs_tools.Nothing
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from viirs_tools.algs import cloud
+from viirs_tools.mosaic import SwathRingBuffer
+
+
+def _granule(index: int, rows: int = 64, width: int = 8):
+    rng = np.random.default_rng(index)
+    return {
+        "refi1": rng.uniform(0, 60, (rows, width)).astype(np.float32),
+        "refi2": rng.uniform(0, 60, (rows, width)).astype(np.float32),
+        "refi3": rng.uniform(0, 60, (rows, width)).astype(np.float32),
+        "bti5": rng.uniform(230, 330, (rows, width)).astype(np.float32),
+    }
+
+
+class TestSwathRingBuffer:
+    def test_window_matches_concatenation(self):
+        buffer = SwathRingBuffer(["refi1", "bti5"], scans=5, width=8)
+        granules = [_granule(i) for i in range(4)]
+        for i, granule in enumerate(granules):
+            buffer.append(granule, key=i)
+
+            swath = np.concatenate([g["refi1"] for g in granules[: i + 1]])
+            for rows in (0, 32, buffer.rows):
+                assert np.array_equal(buffer.window(rows)["refi1"], swath[len(swath) - rows :])
+
+        assert buffer.rows == 160
+        assert buffer.granules == [1, 2, 3]
+
+    def test_zero_copy(self):
+        buffer = SwathRingBuffer(["refi1"], scans=4, width=8)
+        for i in range(3):
+            buffer.append(_granule(i), key=i)
+        view = buffer.last_scans(3)["refi1"]
+        assert np.shares_memory(view, buffer._buffers["refi1"])
+        assert view.flags.c_contiguous
+        with pytest.raises(ValueError):
+            view[0, 0] = 0
+
+    def test_last_granules(self):
+        buffer = SwathRingBuffer(["refi1"], scans=6, width=8)
+        granules = [_granule(i) for i in range(4)]
+        for i, granule in enumerate(granules):
+            buffer.append(granule, key=i)
+        assert np.array_equal(buffer.last_granules(2)["refi1"], np.concatenate([granules[2]["refi1"], granules[3]["refi1"]]))
+        # oldest kept granule is partial
+        assert buffer.last_granules(3)["refi1"].shape == (192, 8)
+        with pytest.raises(ValueError):
+            buffer.last_granules(4)
+
+    def test_granule_larger_than_capacity(self):
+        buffer = SwathRingBuffer(["refi1"], scans=1, width=8)
+        granule = _granule(0)
+        buffer.append(granule)
+        assert np.array_equal(buffer.window()["refi1"], granule["refi1"][-32:])
+
+    def test_granule_not_multiple_of_capacity(self):
+        buffer = SwathRingBuffer(["refi1"], scans=2, width=8)
+        first, second = _granule(0, rows=32), _granule(1, rows=96)
+        for granule in (first, second):
+            buffer.append(granule)
+        assert np.array_equal(buffer.window()["refi1"], second["refi1"][-64:])
+        buffer.append(third := _granule(2, rows=32))
+        assert np.array_equal(buffer.window()["refi1"], np.concatenate([second["refi1"][-32:], third["refi1"]]))
+
+    def test_invalid_granule(self):
+        buffer = SwathRingBuffer(["refi1", "bti5"], scans=2, width=8)
+        with pytest.raises(ValueError):
+            buffer.append({"refi1": np.zeros((32, 8))})
+        with pytest.raises(ValueError):
+            buffer.append({"refi1": np.zeros((30, 8)), "bti5": np.zeros((30, 8))})
+        with pytest.raises(ValueError):
+            buffer.window(1)
+
+    def test_alg_over_window(self):
+        buffer = SwathRingBuffer(["refi1", "refi2", "refi3", "bti5"], scans=4, width=8)
+        granules = [_granule(i) for i in range(3)]
+        for granule in granules:
+            buffer.append(granule)
+        window = buffer.window()
+        swath = {band: np.concatenate([g[band] for g in granules])[-128:] for band in window}
+        expected = cloud.vibcm_day(swath["refi1"], swath["refi2"], swath["refi3"], swath["bti5"])
+        assert np.array_equal(cloud.vibcm_day(window["refi1"], window["refi2"], window["refi3"], window["bti5"]), expected, equal_nan=True)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from tests.algs.test_fastpath import CASES, _get_scene
+from viirs_tools.algs import cloud
+from viirs_tools.packed import PackedArray, pack_bands
+
+
+def _get_filled_scene(dtype):
+    scene = _get_scene(dtype)
+    for band in scene.values():
+        band[..., :, -5:] = np.nan  # swath edge fill
+    scene["ri1"][1] = np.nan  # fully missing reflectance scene
+    return scene
+
+
+class TestPackedArray:
+    def test_roundtrip(self):
+        data = np.array([[1.0, np.nan], [np.nan, 4.0]])
+        packed = PackedArray.pack(data)
+
+        assert packed.nvalid == 2
+        assert packed.shape == data.shape
+        assert np.array_equal(packed.unpack(), data, equal_nan=True)
+        assert np.array_equal(np.asarray(packed), data, equal_nan=True)
+
+    def test_unpack_promotes_bool(self):
+        packed = PackedArray.pack(np.array([1.0, np.nan, 3.0])) > 2
+        out = packed.unpack()
+        assert out.dtype == np.float64
+        assert np.array_equal(out, [0, np.nan, 1], equal_nan=True)
+
+    def test_layouts(self):
+        a = PackedArray.pack(np.array([1.0, np.nan, 3.0]))
+        b = PackedArray.pack(np.array([np.nan, 2.0, 3.0]))
+        with pytest.raises(ValueError):
+            a + b
+        with pytest.raises(TypeError):
+            a + np.ones(3)
+        assert np.array_equal((a + 1).values, [2, 4])
+
+    def test_in_place(self):
+        a, b = pack_bands([np.array([1.0, 5.0, np.nan]), np.array([2.0, 2.0, 2.0])])
+        a += b
+        assert np.array_equal(a.values, [3, 7, np.nan], equal_nan=True)
+
+    @pytest.mark.filterwarnings("ignore:All-NaN slice")
+    def test_nanmax_per_scene(self):
+        data = np.array([[[1.0, 5.0], [np.nan, 2.0]], [[np.nan, np.nan], [np.nan, np.nan]], [[7.0, 0.0], [np.nan, np.nan]]])
+        (packed,) = pack_bands([data], valid=np.ones(data.shape, dtype=bool))
+        expected = np.broadcast_to(np.nanmax(data, axis=(-2, -1), keepdims=True), data.shape)
+        assert np.array_equal(np.nanmax(packed, axis=(-2, -1), keepdims=True).unpack(), expected, equal_nan=True)
+
+    @pytest.mark.filterwarnings("ignore:All-NaN slice")
+    @pytest.mark.parametrize(("axis", "keepdims"), [(0, False), (-1, True), ((-2, -1), False), (None, True)])
+    def test_nanmax_dense_fallback(self, axis, keepdims):
+        data = np.array([[[1.0, 5.0], [np.nan, 2.0]], [[np.nan, np.nan], [np.nan, np.nan]]])
+        (packed,) = pack_bands([data])
+        expected = np.nanmax(data, axis=axis, keepdims=keepdims)
+        assert np.array_equal(np.nanmax(packed, axis=axis, keepdims=keepdims), expected, equal_nan=True)
+
+
+class TestPackedAlgs:
+    @pytest.mark.filterwarnings("ignore:All-NaN slice")
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize(("alg", "names", "kwargs"), CASES)
+    def test_equivalence(self, alg, names, kwargs, dtype):
+        scene = _get_filled_scene(dtype)
+        args = [scene[n] for n in names]
+
+        expected = alg(*args, **kwargs)
+        result = alg(*pack_bands(args), **kwargs)
+
+        assert isinstance(result, PackedArray)
+        assert result.dtype == expected.dtype
+        assert np.array_equal(result.unpack(), expected, equal_nan=True)
+
+    def test_skips_fill(self):
+        scene = _get_filled_scene("float32")
+        packed = pack_bands([scene[n] for n in ("ri1", "ri2", "ri3", "bi5")])
+        assert packed[0].nvalid < scene["ri1"].size
+        assert cloud.vibcm_day(*packed).values.size == packed[0].nvalid
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tests.algs.utils import get_data_np
+from viirs_tools.algs import cloud, index, lst
+from viirs_tools.products import compute_products, parse_product, product_name, required_bands
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsUtils
+
+
+class TestProducts:
+    @pytest.mark.parametrize(
+        ("spec", "expected"),
+        [
+            ("cloud", AlgsCloud.VIBCM_DAY),
+            ("cloud:vifcm_day", AlgsCloud.VIFCM_DAY),
+            ("index:NDSI", AlgsIndex.NDSI),
+            ("lst", AlgsLST.MONO_WINDOW_I05),
+        ],
+    )
+    def test_parse(self, spec, expected):
+        assert parse_product(spec) is expected
+
+    @pytest.mark.parametrize("spec", ["clouds", "cloud:VIBCM", ""])
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_product(spec)
+
+    def test_name(self):
+        assert product_name(AlgsCloud.VIBCM_DAY) == "cloud_vibcm_day"
+        assert product_name(AlgsLST.MONO_WINDOW_I05) == "lst_mono_window_i05"
+
+    def test_required_bands(self):
+        assert required_bands([AlgsLST.MONO_WINDOW_I05]) == {"bti5", "refi1", "refi2"}
+        with pytest.raises(ValueError):
+            required_bands([AlgsUtils.MERGE_DAY_NIGHT])
+
+    def test_compute(self):
+        ri1, ri2, ri3, bi4, bi5 = get_data_np((4, 4))
+        bands = {"refi1": ri1, "refi2": ri2, "refi3": ri3, "bti4": bi4, "bti5": bi5}
+        results = compute_products(bands, [AlgsLST.MONO_WINDOW_I05, AlgsCloud.VIBCM_DAY])
+
+        ndvi = index.ndvi(ri2, ri1)
+        assert set(results) == {AlgsLST.MONO_WINDOW_I05, AlgsCloud.VIBCM_DAY, AlgsIndex.NDVI}
+        assert np.allclose(results[AlgsIndex.NDVI], ndvi, equal_nan=True)
+        assert np.allclose(results[AlgsLST.MONO_WINDOW_I05], lst.mono_window_i05(bi5, ndvi), equal_nan=True)
+        assert np.allclose(results[AlgsCloud.VIBCM_DAY], cloud.vibcm_day(ri1, ri2, ri3, bi5), equal_nan=True)
@@ -0,0 +1,55 @@
+import logging
+
+import numpy as np
+
+from tests.algs.utils import get_data_np, get_data_xr
+from viirs_tools import profiling
+from viirs_tools.algs import cloud, index
+from viirs_tools.runner import AlgsCloud, AlgsIndex, Runner
+
+
+class TestProfiling:
+    def test_disabled(self):
+        runner = Runner()
+        assert not profiling.is_active()
+        assert runner.get_alg_index(AlgsIndex.NDVI) is index.ndvi
+
+    def test_records(self):
+        runner = Runner()
+        ri1, ri2, ri3, _, bi5 = get_data_np((4, 4))
+        xri1, xri2, _, _, _ = get_data_xr((4, 4))
+
+        with profiling.profile(profiling.StatsSink(keep_records=True)) as sink:
+            ndvi = runner.get_alg_index(AlgsIndex.NDVI)
+            ndvi(ri2, ri1)
+            ndvi(ri2, ri1)
+            ndvi(xri2, xri1)
+            runner.get_alg_cloud()(ri1, ri2, ri3, bi5.astype(np.float32))
+
+        assert set(sink.stats) == {("AlgsIndex.NDVI", "numpy"), ("AlgsIndex.NDVI", "xarray"), ("AlgsCloud.VIBCM_DAY", "numpy")}
+        assert sink.stats[("AlgsIndex.NDVI", "numpy")].calls == 2
+        assert len(sink.records) == 4
+
+        record = sink.records[-1]
+        assert record.shapes == ((4, 4),) * 4
+        assert record.dtypes == ("float64", "float64", "float64", "float32")
+        assert record.wall_s >= 0
+        assert record.alloc_bytes > 0
+        assert "AlgsCloud.VIBCM_DAY" in sink.summary()
+
+        # no records after leaving the context
+        ndvi(ri2, ri1)
+        assert len(sink.records) == 4
+
+    def test_nested(self, caplog):
+        runner = Runner()
+        ri1, ri2, _, _, _ = get_data_np((4, 4))
+        with profiling.profile(trace_memory=False) as outer:
+            vifcm = runner.get_alg_cloud(AlgsCloud.VIFCM_DAY)
+            vifcm(ri1, ri2, ri1)
+            with profiling.profile(profiling.LoggingSink(level=logging.WARNING)):
+                vifcm(ri1, ri2, ri1)
+        assert outer.stats[("AlgsCloud.VIFCM_DAY", "numpy")].calls == 2
+        assert outer.stats[("AlgsCloud.VIFCM_DAY", "numpy")].alloc_bytes > 0
+        assert "AlgsCloud.VIFCM_DAY [numpy]" in caplog.text
+        assert runner.get_alg_cloud(AlgsCloud.VIFCM_DAY) is cloud.vifcm_day
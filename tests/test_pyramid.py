@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from viirs_tools import pyramid
+from viirs_tools.runner import AlgsCloud, AlgsIndex, AlgsLST, AlgsNight
+
+
+def _blocks(data, factor):
+    # reference: the whole factor x factor blocks of the NaN-padded data
+    rows, cols = data.shape[-2:]
+    pad = [(0, 0)] * (data.ndim - 2) + [(0, -rows % factor), (0, -cols % factor)]
+    data = np.pad(data.astype(float), pad, constant_values=np.nan)
+    shape = (*data.shape[:-2], data.shape[-2] // factor, factor, data.shape[-1] // factor, factor)
+    return np.moveaxis(data.reshape(shape), -3, -2).reshape(*shape[:-3], shape[-2], factor * factor)
+
+
+class TestBuildOverviews:
+    @pytest.mark.parametrize("shape", [(16, 16), (13, 23), (2, 9, 10)])
+    def test_mean(self, shape):
+        rng = np.random.default_rng(0)
+        data = rng.uniform(-1, 1, shape)
+        data[rng.random(shape) < 0.6] = np.nan
+        overviews = pyramid.build_overviews(data, 3)
+        assert len(overviews) == 3
+        for level, overview in enumerate(overviews, 1):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # empty blocks
+                expected = np.nanmean(_blocks(data, 2**level), axis=-1)
+            assert overview.shape == expected.shape
+            assert np.allclose(overview, expected, equal_nan=True)
+
+    def test_majority(self):
+        rng = np.random.default_rng(1)
+        data = rng.choice([0.0, 1.0, 3.0, np.nan], (11, 14), p=[0.4, 0.3, 0.1, 0.2])
+        overviews = pyramid.build_overviews(data, 2, "majority")
+        for level, overview in enumerate(overviews, 1):
+            blocks = _blocks(data, 2**level)
+            counts = np.stack([(blocks == c).sum(axis=-1) for c in (0, 1, 3)])
+            expected = np.where(counts.sum(axis=0) > 0, np.array([0, 1, 3])[counts.argmax(axis=0)], np.nan)
+            assert np.array_equal(overview, expected, equal_nan=True)
+
+    def test_majority_ties(self):
+        data = np.array([[1.0, 0.0], [np.nan, np.nan]])
+        assert pyramid.build_overviews(data, 1, "majority")[0][0, 0] == 0
+        assert np.isnan(pyramid.build_overviews(np.full((3, 3), np.nan), 1, "majority")[0]).all()
+
+    def test_dtype(self):
+        data = np.ones((4, 4), dtype=np.float32)
+        assert pyramid.build_overviews(data, 1)[0].dtype == np.float32
+        assert pyramid.build_overviews(data.astype(np.uint8), 1, "majority")[0].dtype == np.float64
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            pyramid.build_overviews(np.zeros((4, 4)), 1, "median")
+        with pytest.raises(ValueError):
+            pyramid.build_overviews(np.zeros((4, 4)), -1)
+        with pytest.raises(ValueError):
+            pyramid.build_overviews(np.zeros(4), 1)
+        with pytest.raises(ValueError):
+            pyramid.build_overviews(np.arange(16.0).reshape(4, 4) * 2, 1, "majority")
+        with pytest.raises(ValueError):
+            pyramid.build_overviews(np.full((4, 4), 0.5), 1, "majority")
+
+    def test_default_reducer(self):
+        assert pyramid.default_reducer(AlgsIndex.NDVI) == "mean"
+        assert pyramid.default_reducer(AlgsLST.MONO_WINDOW_I05) == "mean"
+        assert pyramid.default_reducer(AlgsCloud.VIBCM_DAY) == "majority"
+        assert pyramid.default_reducer(AlgsNight.SOLAR) == "majority"
+
+
+class TestStorage:
+    def test_roundtrip(self, tmp_path):
+        overviews = pyramid.build_overviews(np.arange(64.0).reshape(8, 8), 3)
+        path = pyramid.overviews_path(str(tmp_path / "index_ndvi.npy"))
+        assert path == str(tmp_path / "index_ndvi.overviews.npz")
+        pyramid.save_overviews(path, overviews)
+        assert np.array_equal(pyramid.load_overview(path, 4), overviews[1])
+        assert pyramid.load_overview(path, 8).shape == (1, 1)
+        with pytest.raises(KeyError):
+            pyramid.load_overview(path, 16)
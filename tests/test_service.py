@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+
+from tests.algs.utils import get_data_np
+from viirs_tools import cli, service
+from viirs_tools.grid import Grid
+from viirs_tools.runner import AlgsCloud, AlgsIndex
+
+
+@pytest.fixture
+def fake_reader(monkeypatch):
+    def _read_bands(path, keys):
+        ri1, ri2, ri3, bi4, bi5 = get_data_np((4, 6))
+        bands = {"refi1": ri1, "refi2": ri2, "refi3": ri3, "bti4": bi4, "bti5": bi5}
+        return {k: bands[k] for k in keys}
+
+    def _read_geo(path):
+        lat, lon = np.meshgrid(np.linspace(1.9, 0.1, 4), np.linspace(0.1, 2.9, 6), indexing="ij")
+        return lat, lon
+
+    monkeypatch.setattr(cli, "_read_bands", _read_bands)
+    monkeypatch.setattr(cli, "_read_geo", _read_geo)
+
+
+def _land(directory, name, data=b"granule"):
+    with open(directory / name, "wb") as file:
+        file.write(data)
+    return str(directory / name)
+
+
+class TestPollingWatcher:
+    def test_reports_stable_files_once(self, tmp_path):
+        watcher = service.PollingWatcher(str(tmp_path), ["*.nc"], interval=0.01)
+        path = _land(tmp_path, "VNP02IMG.A2012061.1136.nc")
+        _land(tmp_path, "notes.txt")
+
+        assert watcher.poll() == []  # first seen, could be still written
+        ready = watcher.poll()
+        assert [p for p, _ in ready] == [path]
+        assert watcher.poll() == []
+
+    def test_growing_file_waits(self, tmp_path):
+        watcher = service.PollingWatcher(str(tmp_path), ["*.nc"])
+        _land(tmp_path, "a.nc", b"x")
+        watcher.poll()
+        _land(tmp_path, "a.nc", b"xx")
+        assert watcher.poll() == []
+        assert len(watcher.poll()) == 1
+
+    def test_make_watcher_fallback(self, tmp_path):
+        assert isinstance(service.make_watcher(str(tmp_path), ["*.nc"], inotify=False), service.PollingWatcher)
+        assert service.make_watcher(str(tmp_path), ["*.nc"]) is not None
+
+
+class TestGranuleSets:
+    def test_match(self):
+        sets = service.GranuleSets({"image": "*02IMG*", "geo": "*03MOD*"})
+        assert sets.add("/d/VNP02IMG.A2012061.1136.nc", 10.0) is None
+        assert sets.add("/d/VNP03MOD.A2012061.1130.nc", 11.0) is None
+        assert sets.add("/d/readme.txt", 11.0) is None
+        key, matched = sets.add("/d/VNP03MOD.A2012061.1136.nc", 12.0)
+        assert key == "A2012061.1136"
+        assert matched.files == {"image": "/d/VNP02IMG.A2012061.1136.nc", "geo": "/d/VNP03MOD.A2012061.1136.nc"}
+        assert (matched.arrived, matched.completed) == (10.0, 12.0)
+
+    def test_expire(self):
+        sets = service.GranuleSets({"image": "*02IMG*", "geo": "*03MOD*"}, max_age=5)
+        sets.add("/d/VNP02IMG.A2012061.1136.nc", 10.0)
+        assert sets.expire(12.0) == []
+        assert sets.expire(16.0) == ["A2012061.1136"]
+
+
+class TestService:
+    def test_process_on_arrival(self, tmp_path, fake_reader):
+        landing, out = tmp_path / "landing", tmp_path / "out"
+        landing.mkdir()
+        records = []
+        watcher = service.PollingWatcher(str(landing), ["*02IMG*.nc"], interval=0.01)
+        srv = service.Service(str(landing), [AlgsCloud.VIBCM_DAY, AlgsIndex.NDVI], str(out), watcher=watcher, sink=records.append)
+
+        _land(landing, "VNP02IMG.A2012061.1136.nc")
+        srv.serve(max_sets=1)
+
+        assert len(records) == 1 and records[0].report.ok, records[0].report.error
+        assert records[0].latency_s >= 0
+        assert os.path.exists(out / "VNP02IMG.A2012061.1136" / "cloud_vibcm_day.npy")
+        assert "1/1 granule sets processed" in srv.summary()
+
+    def test_waits_for_geo(self, tmp_path, fake_reader):
+        watcher = service.PollingWatcher(str(tmp_path), ["*02IMG*.nc", "*03MOD*.nc"], interval=0.01)
+        srv = service.Service(str(tmp_path), [AlgsIndex.NDVI], str(tmp_path / "out"), grid=Grid(0, 0, 3, 2, 1), watcher=watcher)
+
+        _land(tmp_path, "VNP02IMG.A2012061.1136.nc")
+        assert srv.step(0.05) == []
+        _land(tmp_path, "VNP03MOD.A2012061.1136.nc")
+        (record,) = srv.step(0.05)
+        assert record.report.ok, record.report.error
+        assert record.wait_s >= 0
+        assert np.load(tmp_path / "out" / "VNP02IMG.A2012061.1136" / "index_ndvi.npy").shape == (2, 3)
+
+    def test_cli_requires_directory(self, tmp_path):
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path / "a.nc"), "-p", "cloud", "-o", str(tmp_path), "--watch"])
+
+    @pytest.mark.parametrize("flags", [["--workers", "2"], ["--max-memory", "4G"], ["--geo", "geo"]])
+    def test_cli_rejects_batch_flags(self, tmp_path, flags, capsys):
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "-p", "cloud", "-o", str(tmp_path), "--watch", *flags])
+        assert f"{flags[0]} cannot be used with --watch" in capsys.readouterr().err
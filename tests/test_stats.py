@@ -0,0 +1,89 @@
+import pickle
+import warnings
+
+import numpy as np
+import pytest
+
+from viirs_tools.stats import PixelStats, merge_all
+
+SHAPE = (5, 4)
+
+
+def _get_history(n=40, seed=1):
+    rng = np.random.default_rng(seed)
+    history = rng.normal(290, 12, (n, *SHAPE))
+    history[rng.random(history.shape) < 0.2] = np.nan
+    history[:, 0, 0] = np.nan  # never observed
+    return history
+
+
+def _accumulate(history, **kwargs):
+    stats = PixelStats(SHAPE, **kwargs)
+    for layer in history:
+        stats.update(layer)
+    return stats
+
+
+class TestPixelStats:
+    def test_single_pass(self):
+        history = _get_history()
+        result = _accumulate(history).result()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            assert np.array_equal(result["count"], (~np.isnan(history)).sum(axis=0))
+            assert np.allclose(result["mean"], np.nanmean(history, axis=0), equal_nan=True)
+            assert np.allclose(result["var"], np.nanvar(history, axis=0), equal_nan=True)
+            assert np.array_equal(result["min"], np.nanmin(history, axis=0), equal_nan=True)
+            assert np.array_equal(result["max"], np.nanmax(history, axis=0), equal_nan=True)
+
+    def test_mask(self):
+        history = _get_history()
+        stats = PixelStats(SHAPE)
+        for layer in history:
+            stats.update(layer, mask=np.zeros(SHAPE, dtype=bool))
+        assert (stats.count == 0).all()
+        assert np.isnan(stats.result()["mean"]).all()
+
+    def test_merge(self):
+        history = _get_history()
+        kwargs = {"lo": 240, "hi": 340, "bins": 200}
+        single = _accumulate(history, **kwargs)
+        parts = [_accumulate(history[i : i + 7], **kwargs) for i in range(0, len(history), 7)]
+        parts.append(PixelStats(SHAPE, **kwargs))  # empty worker
+        merged = merge_all(parts)
+
+        assert np.array_equal(merged.count, single.count)
+        assert np.array_equal(merged.hist, single.hist)
+        assert np.array_equal(merged.min, single.min, equal_nan=True)
+        assert np.array_equal(merged.max, single.max, equal_nan=True)
+        assert np.allclose(merged.mean, single.mean)
+        assert np.allclose(merged.variance(ddof=1), single.variance(ddof=1), equal_nan=True)
+        assert np.array_equal(merged.quantile([0.1, 0.5, 0.9]), single.quantile([0.1, 0.5, 0.9]), equal_nan=True)
+        # inputs are not modified
+        assert parts[0].count.sum() < single.count.sum()
+
+        with pytest.raises(ValueError):
+            merged.merge(PixelStats(SHAPE))
+
+    def test_quantile(self):
+        history = _get_history()
+        stats = _accumulate(history, lo=240, hi=340, bins=400)
+        median = stats.quantile(0.5)
+        assert median.shape == SHAPE
+        assert np.isnan(median[0, 0])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            # lower median within half of the 0.25 bin
+            lower = np.nanquantile(history, 0.5, axis=0, method="lower")
+        assert np.nanmax(np.abs(median - lower)) <= 0.125
+
+        with pytest.raises(ValueError):
+            _accumulate(history).quantile(0.5)
+
+    def test_serialisation(self, tmp_path):
+        stats = _accumulate(_get_history(), lo=240, hi=340, bins=16)
+        stats.save(tmp_path / "stats.npz")
+        for restored in (PixelStats.load(tmp_path / "stats.npz"), pickle.loads(pickle.dumps(stats))):
+            assert (restored.lo, restored.hi, restored.bins) == (240, 340, 16)
+            for name in ("count", "mean", "m2", "min", "max", "hist"):
+                assert np.array_equal(getattr(restored, name), getattr(stats, name), equal_nan=True)
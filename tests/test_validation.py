@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from viirs_tools.validation import ConfusionCounter, validate, validate_parallel
+
+
+def _load_pair(seed):
+    rng = np.random.default_rng(seed)
+    shape = (8, 10)
+    pred = rng.choice([0.0, 1.0, np.nan], shape, p=[0.4, 0.5, 0.1])
+    ref = np.ma.masked_array(rng.integers(0, 4, shape), mask=rng.random(shape) < 0.1)
+    nmask = rng.choice([0.0, 1.0, np.nan], shape, p=[0.6, 0.35, 0.05])
+    clear_conf = rng.random(shape)
+    return pred, ref, nmask, clear_conf
+
+
+class TestValidation:
+    def test_counts(self):
+        pred = np.array([0, 0, 1, 1, np.nan, 1])
+        ref = np.array([0, 3, 1, 2, 3, -1])
+        nmask = np.array([0, 1, 0, 1, 0, 0])
+        clear_conf = np.array([0.1, 0.999, 0.7, 0.96, 0.5, 0.5])
+
+        counter = ConfusionCounter()
+        counter.update(pred, ref, nmask, clear_conf)
+        assert counter.counts.sum() == 4
+        assert counter.counts[0, 0, 0, 0] == 1  # day, cloudy, hit
+        assert counter.counts[1, 3, 0, 1] == 1  # night, confident clear, false alarm
+        assert counter.counts[0, 1, 1, 0] == 1  # day, probably cloudy, miss
+        assert counter.counts[1, 2, 1, 1] == 1  # night, probably clear, clear hit
+
+        assert np.array_equal(counter.matrix(), [[1, 1], [1, 1]])
+        assert np.array_equal(counter.matrix("day"), [[1, 0], [1, 0]])
+        assert np.array_equal(counter.matrix(conf_bin=3), [[0, 1], [0, 0]])
+
+        metrics = counter.metrics()
+        assert metrics["count"] == 4
+        assert metrics["accuracy"] == 0.5
+        assert metrics["cloud_pod"] == 0.5
+        assert metrics["hss"] == 0
+        assert np.isnan(counter.metrics("day")["clear_pod"])
+
+    def test_without_strata(self):
+        counter = ConfusionCounter()
+        counter.update(np.array([[1.0, 0.0]]), np.array([[3, 0]]))
+        assert counter.counts[0, 0].sum() == 2
+        assert counter.metrics()["accuracy"] == 1
+        with pytest.raises(ValueError):
+            counter.update(np.zeros(3), np.zeros(2))
+
+    def test_merge(self, tmp_path):
+        pairs = [_load_pair(seed) for seed in range(6)]
+        total = validate(pairs)
+        merged = validate(pairs[:2]).merge(validate(pairs[2:]))
+        assert np.array_equal(total.counts, merged.counts)
+
+        total.save(tmp_path / "counts.npz")
+        assert np.array_equal(ConfusionCounter.load(tmp_path / "counts.npz").counts, total.counts)
+
+        with pytest.raises(ValueError):
+            total.merge(ConfusionCounter((0.5,)))
+
+    def test_parallel(self):
+        total = validate(_load_pair(seed) for seed in range(4))
+        parallel = validate_parallel(_load_pair, range(4), workers=2)
+        assert np.array_equal(total.counts, parallel.counts)